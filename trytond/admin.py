@@ -132,6 +132,11 @@ def run(options):
                 Module = pool.get('ir.module')
                 Module.update_list()
 
+        if options.compile_views:
+            with Transaction().start(db_name, 0) as transaction:
+                ViewCompiled = pool.get('ir.ui.view.compiled')
+                ViewCompiled.compile()
+
         if lang:
             with Transaction().start(db_name, 0) as transaction:
                 pool = Pool()
@@ -38,12 +38,16 @@ db_names = os.environ.get('TRYTOND_DATABASE_NAMES')
 if db_names:
     # Read with csv so database name can include special chars
     reader = csv.reader(StringIO(db_names))
-    threads = []
-    for name in next(reader):
-        thread = threading.Thread(target=Pool(name).init)
-        thread.start()
-        threads.append(thread)
-    for thread in threads:
-        thread.join()
+    db_names = next(reader)
+    if os.environ.get('TRYTOND_PREFORK'):
+        Pool.prefork(db_names)
+    else:
+        threads = []
+        for name in db_names:
+            thread = threading.Thread(target=Pool(name).init)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
 
 application = app
@@ -33,11 +33,12 @@ class DatabaseInterface(object):
         '''
         raise NotImplementedError
 
-    def get_connection(self, autocommit, readonly=False):
+    def get_connection(self, autocommit, readonly=False, user=None):
         '''Retrieve a connection on the database
 
         :param autocommit: a boolean to activate autocommit
         :param readonly: a boolean to specify if the transaction is readonly
+        :param user: the user of the transaction
         '''
         raise NotImplementedError
 
@@ -48,6 +49,20 @@ class DatabaseInterface(object):
         '''
         raise NotImplementedError
 
+    def written(self, connection, user):
+        "Register the writes of the user before the commit of the connection"
+        pass
+
+    def get_pool_stats(self):
+        '''Return the statistics of the connection pool
+
+        The dictionary contains the keys: size, in_use, idle, created,
+        checkouts, reuses, waits, wait_time, wait_histogram and max_age.
+        wait_histogram is a list of (upper bound in seconds, count) with
+        None as the last bound.
+        '''
+        raise NotImplementedError
+
     def close(self):
         '''
         Close all connection
@@ -176,6 +191,10 @@ class DatabaseInterface(object):
         "Return if database supports window functions."
         return False
 
+    def has_update_from(self):
+        "Return if database supports FROM clause in UPDATE."
+        return False
+
     def has_unaccent(self):
         "Return if database supports unaccentuated searches"
         return False
@@ -1,14 +1,15 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from itertools import count
+import re
 import time
 import logging
 import os
 import urllib.parse
 import json
-from datetime import datetime
 from decimal import Decimal
-from threading import RLock
+from threading import Lock, RLock, Condition
 
 try:
     from psycopg2cffi import compat
@@ -17,7 +18,7 @@ except ImportError:
     pass
 from psycopg2 import connect, Binary
 from psycopg2.pool import ThreadedConnectionPool, PoolError
-from psycopg2.extensions import cursor
+from psycopg2.extensions import cursor, connection as _connection
 from psycopg2.extensions import ISOLATION_LEVEL_REPEATABLE_READ
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from psycopg2.extensions import register_type, register_adapter
@@ -28,7 +29,7 @@ except ImportError:
     PYDATE, PYDATETIME, PYTIME, PYINTERVAL = None, None, None, None
 from psycopg2 import IntegrityError as DatabaseIntegrityError
 from psycopg2 import OperationalError as DatabaseOperationalError
-from psycopg2 import ProgrammingError
+from psycopg2 import ProgrammingError, DatabaseError
 from psycopg2.extras import register_default_json, register_default_jsonb
 
 from sql import Flavor, Cast, For
@@ -36,6 +37,7 @@ from sql.functions import Function
 from sql.operators import BinaryOperator
 
 from trytond.backend.database import DatabaseInterface, SQLType
+from .table import invalidate_snapshot
 from trytond.config import config, parse_uri
 from trytond.tools.gevent import is_gevent_monkey_patched
 
@@ -53,6 +55,30 @@ _timeout = config.getint('database', 'timeout')
 _minconn = config.getint('database', 'minconn', default=1)
 _maxconn = config.getint('database', 'maxconn', default=64)
 _default_name = config.get('database', 'default_name', default='template1')
+_replicas = list(filter(None,
+        config.get('database', 'replicas', default='').splitlines()))
+_replica_retry = config.getint('database', 'replica_retry', default=30)
+_replica_write_cache = config.getfloat(
+    'database', 'replica_write_cache', default=1)
+_wait_buckets = (0.01, 0.1, 1, 10, None)
+_prepare_threshold = config.getint(
+    'database', 'prepare_threshold', default=0)
+_prepare_size = config.getint('database', 'prepare_size', default=256)
+_prepare_stats = {
+    'prepared': 0,
+    'executions': 0,
+    'evictions': 0,
+    'failures': 0,
+    'saved_time': 0.,
+    }
+_prepare_stats_lock = Lock()
+_placeholder = re.compile(r'%([%s])')
+
+
+def _parse_lsn(lsn):
+    "Return the WAL location as an integer"
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
 
 
 def unescape_quote(s):
@@ -78,6 +104,7 @@ class PerfCursor(cursor):
     def execute(self, query, vars=None):
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug(self.mogrify(query, vars))
+        invalidate_snapshot(self.connection, query)
         try:
             context = analyze_before(self)
         except Exception:
@@ -106,6 +133,194 @@ class PerfCursor(cursor):
         return ret
 
 
+def _add_prepare_stats(**values):
+    "Add the values to the statistics of the prepared statements"
+    with _prepare_stats_lock:
+        for name, value in values.items():
+            _prepare_stats[name] += value
+
+
+def _to_prepare(query):
+    "Return the query with numbered parameters for PREPARE"
+    index = count(1)
+
+    def replace(match):
+        if match.group(1) == '%':
+            return '%'
+        return '$%s' % next(index)
+    return _placeholder.sub(replace, query)
+
+
+class _StatementCache(object):
+    "LRU cache of the statements prepared on a connection"
+    __slots__ = ('size', 'seen', 'statements', 'failed', 'names')
+
+    def __init__(self, size):
+        self.size = size
+        # query: [executions, duration]
+        self.seen = OrderedDict()
+        # query: (name, average duration before preparation)
+        self.statements = OrderedDict()
+        # query: None
+        self.failed = OrderedDict()
+        self.names = count()
+
+
+class PreparedConnection(_connection):
+    "Connection which keeps a cache of prepared statements"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statement_cache = _StatementCache(_prepare_size)
+
+
+class PreparedCursor(PerfCursor):
+    """Cursor which prepares the SELECT queries executed more than
+    prepare_threshold times on its connection"""
+
+    def execute(self, query, vars=None):
+        conn = self.connection
+        cache = getattr(conn, 'statement_cache', None)
+        if (cache is None
+                or conn.autocommit
+                or not isinstance(query, str)
+                or not isinstance(vars, (tuple, list))
+                or not query.startswith('SELECT ')):
+            return super().execute(query, vars)
+        if query in cache.failed:
+            cache.failed.move_to_end(query)
+            return super().execute(query, vars)
+
+        statement = cache.statements.get(query)
+        if statement is not None:
+            cache.statements.move_to_end(query)
+            name, average = statement
+            if vars:
+                execute = 'EXECUTE %s (%s)' % (
+                    name, ', '.join(['%s'] * len(vars)))
+            else:
+                execute = 'EXECUTE %s' % name
+            start = time.perf_counter()
+            ret = super().execute(execute, vars)
+            duration = time.perf_counter() - start
+            _add_prepare_stats(
+                executions=1, saved_time=max(average - duration, 0))
+            return ret
+
+        start = time.perf_counter()
+        ret = super().execute(query, vars)
+        duration = time.perf_counter() - start
+        seen = cache.seen.get(query)
+        if seen is None:
+            seen = cache.seen[query] = [0, 0]
+            # Keep only the statistics of the most recent queries
+            while len(cache.seen) > cache.size * 4:
+                cache.seen.popitem(last=False)
+        else:
+            cache.seen.move_to_end(query)
+        seen[0] += 1
+        seen[1] += duration
+        if seen[0] >= _prepare_threshold:
+            self._prepare(cache, query, seen[1] / seen[0])
+        return ret
+
+    def _prepare(self, cache, query, average):
+        del cache.seen[query]
+        name = 'trytond_%s' % next(cache.names)
+        # Use an other cursor to not loose the result of the current query
+        # and a savepoint as a failure would abort the transaction
+        cursor_ = self.connection.cursor(cursor_factory=cursor)
+        try:
+            cursor_.execute('SAVEPOINT trytond_prepare')
+            try:
+                cursor_.execute(
+                    'PREPARE %s AS %s' % (name, _to_prepare(query)))
+            except DatabaseError:
+                logger.debug('prepare failed', exc_info=True)
+                cursor_.execute('ROLLBACK TO SAVEPOINT trytond_prepare')
+                cache.failed[query] = None
+                while len(cache.failed) > cache.size * 4:
+                    cache.failed.popitem(last=False)
+                _add_prepare_stats(failures=1)
+                return
+            finally:
+                cursor_.execute('RELEASE SAVEPOINT trytond_prepare')
+            # Prepared statements are not transactional
+            cache.statements[query] = (name, average)
+            _add_prepare_stats(prepared=1)
+            while len(cache.statements) > cache.size:
+                _, (old_name, _) = cache.statements.popitem(last=False)
+                cursor_.execute('DEALLOCATE %s' % old_name)
+                _add_prepare_stats(evictions=1)
+        finally:
+            cursor_.close()
+
+
+class _ConnectionPool(ThreadedConnectionPool):
+    "Threaded connection pool which records statistics"
+
+    def __init__(self, *args, **kwargs):
+        self.created = 0
+        self.checkouts = 0
+        self.reuses = 0
+        self.connected_at = {}
+        super().__init__(*args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key=key)
+        self.created += 1
+        self.connected_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _getconn(self, key=None):
+        reuse = bool(self._pool)
+        conn = super()._getconn(key=key)
+        self.checkouts += 1
+        if reuse:
+            self.reuses += 1
+        return conn
+
+    def _putconn(self, conn, key=None, close=False):
+        super()._putconn(conn, key=key, close=close)
+        if conn.closed:
+            self.connected_at.pop(id(conn), None)
+
+    def _closeall(self):
+        super()._closeall()
+        self.connected_at.clear()
+
+    def get_stats(self):
+        now = time.monotonic()
+        return {
+            'size': self.maxconn,
+            'in_use': len(self._used),
+            'idle': len(self._pool),
+            'created': self.created,
+            'checkouts': self.checkouts,
+            'reuses': self.reuses,
+            'max_age': max(
+                (now - t for t in self.connected_at.values()), default=0),
+            }
+
+
+class _Replica(object):
+    "A connection pool to a read replica"
+    __slots__ = ('pool', 'down_until')
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.down_until = 0
+
+
+def _get_session(conn):
+    "Return the session characteristics of the connection"
+    autocommit = getattr(conn, 'autocommit', None)
+    if autocommit:
+        return (True, None, None)
+    return (autocommit, getattr(conn, 'isolation_level', None),
+        getattr(conn, 'readonly', None))
+
+
 class ForSkipLocked(For):
     def __str__(self):
         assert not self.nowait, "Can not use both NO WAIT and SKIP LOCKED"
@@ -171,7 +386,14 @@ class Database(DatabaseInterface):
 
     _lock = RLock()
     _databases = defaultdict(dict)
+    _idle_check = 0
     _connpool = None
+    _replicas = ()
+    _replica_cycle = None
+    _replica_connections = None
+    _written_lsns = None
+    _written_lock = None
+    _pool_condition = None
     _list_cache = {}
     _list_cache_timestamp = {}
     _search_path = None
@@ -191,11 +413,20 @@ class Database(DatabaseInterface):
         }
 
     def __new__(cls, name=_default_name):
+        now = time.monotonic()
+        # Fast path without lock when the idle databases have been checked
+        # within the timeout, they are closed at most one timeout later
+        inst = cls._databases.get(os.getpid(), {}).get(name)
+        if (inst is not None
+                and not inst._connpool.closed
+                and now - cls._idle_check < _timeout):
+            inst._last_use = now
+            return inst
         with cls._lock:
-            now = datetime.now()
+            cls._idle_check = now
             databases = cls._databases[os.getpid()]
             for database in list(databases.values()):
-                if ((now - database._last_use).total_seconds() > _timeout
+                if (now - database._last_use > _timeout
                         and database.name != name
                         and not database._connpool._used):
                     database.close()
@@ -208,7 +439,7 @@ class Database(DatabaseInterface):
                     minconn = _minconn
                 inst = DatabaseInterface.__new__(cls, name=name)
                 try:
-                    inst._connpool = ThreadedConnectionPool(
+                    inst._connpool = _ConnectionPool(
                         minconn, _maxconn, **cls._connection_params(name),
                         cursor_factory=LoggingCursor)
                     logger.info('connected to "%s"', name)
@@ -218,19 +449,37 @@ class Database(DatabaseInterface):
                     raise
                 else:
                     logger.info('connection to "%s" succeeded', name)
+                # The replicas are connected on demand so an unavailable one
+                # does not prevent to use the primary
+                inst._replicas = [
+                    _Replica(_ConnectionPool(
+                            0, _maxconn,
+                            **cls._connection_params(name, uri=uri),
+                            cursor_factory=LoggingCursor))
+                    for uri in _replicas]
+                inst._replica_cycle = count()
+                inst._replica_connections = {}
+                inst._written_lsns = {}
+                inst._written_lock = Lock()
+                inst._pool_condition = Condition()
+                inst._waits = 0
+                inst._wait_time = 0
+                inst._wait_histogram = [0] * len(_wait_buckets)
                 databases[name] = inst
-            inst._last_use = datetime.now()
+            inst._last_use = now
             return inst
 
     def __init__(self, name=_default_name):
         super(Database, self).__init__(name)
 
     @classmethod
-    def _connection_params(cls, name):
-        uri = parse_uri(config.get('database', 'uri'))
+    def _connection_params(cls, name, uri=None):
+        uri = parse_uri(uri or config.get('database', 'uri'))
         params = {
             'dbname': name,
             }
+        if _prepare_threshold:
+            params['connection_factory'] = PreparedConnection
         if uri.username:
             params['user'] = uri.username
         if uri.password:
@@ -249,38 +498,198 @@ class Database(DatabaseInterface):
     def connect(self):
         return self
 
-    def get_connection(self, autocommit=False, readonly=False):
-        for count in range(config.getint('database', 'retry'), -1, -1):
+    def get_connection(self, autocommit=False, readonly=False, user=None):
+        conn = None
+        if readonly and not autocommit and self._replicas:
+            conn = self._get_replica_connection(user)
+        started = deadline = None
+        while conn is None:
+            # The checkout is retried while holding the condition so a
+            # connection put back before the wait notifies it
+            with self._pool_condition:
+                try:
+                    conn = self._connpool.getconn()
+                except PoolError:
+                    now = time.monotonic()
+                    if started is None:
+                        logger.info('waiting a connection')
+                        started = now
+                        deadline = now + config.getint('database', 'retry')
+                    if now >= deadline or self._connpool.closed:
+                        raise
+                    self._pool_condition.wait(deadline - now)
+                except Exception:
+                    logger.error(
+                        'connection to "%s" failed', self.name, exc_info=True)
+                    raise
+        if started is not None:
+            self._record_wait(time.monotonic() - started)
+        # The session characteristics are kept by the connection between
+        # checkouts and they are sent with the BEGIN of the next transaction
+        if autocommit:
+            session = (True, None, None)
+        else:
+            session = (False, ISOLATION_LEVEL_REPEATABLE_READ, bool(readonly))
+        if _get_session(conn) != session:
+            autocommit_, isolation_level, readonly_ = session
+            if autocommit_:
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            else:
+                conn.set_session(
+                    isolation_level=isolation_level, readonly=readonly_,
+                    autocommit=False)
+        if _prepare_threshold:
+            conn.cursor_factory = PreparedCursor
+        else:
+            conn.cursor_factory = PerfCursor
+        return conn
+
+    def _get_replica_connection(self, user=None):
+        """Return a connection to the next available replica which has
+        replayed the last writes of the user or None"""
+        lsns = self._get_written_lsns(user)
+        now = time.monotonic()
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[
+                next(self._replica_cycle) % len(self._replicas)]
+            if replica.down_until > now:
+                continue
             try:
-                conn = self._connpool.getconn()
-                break
+                conn = replica.pool.getconn()
             except PoolError:
-                if count and not self._connpool.closed:
-                    logger.info('waiting a connection')
-                    time.sleep(1)
-                    continue
-                raise
+                continue
             except Exception:
-                logger.error(
-                    'connection to "%s" failed', self.name, exc_info=True)
-                raise
-        if autocommit:
-            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        else:
-            conn.set_isolation_level(ISOLATION_LEVEL_REPEATABLE_READ)
-        if readonly:
+                logger.warning(
+                    'connection to replica of "%s" failed', self.name,
+                    exc_info=True)
+                replica.down_until = now + _replica_retry
+                continue
+            if conn.closed:
+                replica.pool.putconn(conn, close=True)
+                continue
+            try:
+                replayed = not lsns or self._has_replayed(conn, user, lsns)
+            except DatabaseError:
+                logger.warning(
+                    'replica of "%s" failed', self.name, exc_info=True)
+                replica.pool.putconn(conn, close=True)
+                replica.down_until = now + _replica_retry
+                continue
+            if not replayed:
+                replica.pool.putconn(conn)
+                continue
+            self._replica_connections[id(conn)] = replica.pool
+            return conn
+
+    def _get_written_lsns(self, user):
+        """Return the WAL location of the last writes of the user by backend
+        process of the primary"""
+        if user is None:
+            return {}
+        now = time.monotonic()
+        with self._written_lock:
+            timestamp, lsns = self._written_lsns.get(user, (None, {}))
+        if timestamp is not None and now - timestamp < _replica_write_cache:
+            return lsns
+        # The locations are read from the primary because the other processes
+        # may have committed writes for the user. When it is busy or failing,
+        # the locations known by this process are used.
+        try:
+            with self._pool_condition:
+                conn = self._connpool.getconn()
+        except PoolError:
+            return lsns
+        try:
             cursor = conn.cursor()
-            cursor.execute('SET TRANSACTION READ ONLY')
-        conn.cursor_factory = PerfCursor
-        return conn
+            try:
+                cursor.execute('SELECT pid, lsn FROM ir_replica_write '
+                    'WHERE "user" = %s', (user,))
+                lsns = dict(cursor.fetchall())
+            finally:
+                conn.rollback()
+        except DatabaseError:
+            logger.warning(
+                'unable to get the last writes of user %s on "%s"',
+                user, self.name, exc_info=True)
+            return lsns
+        finally:
+            self.put_connection(conn)
+        with self._written_lock:
+            self._written_lsns[user] = (now, lsns)
+        return lsns
+
+    @staticmethod
+    def _has_replayed(conn, user, lsns):
+        "Test if the replica of the connection has replayed the locations"
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT pid, lsn FROM ir_replica_write '
+                'WHERE "user" = %s', (user,))
+            replayed = dict(cursor.fetchall())
+        finally:
+            conn.rollback()
+        return all(
+            pid in replayed and _parse_lsn(replayed[pid]) >= _parse_lsn(lsn)
+            for pid, lsn in lsns.items())
+
+    def written(self, connection, user):
+        if not self._replicas or user is None:
+            return
+        # The location is stored by the transaction of the writes so a replica
+        # shows it only once it has replayed them. Each backend process has
+        # its own row to not lock the concurrent transactions of the user.
+        cursor = connection.cursor()
+        cursor.execute('INSERT INTO ir_replica_write ("user", pid, lsn) '
+            'VALUES (%s, pg_backend_pid(), pg_current_wal_insert_lsn()::text) '
+            'ON CONFLICT ("user", pid) DO UPDATE SET lsn = EXCLUDED.lsn '
+            'RETURNING pid, lsn', (user,))
+        pid, lsn = cursor.fetchone()
+        with self._written_lock:
+            timestamp, lsns = self._written_lsns.get(user, (None, {}))
+            lsns = dict(lsns)
+            lsns[pid] = lsn
+            self._written_lsns[user] = (timestamp, lsns)
 
     def put_connection(self, connection, close=False):
-        self._connpool.putconn(connection, close=close)
+        connpool = self._connpool
+        if self._replica_connections:
+            connpool = self._replica_connections.pop(
+                id(connection), connpool)
+        if connpool is self._connpool:
+            with self._pool_condition:
+                connpool.putconn(connection, close=close)
+                self._pool_condition.notify()
+        else:
+            connpool.putconn(connection, close=close)
+
+    def _record_wait(self, duration):
+        with self._pool_condition:
+            self._waits += 1
+            self._wait_time += duration
+            for i, bucket in enumerate(_wait_buckets):
+                if bucket is None or duration <= bucket:
+                    self._wait_histogram[i] += 1
+                    break
+
+    def get_pool_stats(self):
+        stats = self._connpool.get_stats()
+        stats.update({
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'wait_histogram': list(
+                    zip(_wait_buckets, self._wait_histogram)),
+                'replicas': [r.pool.get_stats() for r in self._replicas],
+                })
+        with _prepare_stats_lock:
+            stats['prepared_statements'] = dict(_prepare_stats)
+        return stats
 
     def close(self):
         with self._lock:
             logger.info('disconnection from "%s"', self.name)
             self._connpool.closeall()
+            for replica in self._replicas:
+                replica.pool.closeall()
             self._databases[os.getpid()].pop(self.name)
 
     @classmethod
@@ -500,6 +909,9 @@ class Database(DatabaseInterface):
     def has_window_functions(self):
         return True
 
+    def has_update_from(self):
+        return True
+
     @classmethod
     def has_sequence(cls):
         return True
@@ -2,6 +2,8 @@
 # this repository contains the full copyright notices and license terms.
 import re
 import logging
+from contextlib import contextmanager
+from weakref import WeakKeyDictionary
 
 from trytond.transaction import Transaction
 from trytond.backend.table import TableHandlerInterface
@@ -10,6 +12,178 @@ __all__ = ['TableHandler']
 
 logger = logging.getLogger(__name__)
 VARCHAR_SIZE_RE = re.compile(r'VARCHAR\(([0-9]+)\)')
+DDL_RE = re.compile(r'\s*(?:ALTER|CREATE|DROP|COMMENT)\s', re.I)
+DDL_TABLE_RE = re.compile(
+    r'\s*(?:ALTER|CREATE|DROP)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?'
+    r'"?([^"\s(]+)"?(?:\s+RENAME\s+TO\s+"?([^"\s]+)"?)?', re.I)
+DDL_INDEX_RE = re.compile(
+    r'\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s.*?\sON\s+"?([^"\s(]+)"?',
+    re.I | re.S)
+DDL_DROP_INDEX_RE = re.compile(
+    r'\s*DROP\s+INDEX\s+(?:IF\s+EXISTS\s+)?"?([^"\s]+)"?', re.I)
+DDL_SEQUENCE_RE = re.compile(
+    r'\s*CREATE\s+SEQUENCE\s+"?([^"\s]+)"?', re.I)
+DDL_COMMENT_RE = re.compile(
+    r'\s*COMMENT\s+ON\s+(?:TABLE|COLUMN)\s+"?([^"\s.]+)"?', re.I)
+
+# The schema snapshots by connection
+_snapshots = WeakKeyDictionary()
+
+
+class _SchemaSnapshot(object):
+    "The definitions of the tables of the search path"
+    __slots__ = ('tables', 'sequences', 'stale')
+
+    def __init__(self):
+        self.tables = None
+        self.sequences = None
+        self.stale = set()
+
+    def load(self, connection, search_path):
+        cursor = connection.cursor()
+        tables = {}
+        schemas = {}
+        cursor.execute('SELECT c.relname, n.nspname, '
+                'pg_get_userbyid(c.relowner) = current_user, '
+                "obj_description(c.oid, 'pg_class') "
+            'FROM pg_class c '
+                'JOIN pg_namespace n ON (c.relnamespace = n.oid) '
+            "WHERE c.relkind IN ('r', 'p') "
+                'AND n.nspname::text = ANY(%s)', (search_path,))
+        for name, schema, is_owner, comment in cursor.fetchall():
+            # The first schema of the search path wins
+            if (name in schemas
+                    and search_path.index(schemas[name])
+                    < search_path.index(schema)):
+                continue
+            schemas[name] = schema
+            tables[name] = {
+                'schema': schema,
+                'is_owner': is_owner,
+                'comment': comment,
+                'columns': {},
+                'constraints': [],
+                'fk_deltypes': {},
+                'indexes': [],
+                }
+
+        def get(schema, name):
+            if schemas.get(name) == schema:
+                return tables[name]
+
+        cursor.execute('SELECT table_schema, table_name, '
+                'column_name, udt_name, is_nullable, '
+                'character_maximum_length, column_default, '
+                "col_description(format('%%I.%%I', table_schema, table_name)"
+                    '::regclass, ordinal_position) '
+            'FROM information_schema.columns '
+            'WHERE table_schema::text = ANY(%s)', (search_path,))
+        for (schema, name, column, typname, nullable, size, default,
+                comment) in cursor.fetchall():
+            table = get(schema, name)
+            if table is not None:
+                table['columns'][column] = {
+                    'typname': typname,
+                    'notnull': True if nullable == 'NO' else False,
+                    'size': size,
+                    'default': default,
+                    'comment': comment,
+                    }
+
+        cursor.execute('SELECT table_schema, table_name, constraint_name '
+            'FROM information_schema.table_constraints '
+            'WHERE table_schema::text = ANY(%s)', (search_path,))
+        constraints = cursor.fetchall()
+        cursor.execute('SELECT nr.nspname, r.relname, c.conname '
+            'FROM pg_namespace nc, '
+                'pg_namespace nr, '
+                'pg_constraint c, '
+                'pg_class r '
+            'WHERE nc.oid = c.connamespace AND nr.oid = r.relnamespace '
+                'AND c.conrelid = r.oid '
+                "AND c.contype = 'x' "  # exclude type
+                "AND r.relkind IN ('r', 'p') "
+                'AND nr.nspname::text = ANY(%s)', (search_path,))
+        constraints += cursor.fetchall()
+        for schema, name, constraint in constraints:
+            table = get(schema, name)
+            if table is not None:
+                table['constraints'].append(constraint)
+
+        cursor.execute('SELECT k.table_schema, k.table_name, '
+                'k.column_name, r.delete_rule '
+            'FROM information_schema.key_column_usage AS k '
+            'JOIN information_schema.referential_constraints AS r '
+            'ON r.constraint_schema = k.constraint_schema '
+            'AND r.constraint_name = k.constraint_name '
+            'WHERE k.table_schema::text = ANY(%s)', (search_path,))
+        for schema, name, column, delete_rule in cursor.fetchall():
+            table = get(schema, name)
+            if table is not None:
+                table['fk_deltypes'][column] = delete_rule
+
+        cursor.execute("SELECT n.nspname, cl.relname, cl2.relname "
+            "FROM pg_index ind "
+                "JOIN pg_class cl on (cl.oid = ind.indrelid) "
+                "JOIN pg_namespace n ON (cl.relnamespace = n.oid) "
+                "JOIN pg_class cl2 on (cl2.oid = ind.indexrelid) "
+            "WHERE n.nspname::text = ANY(%s)", (search_path,))
+        for schema, name, index in cursor.fetchall():
+            table = get(schema, name)
+            if table is not None:
+                table['indexes'].append(index)
+
+        cursor.execute('SELECT sequence_name '
+            'FROM information_schema.sequences '
+            'WHERE sequence_schema::text = ANY(%s)', (search_path,))
+        self.sequences = {n for n, in cursor.fetchall()}
+        self.tables = tables
+        self.stale.clear()
+
+    def get(self, table_name):
+        "Return the definitions of the table, False if missing or None"
+        if self.tables is None or table_name in self.stale:
+            return None
+        return self.tables.get(table_name, False)
+
+    def invalidate(self, query):
+        "Invalidate the tables modified by the DDL query"
+        match = DDL_TABLE_RE.match(query)
+        if match:
+            self.stale.update(filter(None, match.groups()))
+            return
+        match = DDL_INDEX_RE.match(query)
+        if match:
+            self.stale.add(match.group(1))
+            return
+        match = DDL_DROP_INDEX_RE.match(query)
+        if match and self.tables is not None:
+            index = match.group(1)
+            for name, table in self.tables.items():
+                if index in table['indexes']:
+                    self.stale.add(name)
+                    return
+        match = DDL_SEQUENCE_RE.match(query)
+        if match:
+            if self.sequences is not None:
+                self.sequences.add(match.group(1))
+            return
+        match = DDL_COMMENT_RE.match(query)
+        if match:
+            self.stale.add(match.group(1))
+            return
+        # Unknown statement so the snapshot will be reloaded
+        self.tables = self.sequences = None
+
+
+def invalidate_snapshot(connection, query):
+    "Invalidate the schema snapshot of the connection for the query"
+    if (_snapshots
+            and isinstance(query, str)
+            and DDL_RE.match(query)):
+        snapshot = _snapshots.get(connection)
+        if snapshot is not None:
+            snapshot.invalidate(query)
 
 
 class TableHandler(TableHandlerInterface):
@@ -25,36 +199,55 @@ class TableHandler(TableHandlerInterface):
 
         transaction = Transaction()
         cursor = transaction.connection.cursor()
+        snapshot = _snapshots.get(transaction.connection)
+        if snapshot is not None and snapshot.tables is None:
+            snapshot.load(
+                transaction.connection, transaction.database.search_path)
         # Create sequence if necessary
-        if not transaction.database.sequence_exist(
-                transaction.connection, self.sequence_name):
+        if snapshot is not None and snapshot.sequences is not None:
+            sequence_exist = self.sequence_name in snapshot.sequences
+        else:
+            sequence_exist = transaction.database.sequence_exist(
+                transaction.connection, self.sequence_name)
+        if not sequence_exist:
             transaction.database.sequence_create(
                 transaction.connection, self.sequence_name)
 
+        definitions = snapshot.get(self.table_name) if snapshot else None
         # Create new table if necessary
-        if not self.table_exist(self.table_name):
+        if definitions is False or (
+                definitions is None and not self.table_exist(self.table_name)):
             cursor.execute('CREATE TABLE "%s" ()' % self.table_name)
-        self.table_schema = transaction.database.get_table_schema(
-            transaction.connection, self.table_name)
-
-        cursor.execute('SELECT tableowner = current_user FROM pg_tables '
-            'WHERE tablename = %s AND schemaname = %s',
-            (self.table_name, self.table_schema))
-        self.is_owner, = cursor.fetchone()
+            definitions = None
+        if definitions:
+            self.table_schema = definitions['schema']
+            self.is_owner = definitions['is_owner']
+            comment = definitions['comment']
+        else:
+            self.table_schema = transaction.database.get_table_schema(
+                transaction.connection, self.table_name)
+            cursor.execute('SELECT tableowner = current_user, '
+                    "obj_description(format('%%I.%%I', schemaname, tablename)"
+                        "::regclass, 'pg_class') "
+                'FROM pg_tables '
+                'WHERE tablename = %s AND schemaname = %s',
+                (self.table_name, self.table_schema))
+            self.is_owner, comment = cursor.fetchone()
 
-        if model.__doc__ and self.is_owner:
+        if model.__doc__ and self.is_owner and comment != model.__doc__:
             cursor.execute('COMMENT ON TABLE "%s" IS \'%s\'' %
                 (self.table_name, model.__doc__.replace("'", "''")))
+            comment = model.__doc__
+        self._comment = comment
 
         self._update_definitions(columns=True)
         if 'id' not in self._columns:
             if not self.history:
                 cursor.execute('ALTER TABLE "%s" '
                     'ADD COLUMN id INTEGER '
-                    'DEFAULT nextval(\'"%s"\') NOT NULL'
+                    'DEFAULT nextval(\'"%s"\') NOT NULL, '
+                    'ADD PRIMARY KEY(id)'
                     % (self.table_name, self.sequence_name))
-                cursor.execute('ALTER TABLE "%s" '
-                    'ADD PRIMARY KEY(id)' % self.table_name)
             else:
                 cursor.execute('ALTER TABLE "%s" '
                     'ADD COLUMN id INTEGER' % self.table_name)
@@ -62,10 +255,9 @@ class TableHandler(TableHandlerInterface):
         if self.history and '__id' not in self._columns:
             cursor.execute('ALTER TABLE "%s" '
                 'ADD COLUMN __id INTEGER '
-                'DEFAULT nextval(\'"%s"\') NOT NULL' %
+                'DEFAULT nextval(\'"%s"\') NOT NULL, '
+                'ADD PRIMARY KEY(__id)' %
                 (self.table_name, self.sequence_name))
-            cursor.execute('ALTER TABLE "%s" '
-                'ADD PRIMARY KEY(__id)' % self.table_name)
         else:
             default = "nextval('%s'::regclass)" % self.sequence_name
             if self.history:
@@ -80,6 +272,19 @@ class TableHandler(TableHandlerInterface):
                     % (self.table_name, default))
         self._update_definitions()
 
+    @classmethod
+    @contextmanager
+    def schema_snapshot(cls):
+        connection = Transaction().connection
+        if connection in _snapshots:
+            yield
+            return
+        _snapshots[connection] = _SchemaSnapshot()
+        try:
+            yield
+        finally:
+            del _snapshots[connection]
+
     @staticmethod
     def table_exist(table_name):
         transaction = Transaction()
@@ -128,23 +333,39 @@ class TableHandler(TableHandlerInterface):
             columns=None, constraints=None, indexes=None):
         if columns is None and constraints is None and indexes is None:
             columns = constraints = indexes = True
-        cursor = Transaction().connection.cursor()
+        connection = Transaction().connection
+        snapshot = _snapshots.get(connection)
+        definitions = snapshot.get(self.table_name) if snapshot else None
+        if definitions:
+            if columns:
+                self._columns = definitions['columns']
+            if constraints:
+                self._constraints = definitions['constraints']
+                self._fk_deltypes = definitions['fk_deltypes']
+            if indexes:
+                self._indexes = definitions['indexes']
+            return
+        cursor = connection.cursor()
         if columns:
             self._columns = {}
             # Fetch columns definitions from the table
             cursor.execute('SELECT '
                 'column_name, udt_name, is_nullable, '
                 'character_maximum_length, '
-                'column_default '
+                'column_default, '
+                "col_description(format('%%I.%%I', table_schema, table_name)"
+                    '::regclass, ordinal_position) '
                 'FROM information_schema.columns '
                 'WHERE table_name = %s AND table_schema = %s',
                 (self.table_name, self.table_schema))
-            for column, typname, nullable, size, default in cursor.fetchall():
+            for (column, typname, nullable, size, default,
+                    comment) in cursor.fetchall():
                 self._columns[column] = {
                     'typname': typname,
                     'notnull': True if nullable == 'NO' else False,
                     'size': size,
                     'default': default,
+                    'comment': comment,
                     }
 
         if constraints:
@@ -189,6 +410,20 @@ class TableHandler(TableHandlerInterface):
                 (self.table_name, self.table_schema))
             self._indexes = [l[0] for l in cursor.fetchall()]
 
+        if (snapshot is not None and snapshot.tables is not None
+                and columns and constraints and indexes):
+            # Store the definitions refreshed after the modification
+            snapshot.tables[self.table_name] = {
+                'schema': self.table_schema,
+                'is_owner': self.is_owner,
+                'comment': self._comment,
+                'columns': self._columns,
+                'constraints': self._constraints,
+                'fk_deltypes': self._fk_deltypes,
+                'indexes': self._indexes,
+                }
+            snapshot.stale.discard(self.table_name)
+
     @property
     def _field2module(self):
         cursor = Transaction().connection.cursor()
@@ -241,7 +476,9 @@ class TableHandler(TableHandlerInterface):
         field_size = int(match.group(1)) if match else None
 
         def add_comment():
-            if comment and self.is_owner:
+            if (comment and self.is_owner
+                    and self._columns.get(column_name, {}).get('comment')
+                    != comment):
                 cursor.execute('COMMENT ON COLUMN "%s"."%s" IS \'%s\'' %
                     (self.table_name, column_name, comment.replace("'", "''")))
         if self.column_exist(column_name):
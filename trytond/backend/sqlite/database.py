@@ -313,6 +313,10 @@ class Database(DatabaseInterface):
 
     _local = threading.local()
     _conn = None
+    _stats_lock = threading.Lock()
+    _created = 0
+    _checkouts = 0
+    _in_use = 0
     flavor = Flavor(
         paramstyle='qmark', function_mapping=MAPPING, null_ordering=False)
     IN_MAX = 200
@@ -350,6 +354,8 @@ class Database(DatabaseInterface):
         self._conn = sqlite.connect(path,
             detect_types=sqlite.PARSE_DECLTYPES | sqlite.PARSE_COLNAMES,
             factory=SQLiteConnection)
+        with Database._stats_lock:
+            Database._created += 1
         self._conn.create_function('extract', 2, SQLiteExtract.extract)
         self._conn.create_function('date_trunc', 2, date_trunc)
         self._conn.create_function('split_part', 3, split_part)
@@ -393,17 +399,39 @@ class Database(DatabaseInterface):
         self._conn.execute('PRAGMA foreign_keys = ON')
         return self
 
-    def get_connection(self, autocommit=False, readonly=False):
+    def get_connection(self, autocommit=False, readonly=False, user=None):
         if self._conn is None:
             self.connect()
         if autocommit:
             self._conn.isolation_level = None
         else:
             self._conn.isolation_level = 'IMMEDIATE'
+        with Database._stats_lock:
+            Database._checkouts += 1
+            Database._in_use += 1
         return self._conn
 
     def put_connection(self, connection=None, close=False):
-        pass
+        with Database._stats_lock:
+            Database._in_use = max(Database._in_use - 1, 0)
+
+    def get_pool_stats(self):
+        # There is no pool: each instance opens its own connection (the
+        # memory database is shared per thread) so there is never a wait
+        with Database._stats_lock:
+            size = max(Database._in_use, 1)
+            return {
+                'size': size,
+                'in_use': Database._in_use,
+                'idle': size - Database._in_use,
+                'created': Database._created,
+                'checkouts': Database._checkouts,
+                'reuses': Database._checkouts - Database._created,
+                'waits': 0,
+                'wait_time': 0,
+                'wait_histogram': [],
+                'max_age': 0,
+                }
 
     def close(self):
         if self.name == ':memory:':
@@ -543,6 +571,12 @@ class Database(DatabaseInterface):
     def has_multirow_insert(self):
         return True
 
+    def has_window_functions(self):
+        return sqlite.sqlite_version_info >= (3, 25)
+
+    def has_update_from(self):
+        return sqlite.sqlite_version_info >= (3, 33)
+
     def sql_type(self, type_):
         if type_ in self.TYPES_MAPPING:
             return self.TYPES_MAPPING[type_]
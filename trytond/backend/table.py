@@ -1,6 +1,7 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
 import hashlib
+from contextlib import contextmanager
 
 
 class TableHandlerInterface(object):
@@ -180,6 +181,16 @@ class TableHandlerInterface(object):
         '''
         raise NotImplementedError
 
+    @classmethod
+    @contextmanager
+    def schema_snapshot(cls):
+        '''
+        Context manager during which the definitions of the tables may be
+        read from a snapshot of the schema loaded at once for the connection
+        of the transaction
+        '''
+        yield
+
     @classmethod
     def convert_name(cls, name):
         '''
@@ -47,8 +47,11 @@ def freeze(o):
 
 class BaseCache(object):
     _instances = {}
+    # The names of the caches which depend on each cache
+    _dependents = defaultdict(set)
 
-    def __init__(self, name, size_limit=1024, duration=None, context=True):
+    def __init__(self, name, size_limit=1024, duration=None, context=True,
+            depends=None):
         self._name = name
         self.size_limit = size_limit
         self.context = context
@@ -60,8 +63,24 @@ class BaseCache(object):
             self.duration = dt.timedelta(**duration)
         else:
             self.duration = None
+        # The names of the caches whose clear also clears this cache
+        self.depends = tuple(depends or ())
         assert self._name not in self._instances
         self._instances[self._name] = self
+        for name in self.depends:
+            self._dependents[name].add(self._name)
+
+    @classmethod
+    def _with_dependents(cls, names):
+        "Return the names with the names of the caches depending on them"
+        result = set()
+        names = list(names)
+        while names:
+            name = names.pop()
+            if name not in result:
+                result.add(name)
+                names.extend(cls._dependents.get(name, ()))
+        return result
 
     def _key(self, key):
         if self.context:
@@ -157,8 +176,10 @@ class MemoryCache(BaseCache):
 
     def clear(self):
         transaction = Transaction()
-        self._reset.setdefault(transaction, set()).add(self._name)
-        self._transaction_cache.pop(transaction, None)
+        reset = self._reset.setdefault(transaction, set())
+        for name in self._with_dependents([self._name]):
+            reset.add(name)
+            self._instances[name]._transaction_cache.pop(transaction, None)
 
     def _clear(self, dbname, timestamp=None):
         logger.debug("clearing cache '%s' of '%s'", self._name, dbname)
@@ -92,6 +92,8 @@ def get_parser_admin():
         default=[], metavar='CODE', help="Load language translations")
     parser.add_argument("--hostname", dest="hostname", default=None,
         help="Limit database listing to the hostname")
+    parser.add_argument("--compile-views", dest="compile_views",
+        action="store_true", help="Compile the views of the models")
 
     parser.epilog = ('The first time a database is initialized '
         'or when the password is set, the admin password is read '
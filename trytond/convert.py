@@ -45,6 +45,8 @@ class MenuitemTagHandler:
 
     def startElement(self, name, attributes):
         cursor = Transaction().connection.cursor()
+        # The action and its views must exist to compute the icon
+        self.mh.flush()
 
         values = {}
 
@@ -222,6 +224,7 @@ class RecordTagHandler:
             pyson_attr = bool(int(attributes.get('pyson', '0')))
 
             if search_attr:
+                self.mh.flush()
                 search_model = self.model._fields[field_name].model_name
                 SearchModel = self.mh.pool.get(search_model)
                 with Transaction().set_context(active_test=False):
@@ -422,9 +425,15 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
         self.noupdate = None
         self.module_state = module_state
         self.grouped = None
+        # The model of the records waiting to be created or written
+        self.grouped_model = None
         self.grouped_creations = defaultdict(dict)
         self.grouped_write = defaultdict(list)
         self.grouped_model_data = []
+        # The module and fs_id of the records waiting to be created or written
+        self.grouped_pending = set()
+        # The number of created and written records and the duration by model
+        self.timings = defaultdict(lambda: [0, 0, 0.])
         self.skip_data = False
         self.modules = modules
 
@@ -471,7 +480,7 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
                 self.taghandler = self.taghandlerlist[name]
             elif name == "data":
                 self.noupdate = bool(int(attributes.get("noupdate", '0')))
-                self.grouped = bool(int(attributes.get('grouped', 0)))
+                self.grouped = bool(int(attributes.get('grouped', 1)))
                 self.skip_data = False
                 depends = attributes.get('depends', '').split(',')
                 depends = {m.strip() for m in depends if m}
@@ -493,17 +502,8 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
 
     def endElement(self, name):
 
-        if name == 'data' and self.grouped:
-            for model, values in self.grouped_creations.items():
-                self.create_records(model, values.values(), values.keys())
-            self.grouped_creations.clear()
-            for key, actions in self.grouped_write.items():
-                module, model = key
-                self.write_records(module, model, *actions)
-            self.grouped_write.clear()
-        if name == 'data' and self.grouped_model_data:
-            self.ModelData.write(*self.grouped_model_data)
-            del self.grouped_model_data[:]
+        if name == 'data':
+            self.flush()
 
         # Closing tag found, if we are in a delegation the handler
         # know what to do:
@@ -518,12 +518,39 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
         else:
             return ''
 
+    def flush(self):
+        "Create and write the grouped records"
+        for model, values in self.grouped_creations.items():
+            self.create_records(model, list(values.values()), list(values))
+        self.grouped_creations.clear()
+        self.grouped_pending.clear()
+        for key, actions in self.grouped_write.items():
+            module, model = key
+            self.write_records(module, model, *actions)
+        self.grouped_write.clear()
+        if self.grouped_model_data:
+            self.ModelData.write(*self.grouped_model_data)
+            del self.grouped_model_data[:]
+
+    def log_timings(self, prefix):
+        created = sum(t[0] for t in self.timings.values())
+        written = sum(t[1] for t in self.timings.values())
+        duration = sum(t[2] for t in self.timings.values())
+        logger.info('%s:%s records created and %s written in %.3fs',
+            prefix, created, written, duration)
+        for model, (created, written, duration) in sorted(
+                self.timings.items(), key=lambda i: i[1][2], reverse=True):
+            logger.debug('%s:%s: %s created and %s written in %.3fs',
+                prefix, model, created, written, duration)
+
     def get_id(self, xml_id):
 
         if '.' in xml_id:
             module, xml_id = xml_id.split('.')
         else:
             module = self.module
+        if (module, xml_id) in self.grouped_pending:
+            self.flush()
 
         if self.fs2db.get(module, xml_id) is None:
             raise Exception("Reference to %s not found"
@@ -584,6 +611,15 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
 
         Model = self.pool.get(model)
 
+        if (module, fs_id) in self.grouped_pending:
+            # The record is defined again
+            self.flush()
+        if self.grouped and model != self.grouped_model:
+            # Only the records of the same model are grouped to keep the
+            # order between the models
+            self.flush()
+            self.grouped_model = model
+
         if self.fs2db.exists(module, fs_id):
 
             # Remove this record from the to_delete list. This means that
@@ -677,17 +713,20 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
             if self.grouped:
                 self.grouped_write[(module, model)].extend(
                     (record, to_update, old_values, values, fs_id, mdata_id))
+                self.grouped_pending.add((module, fs_id))
             else:
                 self.write_records(module, model,
                     record, to_update, old_values, values, fs_id, mdata_id)
         else:
             if self.grouped:
                 self.grouped_creations[model][fs_id] = values
+                self.grouped_pending.add((module, fs_id))
             else:
                 self.create_records(model, [values], [fs_id])
 
     def create_records(self, model, vlist, fs_ids):
         Model = self.pool.get(model)
+        start = time.perf_counter()
 
         with Transaction().set_context(module=self.module, language='en'):
             records = Model.create(vlist)
@@ -720,11 +759,15 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
                     })
         self.fs2db.reset_browsercord(self.module, model,
             [r.id for r in records])
+        timing = self.timings[model]
+        timing[0] += len(records)
+        timing[2] += time.perf_counter() - start
 
     def write_records(self, module, model,
             record, values, old_values, new_values, fs_id, mdata_id, *args):
         args = (record, values, old_values, new_values, fs_id, mdata_id) + args
         Model = self.pool.get(model)
+        start = time.perf_counter()
 
         actions = iter(args)
         to_update = []
@@ -773,6 +816,9 @@ class TrytondXmlHandler(sax.handler.ContentHandler):
 
         # reset_browsercord to keep cache memory low
         self.fs2db.reset_browsercord(module, Model.__name__, args[::6])
+        timing = self.timings[model]
+        timing[1] += len(to_update) // 2
+        timing[2] += time.perf_counter() - start
 
 
 def post_import(pool, module, to_delete):
@@ -43,6 +43,7 @@ def register():
         ui.menu.UIMenu,
         ui.menu.UIMenuFavorite,
         ui.view.View,
+        ui.view.ViewCompiled,
         ui.view.ShowViewStart,
         ui.view.ViewTreeWidth,
         ui.view.ViewTreeState,
@@ -85,6 +86,7 @@ def register():
         module.ModuleActivateUpgradeStart,
         module.ModuleActivateUpgradeDone,
         cache.Cache,
+        cache.ReplicaWrite,
         date.Date,
         trigger.Trigger,
         trigger.TriggerLog,
@@ -112,3 +114,5 @@ def register():
         model.ModelGraph,
         model.ModelWorkflowGraph,
         module='ir', type_='report')
+    Pool.register_post_init_hooks(
+        translation.load_catalogs, module='ir')
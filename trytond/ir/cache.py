@@ -1,9 +1,9 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
-from ..model import ModelSQL, fields
+from ..model import ModelSQL, Unique, fields
 
 __all__ = [
-    'Cache',
+    'Cache', 'ReplicaWrite',
     ]
 
 
@@ -12,3 +12,20 @@ class Cache(ModelSQL):
     __name__ = 'ir.cache'
     name = fields.Char('Name', required=True)
     timestamp = fields.DateTime('Timestamp')
+
+
+class ReplicaWrite(ModelSQL):
+    "Replica Write"
+    __name__ = 'ir.replica.write'
+    user = fields.Integer("User", required=True)
+    pid = fields.Integer("Process", required=True)
+    lsn = fields.Char("LSN", required=True)
+
+    @classmethod
+    def __setup__(cls):
+        super().__setup__()
+        table = cls.__table__()
+        cls._sql_constraints += [
+            ('user_pid_unique', Unique(table, table.user, table.pid),
+                'The user and process must be unique!'),
+            ]
@@ -495,30 +495,31 @@ class ModelAccess(DeactivableMixin, ModelSQL, ModelView):
 
         pool = Pool()
         Model = pool.get('ir.model')
-        UserGroup = pool.get('res.user-res.group')
         Group = pool.get('res.group')
+        User = pool.get('res.user')
         cursor = Transaction().connection.cursor()
-        user = Transaction().user
+        groups = User.get_groups_key()
         model_access = cls.__table__()
         ir_model = Model.__table__()
-        user_group = UserGroup.__table__()
         group = Group.__table__()
 
         access = {}
         for model in models:
-            maccess = cls._get_access_cache.get((user, model), default=-1)
+            maccess = cls._get_access_cache.get((groups, model), default=-1)
             if maccess == -1:
                 break
             access[model] = maccess
         else:
             return access
 
+        if groups:
+            in_groups = model_access.group.in_(list(groups))
+        else:
+            in_groups = Literal(False)
         default = {'read': True, 'write': True, 'create': True, 'delete': True}
         access = dict((m, default) for m in models)
         cursor.execute(*model_access.join(ir_model, 'LEFT',
                 condition=model_access.model == ir_model.id
-                ).join(user_group, 'LEFT',
-                condition=user_group.group == model_access.group
                 ).join(group, 'LEFT',
                 condition=model_access.group == group.id
                 ).select(
@@ -537,16 +538,14 @@ class ModelAccess(DeactivableMixin, ModelSQL, ModelView):
                         else_=0)),
                 where=ir_model.model.in_(models)
                 & (model_access.active == Literal(True))
-                & ((
-                        (user_group.user == user)
-                        & (group.active == Literal(True)))
+                & ((in_groups & (group.active == Literal(True)))
                     | (model_access.group == Null)),
                 group_by=ir_model.model))
         access.update(dict(
                 (m, {'read': r, 'write': w, 'create': c, 'delete': d})
                 for m, r, w, c, d in cursor.fetchall()))
         for model, maccess in access.items():
-            cls._get_access_cache.set((user, model), maccess)
+            cls._get_access_cache.set((groups, model), maccess)
         return access
 
     @classmethod
@@ -681,24 +680,27 @@ class ModelFieldAccess(DeactivableMixin, ModelSQL, ModelView):
         pool = Pool()
         Model = pool.get('ir.model')
         ModelField = pool.get('ir.model.field')
-        UserGroup = pool.get('res.user-res.group')
         Group = pool.get('res.group')
-        user = Transaction().user
+        User = pool.get('res.user')
+        groups = User.get_groups_key()
         field_access = cls.__table__()
         ir_model = Model.__table__()
         model_field = ModelField.__table__()
-        user_group = UserGroup.__table__()
         group = Group.__table__()
 
         accesses = {}
         for model in models:
-            maccesses = cls._get_access_cache.get((user, model))
+            maccesses = cls._get_access_cache.get((groups, model))
             if maccesses is None:
                 break
             accesses[model] = maccesses
         else:
             return accesses
 
+        if groups:
+            in_groups = field_access.group.in_(list(groups))
+        else:
+            in_groups = Literal(False)
         default = {}
         accesses = dict((m, default) for m in models)
         cursor = Transaction().connection.cursor()
@@ -706,8 +708,6 @@ class ModelFieldAccess(DeactivableMixin, ModelSQL, ModelView):
                 condition=field_access.field == model_field.id
                 ).join(ir_model,
                 condition=model_field.model == ir_model.id
-                ).join(user_group, 'LEFT',
-                condition=user_group.group == field_access.group
                 ).join(group, 'LEFT',
                 condition=field_access.group == group.id
                 ).select(
@@ -727,15 +727,13 @@ class ModelFieldAccess(DeactivableMixin, ModelSQL, ModelView):
                         else_=0)),
                 where=ir_model.model.in_(models)
                 & (field_access.active == Literal(True))
-                & ((
-                        (user_group.user == user)
-                        & (group.active == Literal(True)))
+                & ((in_groups & (group.active == Literal(True)))
                     | (field_access.group == Null)),
                 group_by=[ir_model.model, model_field.name]))
         for m, f, r, w, c, d in cursor.fetchall():
             accesses[m][f] = {'read': r, 'write': w, 'create': c, 'delete': d}
         for model, maccesses in accesses.items():
-            cls._get_access_cache.set((user, model), maccesses)
+            cls._get_access_cache.set((groups, model), maccesses)
         return accesses
 
     @classmethod
@@ -769,6 +767,31 @@ class ModelFieldAccess(DeactivableMixin, ModelSQL, ModelView):
                     return False
         return True
 
+    @classmethod
+    def get_eager_fields(cls, model_name):
+        '''
+        Return the ordered eager fields of model_name readable by the user.
+        '''
+        pool = Pool()
+        Model = pool.get(model_name)
+        transaction = Transaction()
+        if (transaction.user == 0
+                or not transaction.context.get('_check_access')):
+            return Model._eager_fields
+        User = pool.get('res.user')
+
+        # Stored with the accesses to be cleared at the same time
+        key = (User.get_groups_key(), model_name, 'eager')
+        eager_fields = cls._get_access_cache.get(key)
+        if eager_fields is not None:
+            return eager_fields
+        accesses = cls.get_access([model_name])[model_name]
+        unreadable = {f for f, a in accesses.items() if not a['read']}
+        eager_fields = tuple(
+            f for f in Model._eager_fields if f not in unreadable)
+        cls._get_access_cache.set(key, eager_fields)
+        return eager_fields
+
     @classmethod
     def write(cls, field_accesses, values, *args):
         super(ModelFieldAccess, cls).write(field_accesses, values, *args)
@@ -19,11 +19,13 @@ from trytond.config import config
 from trytond.wsgi import app
 from trytond.protocols.jsonrpc import JSONDecoder
 from trytond.protocols.wrappers import with_pool, with_transaction
-from trytond.tools import slugify
+from trytond.tools import slugify, grouped_slice
 from trytond.transaction import Transaction
 
 SOURCE = config.get(
     'html', 'src', default='https://cloud.tinymce.com/stable/tinymce.min.js')
+# The number of rows sent at once by the data route
+EXPORT_CHUNK = 1000
 
 
 def get_token(record):
@@ -216,40 +218,62 @@ def data(request, pool, model):
         abort(HTTPStatus.BAD_REQUEST)
 
     with transaction.set_context(**context):
-        lang = Lang.get(transaction.language)
-
-        def format_(row):
-            for i, value in enumerate(row):
-                if locale_format:
-                    if isinstance(value, Number):
-                        value = lang.format('%.12g', value)
-                    elif isinstance(value, (dt.date, dt.datetime)):
-                        value = lang.strftime(value)
-                elif isinstance(value, bool):
-                    value = int(value)
-                row[i] = value
-            return row
-
         try:
             if domain and isinstance(domain[0], (int, float)):
-                rows = Model.export_data(domain, fields_names)
+                ids = list(map(int, domain))
             else:
-                rows = Model.export_data_domain(
-                    domain, fields_names,
-                    limit=limit, offset=offset, order=order)
+                ids = list(map(int, Model.search(
+                            domain, limit=limit, offset=offset, order=order)))
+            # Check the fields before streaming
+            Model.export_data_iter([], fields_names)
         except (ValueError, KeyError):
             abort(HTTPStatus.BAD_REQUEST)
+        user, context = transaction.user, transaction.context.copy()
+        filename = slugify(Model.__names__()['model']) + '.csv'
+    filename = filename.encode('latin-1', 'ignore')
+
+    def format_(lang, row):
+        for i, value in enumerate(row):
+            if locale_format:
+                if isinstance(value, Number):
+                    value = lang.format('%.12g', value)
+                elif isinstance(value, (dt.date, dt.datetime)):
+                    value = lang.strftime(value)
+            elif isinstance(value, bool):
+                value = int(value)
+            row[i] = value
+        return row
+
+    def generate():
         data = io.StringIO(newline='')
         writer = csv.writer(data, delimiter=delimiter, quotechar=quotechar)
         if header:
             writer.writerow(fields_names)
-        for row in rows:
-            writer.writerow(format_(row))
-        data = data.getvalue().encode(encoding)
-        filename = slugify(Model.__names__()['model']) + '.csv'
-        filename = filename.encode('latin-1', 'ignore')
-        response = Response(data, mimetype='text/csv; charset=' + encoding)
-        response.headers.add(
-            'Content-Disposition', 'attachment', filename=filename)
-        response.headers.add('Content-Length', len(data))
-        return response
+        # Each chunk is exported in its own transaction so the connection is
+        # not kept while the client reads the response
+        for sub_ids in grouped_slice(ids, EXPORT_CHUNK):
+            sub_ids = list(sub_ids)
+            with Transaction().start(pool.database_name, user,
+                    readonly=True, context=context) as transaction:
+                lang = Lang.get(transaction.language)
+                # Skip the records deleted or no more readable since the
+                # search as the response is already started
+                with transaction.set_context(active_test=False):
+                    existing_ids = set(map(int, Model.search([
+                                    ('id', 'in', sub_ids),
+                                    ])))
+                records = Model.browse(
+                    [i for i in sub_ids if i in existing_ids])
+                for row in Model.export_data_iter(records, fields_names):
+                    writer.writerow(format_(lang, row))
+            yield data.getvalue().encode(encoding)
+            data.seek(0)
+            data.truncate()
+        if data.tell():
+            yield data.getvalue().encode(encoding)
+
+    response = Response(
+        generate(), mimetype='text/csv; charset=' + encoding)
+    response.headers.add(
+        'Content-Disposition', 'attachment', filename=filename)
+    return response
@@ -1,5 +1,6 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
+import json
 from collections import defaultdict
 
 from sql import Literal
@@ -21,6 +22,23 @@ class DomainError(ValidationError):
     pass
 
 
+def groups_only(value):
+    "Test if the JSON of a PYSON depends on the user only by the groups"
+    if isinstance(value, dict):
+        if value.get('__class__') == 'Eval':
+            return value['v'] == 'user.groups'
+        elif (value.get('__class__') == 'Get'
+                and isinstance(value['v'], dict)
+                and value['v'].get('__class__') == 'Eval'
+                and value['v']['v'] == 'user'
+                and value['k'] == 'groups'):
+            return groups_only(value['d'])
+        return all(groups_only(v) for v in value.values())
+    elif isinstance(value, list):
+        return all(groups_only(v) for v in value)
+    return True
+
+
 class RuleGroup(ModelSQL, ModelView):
     "Rule group"
     __name__ = 'ir.rule.group'
@@ -150,7 +168,36 @@ class Rule(ModelSQL, ModelView):
     @staticmethod
     def _get_cache_key():
         # _datetime value will be added to the domain
-        return (Transaction().user, Transaction().context.get('_datetime'))
+        return (Transaction().context.get('_datetime'),)
+
+    @classmethod
+    def _get_shared(cls, model_name, mode='read'):
+        '''
+        Test if the rules of the model depend on the user only by the groups
+        so the domain can be shared by the users with the same groups.
+        '''
+        pool = Pool()
+        RuleGroup = pool.get('ir.rule.group')
+        Model = pool.get('ir.model')
+        rule_table = cls.__table__()
+        rule_group = RuleGroup.__table__()
+        model = Model.__table__()
+
+        key = (model_name, mode)
+        shared = cls._domain_get_cache.get(key)
+        if shared is not None:
+            return shared
+        cursor = Transaction().connection.cursor()
+        cursor.execute(*rule_table.join(rule_group,
+                condition=rule_group.id == rule_table.rule_group
+                ).join(model,
+                condition=rule_group.model == model.id
+                ).select(rule_table.domain,
+                where=(model.model == model_name)
+                & (getattr(rule_group, 'perm_%s' % mode) == Literal(True))))
+        shared = all(groups_only(json.loads(d)) for d, in cursor)
+        cls._domain_get_cache.set(key, shared)
+        return shared
 
     @classmethod
     def get(cls, model_name, mode='read'):
@@ -240,7 +287,15 @@ class Rule(ModelSQL, ModelView):
 
         assert mode in cls.modes
 
-        key = (model_name, mode) + cls._get_cache_key()
+        pool = Pool()
+        User = pool.get('res.user')
+        # The rules depending on other values than the groups are kept per
+        # user
+        if cls._get_shared(model_name, mode=mode):
+            key = (model_name, mode, User.get_groups_key())
+        else:
+            key = (model_name, mode, transaction.user)
+        key += cls._get_cache_key()
         domain = cls._domain_get_cache.get(key, False)
         if domain is not False:
             return domain
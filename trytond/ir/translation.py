@@ -1,12 +1,15 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
 import os
+import time
 import xml.dom.minidom
+from types import MappingProxyType
 from difflib import SequenceMatcher
 from collections import defaultdict
 from io import BytesIO
 from lxml import etree
 import logging
+from threading import Lock
 
 import polib
 from sql import Column, Null, Literal
@@ -28,7 +31,7 @@ from ..tools import file_open, grouped_slice, cursor_dict
 from ..pyson import PYSONEncoder, Eval
 from ..transaction import Transaction
 from ..pool import Pool
-from ..cache import Cache
+from ..cache import Cache, MemoryCache
 from ..config import config
 
 from trytond.ir.lang import get_parent_language as get_parent
@@ -53,6 +56,13 @@ TRANSLATION_TYPE = [
     ('help', 'Help'),
 ]
 
+# The types of the translations loaded in the catalogs
+CATALOG_TYPES = {'field', 'model', 'help', 'selection', 'view'}
+_catalog = config.getboolean('cache', 'translation_catalog', default=False)
+_catalogs = {}
+_catalogs_lock = Lock()
+_catalog_locks = {}
+
 
 class OverriddenError(UserError):
     pass
@@ -107,6 +117,7 @@ class Translation(ModelSQL, ModelView):
 
         table = cls.__table_handler__(module_name)
         table.index_action(['lang', 'type', 'name'], 'add')
+        table.index_action(['module', 'lang'], 'add')
 
     @classmethod
     def register_model(cls, model, module_name):
@@ -509,6 +520,60 @@ class Translation(ModelSQL, ModelView):
                         ])
             cls.delete(translations)
 
+    @classmethod
+    def get_catalog(cls, lang):
+        """Return the catalog of the translations without record of lang
+
+        The catalog maps (name, type, source) to the value and it is shared by
+        all the transactions which see the same state of the cache.
+        Return None if the catalog is not activated or can not be used by the
+        current transaction.
+        """
+        cache = cls._translation_cache
+        if not _catalog or not isinstance(cache, MemoryCache):
+            return None
+        dbname = Transaction().database.name
+        # The database cache is renewed on each clear so it identifies the
+        # state of the translations
+        state = cache._get_cache()
+        if state is not cache._database_cache[dbname]:
+            return None
+        key = (dbname, lang)
+        catalog_state, catalog = _catalogs.get(key, (None, None))
+        if catalog_state is state:
+            return catalog
+        lock = _catalog_locks.get(key)
+        if not lock:
+            with _catalogs_lock:
+                lock = _catalog_locks.setdefault(key, Lock())
+        with lock:
+            # Another thread may have loaded it while waiting for the lock
+            catalog_state, catalog = _catalogs.get(key, (None, None))
+            if catalog_state is not state:
+                catalog = cls._load_catalog(lang)
+                _catalogs[key] = (state, catalog)
+        return catalog
+
+    @classmethod
+    def _load_catalog(cls, lang):
+        start = time.perf_counter()
+        table = cls.__table__()
+        cursor = Transaction().connection.cursor()
+        cursor.execute(*table.select(
+                table.name, table.type, table.src, table.value,
+                where=(table.lang == lang)
+                & (table.res_id == -1)
+                & table.type.in_(list(CATALOG_TYPES))
+                & (table.value != '') & (table.value != Null)
+                & (table.fuzzy == Literal(False))))
+        catalog = {}
+        for name, type_, src, value in cursor:
+            catalog[name, type_, src] = value
+            catalog.setdefault((name, type_, None), value)
+        logger.info('catalog %s loaded with %s entries in %.3fs',
+            lang, len(catalog), time.perf_counter() - start)
+        return MappingProxyType(catalog)
+
     @classmethod
     def get_source(cls, name, ttype, lang, source=None):
         "Return translation for source"
@@ -534,12 +599,25 @@ class Translation(ModelSQL, ModelView):
             return res
 
         to_cache = []
+        catalogs = {}
         for name, ttype, lang, source in args:
             name = str(name)
             ttype = str(ttype)
             lang = str(lang)
             if source is not None:
                 source = str(source)
+            if ttype in CATALOG_TYPES:
+                if lang not in catalogs:
+                    catalogs[lang] = cls.get_catalog(lang)
+                catalog = catalogs[lang]
+                if catalog is not None:
+                    trans = catalog.get((name, ttype, source))
+                    res[(name, ttype, lang, source)] = trans
+                    parent_lang = get_parent(lang)
+                    if trans is None and parent_lang:
+                        parent_args.append((name, ttype, parent_lang, source))
+                        parent_langs.append(lang)
+                    continue
             trans = cls._translation_cache.get((name, ttype, lang, source), -1)
             if trans != -1:
                 res[(name, ttype, lang, source)] = trans
@@ -641,11 +719,15 @@ class Translation(ModelSQL, ModelView):
 
     @property
     def unique_key(self):
-        if self.type in {
+        return self.get_unique_key(self.name, self.res_id, self.type, self.src)
+
+    @staticmethod
+    def get_unique_key(name, res_id, type_, src):
+        if type_ in {
                 'report', 'view', 'wizard_button', 'selection'}:
-            return (self.name, self.res_id, self.type, self.src)
-        elif self.type in ('field', 'model', 'help'):
-            return (self.name, self.res_id, self.type)
+            return (name, res_id, type_, src)
+        elif type_ in ('field', 'model', 'help'):
+            return (name, res_id, type_)
 
     @classmethod
     def from_poentry(cls, entry):
@@ -663,6 +745,9 @@ class Translation(ModelSQL, ModelView):
     def translation_import(cls, lang, module, po_path):
         pool = Pool()
         ModelData = pool.get('ir.model.data')
+        cursor = Transaction().connection.cursor()
+        table = cls.__table__()
+        start = time.perf_counter()
         if isinstance(po_path, str):
             po_path = [po_path]
         models_data = ModelData.search([
@@ -678,152 +763,163 @@ class Translation(ModelSQL, ModelView):
                 fs_id2prop[extra_model][model_data.fs_id] = \
                     (model_data.db_id, model_data.noupdate)
 
-        translations = set()
-        to_save = []
+        def get_translations(module):
+            "Return the ids by unique key and the values by id"
+            key2ids = defaultdict(list)
+            id2values = {}
+            cursor.execute(*table.select(
+                    table.id, table.name, table.res_id, table.type,
+                    table.src, table.value, table.fuzzy,
+                    where=(table.lang == lang) & (table.module == module)))
+            for id_, name, res_id, type_, src, value, fuzzy in cursor:
+                id2values[id_] = (value, bool(fuzzy))
+                # Migration from 5.0: ignore error type
+                if type_ == 'error':
+                    continue
+                key = cls.get_unique_key(name, res_id, type_, src)
+                if not key:
+                    raise ValueError('Unknow translation type: %s' % type_)
+                key2ids[key].append(id_)
+            return key2ids, id2values
+
+        entries, overrides = [], defaultdict(list)
+        for pofile in po_path:
+            for entry in polib.pofile(pofile):
+                if entry.obsolete:
+                    continue
+                translation, res_id = cls.from_poentry(entry)
+                # Migration from 5.0: ignore error type
+                if translation.type == 'error':
+                    continue
+                if '.' in res_id:
+                    res_id_module, res_id = res_id.split('.')
+                    overrides[res_id_module].append((res_id, translation))
+                else:
+                    entries.append((res_id, translation))
+
+        key2ids, id2values = get_translations(module)
+        to_create = {}
+        to_write = defaultdict(list)
+        kept = set()
+        for res_id, translation in entries:
+            noupdate = False
+            model = translation.name.split(',')[0]
+            if (model in fs_id2prop
+                    and res_id in fs_id2prop[model]):
+                res_id, noupdate = fs_id2prop[model][res_id]
 
-        id2translation = {}
-        key2ids = {}
-        module_translations = cls.search([
-                ('lang', '=', lang),
-                ('module', '=', module),
-                ], order=[])
-        for translation in module_translations:
-            # Migration from 5.0: ignore error type
-            if translation.type == 'error':
-                continue
-            key = translation.unique_key
+            if res_id:
+                try:
+                    res_id = int(res_id)
+                except ValueError:
+                    res_id = None
+            if not res_id:
+                res_id = -1
+
+            key = cls.get_unique_key(
+                translation.name, res_id, translation.type, translation.src)
             if not key:
                 raise ValueError('Unknow translation type: %s' %
                     translation.type)
-            key2ids.setdefault(key, []).append(translation.id)
-            if len(module_translations) <= config.getint('cache', 'record'):
-                id2translation[translation.id] = translation
-
-        def override_translation(ressource_id, new_translation):
-            res_id_module, res_id = ressource_id.split('.')
-            # AKE: logging for debug
-            logger.debug('Overriding translation of %s (%s)' % (res_id_module,
-                    new_translation.name))
-            if res_id:
-                model_data, = ModelData.search([
-                        ('module', '=', res_id_module),
-                        ('fs_id', '=', res_id),
-                        ])
-                res_id = model_data.db_id
-            else:
-                res_id = -1
-            with Transaction().set_context(module=res_id_module):
-                domain = [
-                    ('name', '=', new_translation.name),
-                    ('res_id', '=', res_id),
-                    ('lang', '=', new_translation.lang),
-                    ('type', '=', new_translation.type),
-                    ('module', '=', res_id_module),
-                    ]
-                if new_translation.type in {
-                        'report', 'view', 'wizard_button', 'selection'}:
-                    domain.append(('src', '=', new_translation.src))
-                # AKE: avoir crash when no transalation
-                found = cls.search(domain)
-                if found:
-                    translation, = found
+            values = (translation.value, bool(translation.fuzzy))
+            ids = key2ids.get(key)
+            if not ids:
+                to_create[key] = {
+                    'name': translation.name,
+                    'res_id': res_id,
+                    'lang': lang,
+                    'type': translation.type,
+                    'src': translation.src,
+                    'value': translation.value,
+                    'fuzzy': translation.fuzzy,
+                    'module': module,
+                    }
+                continue
+            kept.update(ids)
+            if noupdate:
+                continue
+            for translation_id in ids:
+                if id2values[translation_id] != values:
+                    id2values[translation_id] = values
+                    to_write[values].append(translation_id)
+
+        to_override = defaultdict(list)
+        for res_id_module, module_entries in overrides.items():
+            fs_id2db_id = {}
+            fs_ids = list({r for r, _ in module_entries if r})
+            for sub_fs_ids in grouped_slice(fs_ids):
+                for model_data in ModelData.search([
+                            ('module', '=', res_id_module),
+                            ('fs_id', 'in', list(sub_fs_ids)),
+                            ]):
+                    fs_id2db_id[model_data.fs_id] = model_data.db_id
+            module_key2ids, module_id2values = get_translations(res_id_module)
+            for res_id, translation in module_entries:
+                # AKE: logging for debug
+                logger.debug('Overriding translation of %s (%s)' % (
+                        res_id_module, translation.name))
+                if res_id:
+                    if res_id not in fs_id2db_id:
+                        raise ValueError('Missing model data %s.%s'
+                            % (res_id_module, res_id))
+                    res_id = fs_id2db_id[res_id]
                 else:
-                    translation = None
+                    res_id = -1
+                ids = module_key2ids.get(cls.get_unique_key(
+                        translation.name, res_id, translation.type,
+                        translation.src))
+                # AKE: avoir crash when no transalation
+                if not ids:
                     logger.warning('Impossible to find translation %s'
                         ' from module %s for lang %s' % (
-                            new_translation.name,
+                            translation.name,
                             res_id_module,
-                            new_translation.lang,
+                            lang,
                             ))
-                if translation and translation.value != new_translation.value:
-                    translation.value = new_translation.value
-                    translation.overriding_module = module
-                    translation.fuzzy = new_translation.fuzzy
-                    return translation
-
-        # Make a first loop to retreive translation ids in the right order to
-        # get better read locality and a full usage of the cache.
-        translation_ids = []
-        if len(module_translations) <= config.getint('cache', 'record'):
-            processes = (True,)
-        else:
-            processes = (False, True)
-        for processing in processes:
-            if (processing
-                    and len(module_translations) > config.getint('cache',
-                        'record')):
-                id2translation = dict((t.id, t)
-                    for t in cls.browse(translation_ids))
-            for pofile in po_path:
-                for entry in polib.pofile(pofile):
-                    if entry.obsolete:
-                        continue
-                    translation, res_id = cls.from_poentry(entry)
-                    # Migration from 5.0: ignore error type
-                    if translation.type == 'error':
-                        continue
-                    translation.lang = lang
-                    translation.module = module
-                    noupdate = False
-
-                    if '.' in res_id:
-                        to_save.append(override_translation(res_id,
-                                translation))
-                        continue
-
-                    model = translation.name.split(',')[0]
-                    if (model in fs_id2prop
-                            and res_id in fs_id2prop[model]):
-                        res_id, noupdate = fs_id2prop[model][res_id]
-
-                    if res_id:
-                        try:
-                            res_id = int(res_id)
-                        except ValueError:
-                            res_id = None
-                    if not res_id:
-                        res_id = -1
-
-                    translation.res_id = res_id
-                    key = translation.unique_key
-                    if not key:
-                        raise ValueError('Unknow translation type: %s' %
-                            translation.type)
-                    ids = key2ids.get(key, [])
-
-                    if not processing:
-                        translation_ids.extend(ids)
-                        continue
-
-                    if not ids:
-                        to_save.append(translation)
-                    else:
-                        for translation_id in ids:
-                            old_translation = id2translation[translation_id]
-                            if not noupdate:
-                                old_translation.value = translation.value
-                                old_translation.fuzzy = translation.fuzzy
-                                to_save.append(old_translation)
-                            else:
-                                translations.add(old_translation)
+                    continue
+                for translation_id in ids:
+                    if (module_id2values[translation_id][0]
+                            != translation.value):
+                        module_id2values[translation_id] = (
+                            translation.value, bool(translation.fuzzy))
+                        to_override[(
+                                translation.value,
+                                bool(translation.fuzzy))].append(
+                            translation_id)
+
+        args = []
+        for (value, fuzzy), ids in to_write.items():
+            args.extend((cls.browse(ids), {
+                        'value': value,
+                        'fuzzy': fuzzy,
+                        }))
+        for (value, fuzzy), ids in to_override.items():
+            args.extend((cls.browse(ids), {
+                        'value': value,
+                        'fuzzy': fuzzy,
+                        'overriding_module': module,
+                        }))
+        if args:
+            cls.write(*args)
         # JCA : Add try catch to help with debugging
         try:
-            cls.save([_f for _f in to_save if _f])
-        except:
+            cls.create(list(to_create.values()))
+        except Exception:
             logger.debug('Failed to save translations')
-            for data in to_save:
-                logging.getLogger().debug('    ' + str(data._save_values))
+            for values in to_create.values():
+                logging.getLogger().debug('    ' + str(values))
             raise
-        translations |= set(to_save)
 
-        if translations:
-            all_translations = set(cls.search([
-                        ('module', '=', module),
-                        ('lang', '=', lang),
-                        ]))
-            translations_to_delete = all_translations - translations
-            cls.delete(list(translations_to_delete))
-        return len(translations)
+        to_delete = set(id2values) - kept
+        if (kept or to_create or to_override) and to_delete:
+            cls.delete(cls.browse(list(to_delete)))
+        count = len(entries) + sum(map(len, overrides.values()))
+        duration = time.perf_counter() - start
+        logger.info('%s:%s %s entries imported in %.3fs (%.3fs per 10k)',
+            module, lang, count, duration,
+            duration * 10000 / count if count else 0)
+        return (len(kept) + len(to_create)
+            + sum(map(len, to_override.values())))
 
     @classmethod
     def translation_export(cls, lang, module):
@@ -885,6 +981,16 @@ class Translation(ModelSQL, ModelView):
             return
 
 
+def load_catalogs(pool, update):
+    "Load the translation catalogs of the translatable languages"
+    if update or not _catalog:
+        return
+    Translation = pool.get('ir.translation')
+    Lang = pool.get('ir.lang')
+    for lang in Lang.get_translatable_languages():
+        Translation.get_catalog(lang)
+
+
 class TranslationSetStart(ModelView):
     "Set Translation"
     __name__ = 'ir.translation.set.start'
@@ -2,6 +2,7 @@
 # this repository contains the full copyright notices and license terms.
 from itertools import groupby
 
+from trytond.cache import Cache, freeze
 from trytond.model import (
     ModelView, ModelSQL, DeactivableMixin, fields, sequence_ordered, tree)
 from trytond.transaction import Transaction
@@ -103,6 +104,12 @@ class UIMenu(DeactivableMixin, sequence_ordered(), tree(separator=' / '),
     action_keywords = fields.One2Many('ir.action.keyword', 'model',
         'Action Keywords')
     favorite = fields.Function(fields.Boolean('Favorite'), 'get_favorite')
+    _menu_tree_cache = Cache('ir_ui_menu.tree', context=False, depends=[
+            'ir_rule.domain_get',
+            'res_user.get_groups',
+            'ir_model_access.get_access',
+            'ir.translation',
+            ])
 
     @classmethod
     def order_complete_name(cls, tables):
@@ -123,14 +130,62 @@ class UIMenu(DeactivableMixin, sequence_ordered(), tree(separator=' / '),
         return sorted(CLIENT_ICONS
             + [(name, name) for _, name in Icon.list_icons()])
 
+    @classmethod
+    def get_menu_tree(cls):
+        """
+        Return a dictionary of the active menus readable by the user with all
+        their parents readable to their parent, complete name and icon.
+        The dictionary is ordered like the menus and it is cached per rule
+        domain (thus per groups) and language.
+        """
+        pool = Pool()
+        Rule = pool.get('ir.rule')
+        transaction = Transaction()
+        key = (
+            freeze(Rule.domain_get(cls.__name__, mode='read')),
+            transaction.language)
+        menus = cls._menu_tree_cache.get(key)
+        if menus is None:
+            with transaction.set_context(active_test=True):
+                ids = list(map(int, super(UIMenu, cls).search([])))
+                rows = {r['id']: r for r in cls.read(
+                        ids, ['parent', 'name', 'icon'])}
+            names = {}
+
+            def complete_name(id_):
+                if id_ not in names:
+                    row = rows.get(id_)
+                    if not row:
+                        names[id_] = None
+                    elif row['parent'] is None:
+                        names[id_] = row['name']
+                    else:
+                        parent_name = complete_name(row['parent'])
+                        if parent_name is None:
+                            names[id_] = None
+                        else:
+                            names[id_] = ' / '.join(
+                                (parent_name, row['name']))
+                return names[id_]
+            menus = []
+            for id_ in ids:
+                name = complete_name(id_)
+                if name is not None:
+                    menus.append(
+                        (id_, rows[id_]['parent'], name, rows[id_]['icon']))
+            cls._menu_tree_cache.set(key, menus)
+        return {m[0]: tuple(m[1:]) for m in menus}
+
     @classmethod
     def search_global(cls, text):
-        # TODO improve search clause
-        for record in cls.search([
-                    ('rec_name', 'ilike', '%%%s%%' % text),
-                    ]):
+        text = text.lower()
+        menus = cls.get_menu_tree()
+        ids = [id_ for id_, (_, name, _) in menus.items()
+            if text in name.lower()]
+        for record in cls.browse(ids):
             if record.action:
-                yield record, record.rec_name, record.icon
+                _, name, icon = menus[record.id]
+                yield record, name, icon
 
     @classmethod
     def search(cls, domain, offset=0, limit=None, order=None, count=False,
@@ -140,7 +195,11 @@ class UIMenu(DeactivableMixin, sequence_ordered(), tree(separator=' / '),
         if query:
             return menus
 
-        if menus:
+        if menus and Transaction().context.get('active_test', True):
+            tree = cls.get_menu_tree()
+            # Re-browse to avoid side-cache access
+            menus = cls.browse([x.id for x in menus if x.id in tree])
+        elif menus:
             parent_ids = {x.parent.id for x in menus if x.parent}
             parents = set()
             for sub_parent_ids in grouped_slice(parent_ids):
@@ -155,6 +214,22 @@ class UIMenu(DeactivableMixin, sequence_ordered(), tree(separator=' / '),
             return len(menus)
         return menus
 
+    @classmethod
+    def create(cls, vlist):
+        menus = super(UIMenu, cls).create(vlist)
+        cls._menu_tree_cache.clear()
+        return menus
+
+    @classmethod
+    def write(cls, *args):
+        super(UIMenu, cls).write(*args)
+        cls._menu_tree_cache.clear()
+
+    @classmethod
+    def delete(cls, menus):
+        super(UIMenu, cls).delete(menus)
+        cls._menu_tree_cache.clear()
+
     @classmethod
     def get_action(cls, menus, name):
         pool = Pool()
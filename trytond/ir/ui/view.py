@@ -6,24 +6,27 @@ import json
 
 from functools import lru_cache
 from lxml import etree
+from sql import Null
 
 from trytond.i18n import gettext
 from trytond.model import ModelView, ModelSQL, fields
 from trytond.model.exceptions import ValidationError
 from trytond.pyson import Eval, Bool, PYSONDecoder, If
-from trytond.tools import file_open
+from trytond.tools import file_open, grouped_slice
 from trytond.transaction import Transaction
 from trytond.wizard import Wizard, StateView, Button
 from trytond.pool import Pool
 from trytond.rpc import RPC
 from trytond.cache import MemoryCache
+from trytond.config import config
 
 __all__ = [
-    'View', 'ShowViewStart', 'ShowView',
+    'View', 'ViewCompiled', 'ShowViewStart', 'ShowView',
     'ViewTreeWidth', 'ViewTreeState', 'ViewSearch',
     ]
 
 logger = logging.getLogger(__name__)
+_compiled = config.getboolean('cache', 'compiled_views', default=False)
 
 
 class XMLError(ValidationError):
@@ -206,22 +209,146 @@ class View(ModelSQL, ModelView):
 
     @classmethod
     def delete(cls, views):
+        pool = Pool()
+        ViewCompiled = pool.get('ir.ui.view.compiled')
+        models = cls._compiled_models(views)
         super(View, cls).delete(views)
         # Restart the cache
         ModelView._fields_view_get_cache.clear()
+        ViewCompiled.clear(models)
 
     @classmethod
     def create(cls, vlist):
+        pool = Pool()
+        ViewCompiled = pool.get('ir.ui.view.compiled')
         views = super(View, cls).create(vlist)
         # Restart the cache
         ModelView._fields_view_get_cache.clear()
+        ViewCompiled.clear(cls._compiled_models(views))
         return views
 
     @classmethod
     def write(cls, views, values, *args):
+        pool = Pool()
+        ViewCompiled = pool.get('ir.ui.view.compiled')
+        all_views = sum(((views, values) + args)[0:None:2], [])
+        models = cls._compiled_models(all_views)
         super(View, cls).write(views, values, *args)
         # Restart the cache
         ModelView._fields_view_get_cache.clear()
+        models |= cls._compiled_models(cls.browse(all_views))
+        ViewCompiled.clear(models)
+
+    @classmethod
+    def _compiled_models(cls, views):
+        "Return the models of the compiled views depending on the views"
+        models = set()
+        for view in views:
+            models.add(view.model)
+            if view.inherit:
+                models.add(view.inherit.model)
+        inheriting = cls.search([
+                ('inherit', 'in', [v.id for v in views]),
+                ])
+        models.update(v.model for v in inheriting)
+        models.discard(None)
+        return models
+
+
+class ViewCompiled(ModelSQL):
+    "View Compiled"
+    __name__ = 'ir.ui.view.compiled'
+    model = fields.Char('Model', required=True, select=True)
+    view = fields.Many2One('ir.ui.view', 'View', ondelete='CASCADE')
+    type = fields.Char('Type', required=True)
+    arch = fields.Text('Architecture', required=True)
+    field_childs = fields.Char('Children Field')
+
+    @classmethod
+    def get(cls, model, view_id=None, view_type='form'):
+        "Return the compiled definition of the view or None"
+        if not _compiled:
+            return None
+        table = cls.__table__()
+        cursor = Transaction().connection.cursor()
+        where = table.model == model
+        if view_id:
+            where &= table.view == view_id
+        else:
+            where &= (table.view == Null) & (table.type == view_type)
+        cursor.execute(*table.select(
+                table.type, table.arch, table.field_childs,
+                where=where, limit=1))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        type_, arch, field_childs = row
+        return {
+            'type': type_,
+            'view_id': view_id,
+            'arch': arch,
+            'field_childs': field_childs,
+            }
+
+    @classmethod
+    def clear(cls, models=None):
+        "Remove the compiled views of the models or all if None"
+        table = cls.__table__()
+        cursor = Transaction().connection.cursor()
+        if models is None:
+            cursor.execute(*table.delete())
+            return
+        for sub_models in grouped_slice(list(models)):
+            cursor.execute(*table.delete(
+                    where=table.model.in_(list(sub_models))))
+
+    @classmethod
+    def compile(cls):
+        '''
+        Store the definition of the views with the inheritance applied.
+        The views depending on the context or of another model are skipped.
+        '''
+        pool = Pool()
+        View = pool.get('ir.ui.view')
+        cls.clear()
+
+        views = View.search([
+                ('inherit', '=', None),
+                ('model', '!=', None),
+                ])
+        keys = set()
+        for view in views:
+            keys.add((view.model, None, view.rng_type))
+            keys.add((view.model, view.id, None))
+
+        to_create = []
+        for model, view_id, view_type in sorted(
+                keys, key=lambda k: (k[0], k[1] or 0, k[2] or '')):
+            try:
+                Model = pool.get(model)
+            except KeyError:
+                continue
+            if not issubclass(Model, ModelView):
+                continue
+            try:
+                result, compilable = Model._fields_view_arch(
+                    view_id, view_type or 'form')
+            except Exception:
+                logger.warning('could not compile view %s of %s',
+                    view_id or view_type, model, exc_info=True)
+                continue
+            if not compilable:
+                continue
+            to_create.append({
+                    'model': model,
+                    'view': view_id,
+                    'type': result['type'],
+                    'arch': result['arch'],
+                    'field_childs': result['field_childs'],
+                    })
+        if to_create:
+            cls.create(to_create)
+        logger.info('%s views compiled', len(to_create))
 
 
 class ShowViewStart(ModelView):
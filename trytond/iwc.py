@@ -62,7 +62,7 @@ class Listener:
                             me = get_worker_id()
                             if 'init_pool' in name and me != name.split(
                                     '|')[-1]:
-                                cls.on_init_pool(dbname)
+                                cls.on_init_pool(dbname, get_modules(name))
         except Exception:
             logger.error(
                 "IWC listener on '%s' crashed", dbname, exc_info=True)
@@ -74,10 +74,14 @@ class Listener:
                     del cls._listener[pid, dbname]
 
     @classmethod
-    def on_init_pool(cls, dbname):
+    def on_init_pool(cls, dbname, modules=None):
         logger.info('Reload pool catched(%s)', dbname)
-        Pool.stop(dbname)
-        Pool(dbname).init()
+        # Updating ir updates all the modules
+        if modules and 'ir' not in modules:
+            Pool(dbname).reload(modules)
+        else:
+            Pool.stop(dbname)
+            Pool(dbname).init()
 
     @classmethod
     def stop(cls):
@@ -104,15 +108,25 @@ def get_worker_id():
     return '%s-%s' % (os.environ.get('HOSTNAME', 'localhost'), os.getpid())
 
 
-def broadcast_init_pool(dbname):
+def get_modules(name):
+    "Return the updated modules of the init_pool notification or None"
+    parts = name.split('|')
+    if len(parts) == 3 and parts[1]:
+        return parts[1].split(',')
+
+
+def broadcast_init_pool(dbname, modules=None):
     database = backend.Database(dbname)
     conn = database.get_connection()
+    if modules:
+        name = 'init_pool|%s|%s' % (','.join(modules), get_worker_id())
+    else:
+        name = 'init_pool|%s' % get_worker_id()
     try:
         cursor = conn.cursor()
         cursor.execute(
             'NOTIFY "%s", %%s' % 'ir_update',
-            (json.dumps(['init_pool|%s' % get_worker_id()],
-                separators=(',', ':')),))
+            (json.dumps([name], separators=(',', ':')),))
         conn.commit()
     finally:
         database.put_connection(conn)
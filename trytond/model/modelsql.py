@@ -6,8 +6,8 @@ from collections import OrderedDict, defaultdict
 from functools import wraps
 
 from sql import (Table, Column, Literal, Desc, Asc, Expression, Null,
-    NullsFirst, NullsLast, For)
-from sql.functions import CurrentTimestamp, Extract
+    NullsFirst, NullsLast, For, Window, Values)
+from sql.functions import CurrentTimestamp, Extract, RowNumber
 from sql.conditionals import Coalesce
 from sql.operators import Or, And, Operator, Equal
 from sql.aggregate import Count, Max
@@ -20,7 +20,7 @@ from trytond.tools import reduce_ids, grouped_slice, cursor_dict
 from trytond.transaction import Transaction
 from trytond.pool import Pool
 from trytond.pyson import PYSONEncoder, PYSONDecoder
-from trytond.cache import LRUDict, freeze
+from trytond.cache import LRUDictTransaction, freeze
 from trytond.exceptions import ConcurrencyException
 from trytond.rpc import RPC
 from trytond.config import config
@@ -332,6 +332,46 @@ class ModelSQL(ModelStorage):
                 if not field.sql_type():
                     continue
                 history_table.add_column(field_name, field._sql_type)
+            history_table.index_action(
+                ['id', 'write_date', '__id'], action='add')
+
+    @classmethod
+    def _history_latest(cls, ids, datetime, _before=False):
+        """Return the condition on the history table to keep the latest
+        revision of each id at the date time"""
+        history = cls.__table_history__()
+        column = Coalesce(history.write_date, history.create_date)
+        where = reduce_ids(history.id, ids)
+        if _before:
+            where &= column < datetime
+        else:
+            where &= column <= datetime
+        order_by = [column.desc, Column(history, '__id').desc]
+        if backend.name == 'postgresql':
+            return history.select(Column(history, '__id'),
+                where=where,
+                order_by=[history.id] + order_by,
+                distinct_on=[history.id])
+        elif Transaction().database.has_window_functions():
+            window = Window([history.id], order_by=order_by)
+            revisions = history.select(
+                Column(history, '__id').as_('__id'),
+                RowNumber(window=window).as_('rank'),
+                where=where)
+            return revisions.select(
+                Column(revisions, '__id'), where=revisions.rank == 1)
+        else:
+            latest = history.select(
+                history.id, Max(column).as_('date'),
+                where=where,
+                group_by=[history.id])
+            revision = cls.__table_history__()
+            return revision.join(latest,
+                condition=(revision.id == latest.id)
+                & (Coalesce(revision.write_date, revision.create_date)
+                    == latest.date)
+                ).select(Max(Column(revision, '__id')),
+                    group_by=[revision.id])
 
     @classmethod
     def __raise_integrity_error(
@@ -381,6 +421,29 @@ class ModelSQL(ModelStorage):
                             gettext('ir.msg_foreign_model_missing',
                                 **error_args))
 
+    @classmethod
+    def __raise_delete_integrity_error(cls, exception, transaction=None):
+        pool = Pool()
+        # Only PostgreSQL reports the name of the violated constraint
+        constraint = getattr(
+            getattr(exception, 'diag', None), 'constraint_name', None)
+        for model_name, field_name, _ in pool.get_reverse_relations(
+                cls.__name__):
+            if not constraint:
+                break
+            Model = pool.get(model_name)
+            if (not issubclass(Model, ModelSQL)
+                    or callable(Model.table_query)):
+                continue
+            # Same name as the one created by TableHandler.add_fk
+            name = backend.TableHandler.convert_name(
+                '%s_%s_fkey' % (Model._table, field_name))
+            if name == constraint:
+                raise ForeignKeyError(
+                    gettext('ir.msg_foreign_model_exist',
+                        **Model.__names__(field_name)))
+        cls.__raise_integrity_error(exception, {}, transaction=transaction)
+
     @classmethod
     def history_revisions(cls, ids):
         pool = Pool()
@@ -477,19 +540,18 @@ class ModelSQL(ModelStorage):
             return all(not v for n, v in zip(fnames, values)
                 if n not in ['id', 'write_uid', 'write_date'])
 
+        revisions = {}
+        for sub_ids in grouped_slice(ids):
+            latest = cls._history_latest(sub_ids, datetime, _before=_before)
+            cursor.execute(*history.select(history.id, *hcolumns,
+                    where=Column(history, '__id').in_(latest)))
+            for row in cursor:
+                revisions[row[0]] = row[1:]
+
         to_delete = []
         to_update = []
         for id_ in ids:
-            column_datetime = Coalesce(history.write_date, history.create_date)
-            if not _before:
-                hwhere = (column_datetime <= datetime)
-            else:
-                hwhere = (column_datetime < datetime)
-            hwhere &= (history.id == id_)
-            horder = (column_datetime.desc, Column(history, '__id').desc)
-            cursor.execute(*history.select(*hcolumns,
-                    where=hwhere, order_by=horder, limit=1))
-            values = cursor.fetchone()
+            values = revisions.get(id_)
             if not values or is_deleted(values):
                 to_delete.append(id_)
             else:
@@ -715,32 +777,64 @@ class ModelSQL(ModelStorage):
         table = cls.__table__()
 
         in_max = transaction.database.IN_MAX
-        history_order = None
-        history_clause = None
-        history_limit = None
+        history_datetime = None
         if (cls._history
                 and transaction.context.get('_datetime')
                 and not callable(cls.table_query)):
-            in_max = 1
+            # The ids are also filtered in the sub-query
+            in_max //= 2
             table = cls.__table_history__()
-            column = Coalesce(table.write_date, table.create_date)
-            if Transaction().context.get('_datetime_exclude', False):
-                history_clause = (column < Transaction().context['_datetime'])
-            else:
-                history_clause = (column <= Transaction().context['_datetime'])
-            history_order = (column.desc, Column(table, '__id').desc)
-            history_limit = 1
+            history_datetime = transaction.context['_datetime']
+            history_before = transaction.context.get(
+                '_datetime_exclude', False)
 
         columns = []
+        # Stored values can be taken from the transaction cache only if they
+        # do not depend on the rules or on a post-processing and if the
+        # transaction can not modify them with raw queries
+        cache = None
+        cached_fields = []
+        if (transaction.readonly
+                and not domain
+                and history_datetime is None
+                and not callable(cls.table_query)):
+            cache = transaction.get_cache().setdefault(
+                cls.__name__, LRUDictTransaction(cache_size()))
         for f in all_fields:
             field = cls._fields.get(f)
             if field and field.sql_type():
                 columns.append(field.sql_column(table).as_(f))
+                if f == 'id':
+                    continue
+                if (hasattr(field, 'get')
+                        or getattr(field, 'translate', False)):
+                    cache = None
+                else:
+                    cached_fields.append(f)
             elif f == '_timestamp' and not callable(cls.table_query):
                 sql_type = fields.Char('timestamp').sql_type().base
                 columns.append(Extract('EPOCH',
                         Coalesce(table.write_date, table.create_date)
                         ).cast(sql_type).as_('_timestamp'))
+                cache = None
+
+        to_fetch = ids
+        if cache is not None and cached_fields:
+            if isinstance(cache, LRUDictTransaction):
+                cache.refresh()
+            to_fetch = []
+            for id_ in dict.fromkeys(ids):
+                values = cache.get(id_)
+                if values and all(f in values for f in cached_fields):
+                    row = {f: values[f] for f in cached_fields}
+                    row['id'] = id_
+                    result.append(row)
+                else:
+                    to_fetch.append(id_)
+            transaction.read_cache_hits += len(result)
+            transaction.read_cache_misses += len(to_fetch)
+        else:
+            cache = None
 
         if len(columns):
             if 'id' not in fields_names:
@@ -751,16 +845,17 @@ class ModelSQL(ModelStorage):
                 tables, dom_exp = cls.search_domain(
                     domain, active_test=False, tables=tables)
             from_ = convert_from(None, tables)
-            for sub_ids in grouped_slice(ids, in_max):
+            for sub_ids in grouped_slice(to_fetch, in_max):
                 sub_ids = list(sub_ids)
                 red_sql = reduce_ids(table.id, sub_ids)
                 where = red_sql
-                if history_clause:
-                    where &= history_clause
+                if history_datetime:
+                    where &= Column(table, '__id').in_(cls._history_latest(
+                            sub_ids, history_datetime,
+                            _before=history_before))
                 if domain:
                     where &= dom_exp
-                cursor.execute(*from_.select(*columns, where=where,
-                        order_by=history_order, limit=history_limit))
+                cursor.execute(*from_.select(*columns, where=where))
                 fetchall = list(cursor_dict(cursor))
                 if not len(fetchall) == len({}.fromkeys(sub_ids)):
                     cls.__check_domain_rule(
@@ -768,6 +863,14 @@ class ModelSQL(ModelStorage):
                     cls.__check_domain_rule(ids, 'read')
                     raise RuntimeError("Undetected access error")
                 result.extend(fetchall)
+                if cache is not None:
+                    for row in fetchall:
+                        cache.setdefault(row['id'], {}).update(
+                            (f, row[f]) for f in cached_fields)
+            if cache is not None:
+                # Keep the order of ids
+                id2row = {r['id']: r for r in result}
+                result = [id2row[i] for i in dict.fromkeys(ids)]
         else:
             result = [{'id': x} for x in ids]
 
@@ -798,7 +901,7 @@ class ModelSQL(ModelStorage):
 
         if getter_fields and cachable_fields:
             cache = transaction.get_cache().setdefault(
-                cls.__name__, LRUDict(cache_size()))
+                cls.__name__, LRUDictTransaction(cache_size()))
             for row in result:
                 if row['id'] not in cache:
                     cache[row['id']] = {}
@@ -1024,6 +1127,34 @@ class ModelSQL(ModelStorage):
 
         cls.trigger_write(trigger_eligibles)
 
+    @classmethod
+    def _get_delete_foreign_keys(cls):
+        """Return the foreign keys to update, delete and check
+        when deleting records"""
+        pool = Pool()
+        foreign_keys_tocheck = []
+        foreign_keys_toupdate = []
+        foreign_keys_todelete = []
+        for model_name, field_name, ondelete in pool.get_reverse_relations(
+                cls.__name__):
+            model = pool.get(model_name)
+            if callable(getattr(model, 'table_query', None)):
+                continue
+            if not issubclass(model, ModelStorage):
+                continue
+            if ondelete == 'CASCADE':
+                foreign_keys_todelete.append((model, field_name))
+            elif ondelete == 'SET NULL':
+                if model._fields[field_name].required:
+                    foreign_keys_tocheck.append((model, field_name))
+                else:
+                    foreign_keys_toupdate.append((model, field_name))
+            else:
+                foreign_keys_tocheck.append((model, field_name))
+        return (
+            foreign_keys_tocheck, foreign_keys_toupdate,
+            foreign_keys_todelete)
+
     @classmethod
     @no_table_query
     def delete(cls, records):
@@ -1062,79 +1193,70 @@ class ModelSQL(ModelStorage):
                     and not hasattr(field, 'set')):
                 has_translation = True
 
-        foreign_keys_tocheck = []
-        foreign_keys_toupdate = []
-        foreign_keys_todelete = []
-        for _, model in pool.iterobject():
-            if callable(getattr(model, 'table_query', None)):
-                continue
-            if not issubclass(model, ModelStorage):
-                continue
-            for field_name, field in model._fields.items():
-                if (isinstance(field, fields.Many2One)
-                        and field.model_name == cls.__name__):
-                    if field.ondelete == 'CASCADE':
-                        foreign_keys_todelete.append((model, field_name))
-                    elif field.ondelete == 'SET NULL':
-                        if field.required:
-                            foreign_keys_tocheck.append((model, field_name))
-                        else:
-                            foreign_keys_toupdate.append((model, field_name))
-                    else:
-                        foreign_keys_tocheck.append((model, field_name))
+        foreign_keys_tocheck, foreign_keys_toupdate, foreign_keys_todelete = (
+            cls._get_delete_foreign_keys())
 
         transaction.delete.setdefault(cls.__name__, set()).update(ids)
         cls.trigger_delete(records)
+        transaction.delete_records.setdefault(cls.__name__,
+            set()).update(ids)
 
-        def get_related_records(Model, field_name, sub_ids):
+        def get_related_records(Model, field_name):
+            "Return all the records of Model linked to the deleted ids"
             if issubclass(Model, ModelSQL):
                 foreign_table = Model.__table__()
-                foreign_red_sql = reduce_ids(
-                    Column(foreign_table, field_name), sub_ids)
-                cursor.execute(*foreign_table.select(foreign_table.id,
-                        where=foreign_red_sql))
-                records = Model.browse([x[0] for x in cursor.fetchall()])
+                related_ids = []
+                for sub_ids in grouped_slice(ids):
+                    foreign_red_sql = reduce_ids(
+                        Column(foreign_table, field_name), sub_ids)
+                    cursor.execute(*foreign_table.select(foreign_table.id,
+                            where=foreign_red_sql))
+                    related_ids.extend(x for x, in cursor)
+                records = Model.browse(related_ids)
             else:
+                records = []
                 with transaction.set_context(active_test=False):
-                    records = Model.search([(field_name, 'in', sub_ids)])
+                    for sub_ids in grouped_slice(ids):
+                        records.extend(Model.search(
+                                [(field_name, 'in', list(sub_ids))]))
             return records
 
-        for sub_ids, sub_records in zip(
-                grouped_slice(ids), grouped_slice(records)):
-            sub_ids = list(sub_ids)
-            red_sql = reduce_ids(table.id, sub_ids)
-
-            transaction.delete_records.setdefault(cls.__name__,
-                set()).update(sub_ids)
-
-            for Model, field_name in foreign_keys_toupdate:
-                if (not hasattr(Model, 'search')
-                        or not hasattr(Model, 'write')):
-                    continue
-                records = get_related_records(Model, field_name, sub_ids)
-                if records:
-                    Model.write(records, {
-                            field_name: None,
-                            })
-
-            for Model, field_name in foreign_keys_todelete:
-                if (not hasattr(Model, 'search')
-                        or not hasattr(Model, 'delete')):
-                    continue
-                records = get_related_records(Model, field_name, sub_ids)
-                if records:
-                    Model.delete(records)
+        # The related records are updated and deleted for all the ids at once
+        # so the dependent models run their own delete only once
+        for Model, field_name in foreign_keys_toupdate:
+            if (not hasattr(Model, 'search')
+                    or not hasattr(Model, 'write')):
+                continue
+            related = get_related_records(Model, field_name)
+            if related:
+                Model.write(related, {
+                        field_name: None,
+                        })
+
+        for Model, field_name in foreign_keys_todelete:
+            if (not hasattr(Model, 'search')
+                    or not hasattr(Model, 'delete')):
+                continue
+            related = get_related_records(Model, field_name)
+            if related:
+                Model.delete(related)
 
-            for Model, field_name in foreign_keys_tocheck:
-                with Transaction().set_context(_check_access=False):
+        for Model, field_name in foreign_keys_tocheck:
+            with Transaction().set_context(_check_access=False):
+                for sub_ids in grouped_slice(ids):
                     if Model.search([
-                                (field_name, 'in', sub_ids),
-                                ], order=[]):
+                                (field_name, 'in', list(sub_ids)),
+                                ], order=[], limit=1):
                         error_args = Model.__names__(field_name)
                         raise ForeignKeyError(
                             gettext('ir.msg_foreign_model_exist',
                                 **error_args))
 
+        for sub_ids, sub_records in zip(
+                grouped_slice(ids), grouped_slice(records)):
+            sub_ids = list(sub_ids)
+            red_sql = reduce_ids(table.id, sub_ids)
+
             super(ModelSQL, cls).delete(list(sub_records))
 
             try:
@@ -1142,15 +1264,15 @@ class ModelSQL(ModelStorage):
             except backend.DatabaseIntegrityError as exception:
                 transaction = Transaction()
                 with Transaction().new_transaction():
-                    cls.__raise_integrity_error(
-                        exception, {}, transaction=transaction)
+                    cls.__raise_delete_integrity_error(
+                        exception, transaction=transaction)
                 raise
 
+        cls._insert_history(ids, deleted=True)
+
         if has_translation:
             Translation.delete_ids(cls.__name__, 'model', ids)
 
-        cls._insert_history(ids, deleted=True)
-
         cls._update_mptt(list(tree_ids.keys()), list(tree_ids.values()))
 
     @classmethod
@@ -1161,17 +1283,15 @@ class ModelSQL(ModelStorage):
         table = cls.__table__()
         transaction = Transaction()
         in_max = transaction.database.IN_MAX
-        history_clause = None
-        limit = None
+        history_datetime = None
         if (mode == 'read'
                 and cls._history
                 and transaction.context.get('_datetime')
                 and not callable(cls.table_query)):
-            in_max = 1
+            # The ids are also filtered in the sub-query
+            in_max //= 2
             table = cls.__table_history__()
-            column = Coalesce(table.write_date, table.create_date)
-            history_clause = (column <= Transaction().context['_datetime'])
-            limit = 1
+            history_datetime = transaction.context['_datetime']
         cursor = transaction.connection.cursor()
         assert mode in Rule.modes
 
@@ -1185,18 +1305,17 @@ class ModelSQL(ModelStorage):
             for sub_ids in grouped_slice(ids, in_max):
                 sub_ids = set(sub_ids)
                 where = reduce_ids(table.id, sub_ids)
-                if history_clause:
-                    where &= history_clause
+                if history_datetime:
+                    where &= Column(table, '__id').in_(cls._history_latest(
+                            sub_ids, history_datetime))
                 if domain:
                     where &= dom_exp
-                cursor.execute(
-                    *from_.select(table.id, where=where, limit=limit))
+                cursor.execute(*from_.select(table.id, where=where))
                 rowcount = cursor.rowcount
                 if rowcount == -1 or rowcount is None:
                     rowcount = len(cursor.fetchall())
                 if rowcount != len(sub_ids):
-                    cursor.execute(
-                        *from_.select(table.id, where=where, limit=limit))
+                    cursor.execute(*from_.select(table.id, where=where))
                     result.extend(
                         sub_ids.difference([x for x, in cursor]))
             return result
@@ -1323,7 +1442,7 @@ class ModelSQL(ModelStorage):
         rows = list(cursor_dict(cursor, transaction.database.IN_MAX))
         cache = transaction.get_cache()
         if cls.__name__ not in cache:
-            cache[cls.__name__] = LRUDict(cache_size())
+            cache[cls.__name__] = LRUDictTransaction(cache_size())
         delete_records = transaction.delete_records.setdefault(cls.__name__,
             set())
 
@@ -1483,7 +1602,7 @@ class ModelSQL(ModelStorage):
                     for id_ in ids:
                         cls._update_tree(id_, field_name,
                             field.left, field.right)
-                else:
+                elif nested_create or not cls._insert_tree(ids, field_name):
                     cls._rebuild_tree(field_name, None, 0)
 
     @classmethod
@@ -1493,23 +1612,104 @@ class ModelSQL(ModelStorage):
         '''
         cursor = Transaction().connection.cursor()
         table = cls.__table__()
+        field = cls._fields[parent]
+
+        childs = defaultdict(list)
+        current = {}
+        cursor.execute(*table.select(table.id, Column(table, parent),
+                Column(table, field.left), Column(table, field.right),
+                order_by=table.id))
+        for id_, parent_, left_, right_ in cursor:
+            childs[parent_].append(id_)
+            current[id_] = (left_, right_)
+
+        # Iterative depth-first traversal to not be limited by the recursion
+        values = []
         right = left + 1
+        stack = [(parent_id, left, iter(childs[parent_id]))]
+        while stack:
+            node, node_left, node_childs = stack[-1]
+            child = next(node_childs, None)
+            if child is not None:
+                stack.append((child, right, iter(childs.get(child, []))))
+                right += 1
+                continue
+            stack.pop()
+            if node and current.get(node) != (node_left, right):
+                values.append((node, node_left, right))
+            right += 1
 
-        cursor.execute(*table.select(table.id,
-                where=Column(table, parent) == parent_id))
-        childs = cursor.fetchall()
+        cls._set_tree_values(parent, values)
+        return right
 
-        for child_id, in childs:
-            right = cls._rebuild_tree(parent, child_id, right)
+    @classmethod
+    def _insert_tree(cls, ids, field_name):
+        '''
+        Insert new leaves in the tree by batch of parent.
+        Return False if some records are not new leaves.
+        '''
+        cursor = Transaction().connection.cursor()
+        table = cls.__table__()
+        field = cls._fields[field_name]
+        left = Column(table, field.left)
+        right = Column(table, field.right)
+        parent = Column(table, field_name)
 
-        field = cls._fields[parent]
+        childs = defaultdict(list)
+        for sub_ids in grouped_slice(ids):
+            cursor.execute(*table.select(table.id, parent, left, right,
+                    where=reduce_ids(table.id, sub_ids),
+                    order_by=table.id))
+            for id_, parent_id, left_, right_ in cursor:
+                if left_ != 0 or right_ != 0:
+                    return False
+                childs[parent_id].append(id_)
+
+        for parent_id, sub_ids in childs.items():
+            if parent_id is None:
+                continue
+            size = 2 * len(sub_ids)
+            cursor.execute(*table.select(right, where=table.id == parent_id))
+            parent_right, = cursor.fetchone()
+            cursor.execute(*table.update([left], [left + size],
+                    where=left >= parent_right))
+            cursor.execute(*table.update([right], [right + size],
+                    where=right >= parent_right))
+            cls._set_tree_values(field_name, [
+                    (id_, parent_right + 2 * i, parent_right + 2 * i + 1)
+                    for i, id_ in enumerate(sub_ids)])
+        if None in childs:
+            cursor.execute(*table.select(
+                    Coalesce(Max(right), 0), where=parent == Null))
+            root_right = cursor.fetchone()[0] + 1
+            cls._set_tree_values(field_name, [
+                    (id_, root_right + 2 * i, root_right + 2 * i + 1)
+                    for i, id_ in enumerate(childs[None])])
+        return True
 
-        if parent_id:
-            cursor.execute(*table.update(
-                    [Column(table, field.left), Column(table, field.right)],
-                    [left, right],
-                    where=table.id == parent_id))
-        return right + 1
+    @classmethod
+    def _set_tree_values(cls, field_name, values):
+        "Write the (id, left, right) values of the tree"
+        transaction = Transaction()
+        cursor = transaction.connection.cursor()
+        table = cls.__table__()
+        field = cls._fields[field_name]
+        left = Column(table, field.left)
+        right = Column(table, field.right)
+        if transaction.database.has_update_from():
+            # Each row uses 3 parameters
+            in_max = transaction.database.IN_MAX // 3
+            for sub_values in grouped_slice(values, in_max):
+                sql_values = Values(list(sub_values))
+                cursor.execute(*table.update([left, right],
+                        [Column(sql_values, 'column2'),
+                            Column(sql_values, 'column3')],
+                        from_=[sql_values],
+                        where=table.id == Column(sql_values, 'column1')))
+        else:
+            for id_, left_value, right_value in values:
+                cursor.execute(*table.update([left, right],
+                        [left_value, right_value], where=table.id == id_))
 
     @classmethod
     def _update_tree(cls, record_id, field_name, left, right):
@@ -24,7 +24,7 @@ from trytond.config import config
 from trytond.i18n import gettext, lazy_gettext
 from trytond.transaction import Transaction
 from trytond.pool import Pool
-from trytond.cache import LRUDict, LRUDictTransaction, freeze
+from trytond.cache import LRUDictTransaction, freeze
 from trytond.rpc import RPC
 from .modelview import ModelView
 from .descriptors import dualmethod
@@ -32,6 +32,8 @@ from .descriptors import dualmethod
 __all__ = ['ModelStorage', 'EvalEnvironment']
 _cache_record = config.getint('cache', 'record')
 _cache_field = config.getint('cache', 'field')
+# The number of records created or written at once by import_data
+_import_batch = 1000
 
 
 class AccessError(UserError):
@@ -130,6 +132,26 @@ class ModelStorage(Model):
                     'import_data': RPC(readonly=False),
                     })
 
+    @classmethod
+    def __post_setup__(cls):
+        super(ModelStorage, cls).__post_setup__()
+        cls._eager_fields = tuple(name for name, field in cls._fields.items()
+            if field.loading == 'eager')
+        cls._function_fields = frozenset(name
+            for name, field in cls._fields.items()
+            if isinstance(field, fields.Function))
+        # The plan is built on first use because the __post_setup__ of the
+        # subclasses may still change the depends, domain or states
+        cls._validation_plan = None
+
+    @classmethod
+    def _get_validation_plan(cls):
+        if cls._validation_plan is None:
+            cls._validation_plan = tuple(_FieldValidation(name, field)
+                for name, field in cls._fields.items()
+                if not isinstance(field, fields.Function))
+        return cls._validation_plan
+
     @staticmethod
     def default_create_uid():
         "Default value for uid field."
@@ -285,14 +307,11 @@ class ModelStorage(Model):
         # Increase transaction counter
         Transaction().counter += 1
 
-        # Clean transaction cache
+        # Clean transaction cache of the model
         for cache in list(Transaction().cache.values()):
-            for cache in (cache, list(
-                        cache.get('_language_cache', {}).values())):
-                if cls.__name__ in cache:
-                    for record in records:
-                        if record.id in cache[cls.__name__]:
-                            del cache[cls.__name__][record.id]
+            for cache in chain([cache],
+                    cache.get('_language_cache', {}).values()):
+                cache.pop(cls.__name__, None)
 
     @classmethod
     @without_check_access
@@ -605,8 +624,148 @@ class ModelStorage(Model):
                 _transaction_cache=transaction_cache,
                 _transaction=transaction) for x in ids]
 
+    @classmethod
+    def prefetch(cls, records, fields_names):
+        '''
+        Load fields_names of records in the caches.
+        Relational fields are followed with '.' at any depth and each level
+        is read once for all the records.
+        The caches keep their size limit so only the records fitting in the
+        cache stay loaded.
+        '''
+        tree = {}
+        for field_name in fields_names:
+            Model, node = cls, tree
+            for name in field_name.split('.'):
+                if Model is not None:
+                    if name not in Model._fields:
+                        raise ValueError('Unknown field "%s" of "%s" in "%s"'
+                            % (name, Model.__name__, field_name))
+                    field = Model._fields[name]
+                elif field._type not in _relation_types:
+                    raise ValueError('Field "%s" of "%s" is not relational'
+                        % (field.name, field_name))
+                node = node.setdefault(name, {})
+                if hasattr(field, 'get_target'):
+                    Model = field.get_target()
+                else:
+                    # The target of reference is known only per record
+                    Model = None
+        cls._prefetch(records, tree)
+
+    @classmethod
+    def _prefetch(cls, records, tree):
+        records = [r for r in records if r.id is not None and r.id >= 0]
+        while records:
+            latter = []
+            group = []
+            first = records[0]
+            transaction = first._transaction
+            user = first._user
+            context = first._context
+            for record in records:
+                if (record._transaction != transaction
+                        or user != record._user
+                        or context != record._context):
+                    latter.append(record)
+                else:
+                    group.append(record)
+            with Transaction().set_current_transaction(transaction), \
+                    transaction.set_user(user), \
+                    transaction.reset_context(), \
+                    transaction.set_context(context):
+                cls._prefetch_level(group, tree)
+            records = latter
+
+    @classmethod
+    def _prefetch_level(cls, records, tree):
+        ffields = {name: cls._fields[name] for name in tree}
+        # add datetime_field and depends of field with context like
+        # __getattr__ does
+        for field in list(ffields.values()):
+            if getattr(field, 'datetime_field', None):
+                ffields[field.datetime_field] = cls._fields[
+                    field.datetime_field]
+        for field in list(ffields.values()):
+            if field.context:
+                for fname in fields.get_eval_fields(field.context):
+                    if fname in field.depends:
+                        ffields[fname] = cls._fields[fname]
+
+        cache = records[0]._cache
+        id2records = defaultdict(list)
+        local_caches = {}
+        for record in records:
+            id2records[record.id].append(record)
+            local_caches[id(record._local_cache)] = record._local_cache
+        for local_cache in local_caches.values():
+            local_cache.refresh()
+
+        # Keep the prefetched records in the caches while walking the levels
+        # and restore the size limits at the end
+        limits = {}
+
+        def extend(lru, size):
+            if id(lru) not in limits:
+                limits[id(lru)] = (lru, lru.size_limit)
+            lru.size_limit = max(lru.size_limit, size)
+        size = len(id2records)
+        for lru in chain(local_caches.values(), [cache]):
+            extend(lru, size)
+
+        def loaded(record, fname):
+            if fname in record._local_cache.get(record.id, {}):
+                return True
+            return (not _local_cached(ffields[fname])
+                and fname in cache.get(record.id, {}))
+
+        try:
+            to_read = [id_ for id_, id_records in id2records.items()
+                if not all(loaded(r, n) for r in id_records for n in ffields)]
+
+            model2ids = {}
+            model2cache = {}
+            for sub_ids in grouped_slice(to_read):
+                for data in cls.read(list(sub_ids), list(ffields.keys())):
+                    id_ = data['id']
+                    for fname, field in ffields.items():
+                        if not _local_cached(field):
+                            continue
+                        fvalue = data[fname]
+                        if field._type in _relation_types:
+                            fvalue = _instantiate(
+                                field, fvalue, data, model2ids, model2cache)
+                        for record in id2records[id_]:
+                            record._local_cache.setdefault(id_, {})[
+                                fname] = fvalue
+                        if not _transaction_cached(field):
+                            del data[fname]
+                    cache.setdefault(id_, {}).update(data)
+            for key, local_cache in model2cache.items():
+                extend(local_cache, len(model2ids[key]))
+
+            for fname, sub_tree in tree.items():
+                if not sub_tree:
+                    continue
+                targets = defaultdict(list)
+                for record in records:
+                    value = getattr(record, fname)
+                    if isinstance(value, ModelStorage):
+                        value = [value]
+                    elif not isinstance(value, (list, tuple)):
+                        continue
+                    for target in value:
+                        if isinstance(target, ModelStorage):
+                            targets[target.__class__].append(target)
+                for Target, sub_records in targets.items():
+                    Target._prefetch(sub_records, sub_tree)
+        finally:
+            for lru, size_limit in limits.values():
+                lru.size_limit = size_limit
+                lru._check_size_limit()
+
     @staticmethod
-    def __export_row(record, fields_names):
+    def __export_row(record, fields_names, invisibles):
         pool = Pool()
         lines = []
         data = ['' for x in range(len(fields_names))]
@@ -627,9 +786,12 @@ class ModelStorage(Model):
                 eModel = pool.get(value.__name__)
                 field = eModel._fields[field_name]
                 if field.states and 'invisible' in field.states:
-                    invisible = _record_eval_pyson(
-                        value, field.states['invisible'])
-                    if invisible:
+                    # The columns of the same field share the evaluation
+                    key = (value.__name__, value.id, field_name)
+                    if key not in invisibles:
+                        invisibles[key] = _record_eval_pyson(
+                            value, field.states['invisible'])
+                    if invisibles[key]:
                         value = ''
                         break
                 if descriptor:
@@ -645,7 +807,7 @@ class ModelStorage(Model):
                     done.append(child_fields_names)
                     for child_record in value:
                         child_lines = ModelStorage.__export_row(child_record,
-                                child_fields_names)
+                                child_fields_names, invisibles)
                         if first:
                             for child_fpos in range(len(fields_names)):
                                 if child_lines and child_lines[0][child_fpos]:
@@ -672,11 +834,35 @@ class ModelStorage(Model):
         The list of values follows fields_names.
         Relational fields are defined with '/' at any depth.
         '''
+        return list(cls.export_data_iter(records, fields_names))
+
+    @classmethod
+    def export_data_iter(cls, records, fields_names):
+        '''
+        Return an iterator over the list of values for each record.
+        The fields of the records are loaded by batch for all the levels.
+        '''
         fields_names = [x.split('/') for x in fields_names]
-        data = []
-        for record in records:
-            data += cls.__export_row(record, fields_names)
-        return data
+        tree = {}
+        for names in fields_names:
+            Model, node = cls, tree
+            for name in names:
+                name = name.split('.', 1)[0]
+                field = Model._fields[name]
+                node = node.setdefault(name, {})
+                if not hasattr(field, 'get_target'):
+                    break
+                Model = field.get_target()
+        return cls.__export_rows(records, fields_names, tree)
+
+    @classmethod
+    def __export_rows(cls, records, fields_names, tree):
+        for sub_records in grouped_slice(records, _cache_record):
+            sub_records = list(sub_records)
+            cls._prefetch(sub_records, tree)
+            invisibles = {}
+            for record in sub_records:
+                yield from cls.__export_row(record, fields_names, invisibles)
 
     @classmethod
     def export_data_domain(
@@ -691,11 +877,15 @@ class ModelStorage(Model):
         The field names of values must be defined in fields_names.
         '''
         pool = Pool()
+        # The ids of the relations found by rec_name before importing
+        resolved = defaultdict(dict)
 
         @lru_cache(maxsize=1000)
         def get_many2one(relation, value):
             if not value:
                 return None
+            if value in resolved[relation]:
+                return resolved[relation][value]
             Relation = pool.get(relation)
             res = Relation.search([
                 ('rec_name', '=', value),
@@ -722,6 +912,9 @@ class ModelStorage(Model):
             Relation = pool.get(relation)
             for word in next(csv.reader(value.splitlines(), delimiter=',',
                     quoting=csv.QUOTE_NONE, escapechar='\\')):
+                if word in resolved[relation]:
+                    res.append(Relation(resolved[relation][word]))
+                    continue
                 res2 = Relation.search([
                     ('rec_name', '=', word),
                     ], limit=2)
@@ -755,6 +948,8 @@ class ModelStorage(Model):
                     gettext('ir.msg_reference_syntax_error',
                         value=value,
                         field=field))
+            if value in resolved[relation]:
+                return '%s,%s' % (relation, resolved[relation][value])
             Relation = pool.get(relation)
             res = Relation.search([
                 ('rec_name', '=', value),
@@ -911,7 +1106,7 @@ class ModelStorage(Model):
             nbrmax = 1
             for field in todo:
                 Relation = pool.get(fields_def[field]['relation'])
-                newfd = Relation.fields_get()
+                newfd = get_fields_def(Relation)
                 newrow, max2, _ = process_lines(
                     data, prefix + [field], newfd, position, klass=Relation)
                 nbrmax = max(nbrmax, max2)
@@ -938,46 +1133,127 @@ class ModelStorage(Model):
                     row[field].append(('create', create))
                 if write:
                     row[field].append(('write',) + tuple(write))
-            if prefix_len == 0:
-                for i in range(max(nbrmax, 1)):
-                    data.pop(0)
             return (row, nbrmax, translate)
 
+        @lru_cache(maxsize=None)
+        def get_fields_def(Relation):
+            return Relation.fields_get()
+
+        def get_column_def(field):
+            "Return the type and the relation of the column"
+            klass = cls
+            for name in field[:-1]:
+                klass = pool.get(get_fields_def(klass)[name]['relation'])
+            name = field[-1]
+            if name.endswith(':id') or ':lang=' in name:
+                return None, None
+            elif name == 'id':
+                return 'many2one', klass.__name__
+            field_def = get_fields_def(klass)[name]
+            return field_def['type'], field_def.get('relation')
+
+        def resolve(relation, values):
+            "Find at once the ids of the relation for the rec_name values"
+            Relation = pool.get(relation)
+            # Only the default search on rec_name matches a known field so
+            # the records can be grouped by the value they matched. The
+            # others are searched one by one.
+            rec_name = Relation._rec_name
+            if (getattr(Relation.search_rec_name, '__func__', None)
+                    is not ModelStorage.search_rec_name.__func__
+                    or rec_name not in Relation._fields):
+                return
+            for sub_values in grouped_slice(values):
+                sub_values = list(sub_values)
+                ids = defaultdict(list)
+                for record in Relation.search([
+                            (rec_name, 'in', sub_values),
+                            ]):
+                    ids[getattr(record, rec_name)].append(record.id)
+                for value in sub_values:
+                    # The others are searched one by one to raise the errors
+                    if len(ids[value]) == 1:
+                        resolved[relation][value], = ids[value]
+
+        def prefetch(data):
+            values = defaultdict(set)
+            for i, field in enumerate(fields_names):
+                ftype, relation = get_column_def(field)
+                if ftype not in {
+                        'many2one', 'one2one', 'many2many', 'reference'}:
+                    continue
+                for line in data:
+                    value = line[i]
+                    if not value or not isinstance(value, str):
+                        continue
+                    if ftype == 'many2many':
+                        values[relation].update(next(csv.reader(
+                                    value.splitlines(), delimiter=',',
+                                    quoting=csv.QUOTE_NONE,
+                                    escapechar='\\')))
+                    elif ftype == 'reference':
+                        if ',' in value:
+                            ref_relation, value = value.split(',', 1)
+                            values[ref_relation].add(value)
+                    elif field[-1] != 'id' or not value.isdigit():
+                        values[relation].add(value)
+            for relation, relation_values in values.items():
+                try:
+                    pool.get(relation)
+                except KeyError:
+                    continue
+                resolve(relation, sorted(relation_values))
+
         ModelData = pool.get('ir.model.data')
 
         len_fields_names = len(fields_names)
         assert all(len(x) == len_fields_names for x in data)
         fields_names = [x.split('/') for x in fields_names]
-        fields_def = cls.fields_get()
+        fields_def = get_fields_def(cls)
+        prefetch(data)
 
         to_create, to_create_translations = [], []
         to_write, to_write_translations = [], []
         languages = set()
-        while len(data):
-            (row, _, translate) = \
-                process_lines(data, [], fields_def)
-            if dispatch(to_create, to_write, row):
-                to_write_translations.append(translate)
-            else:
-                to_create_translations.append(translate)
-            languages.update(translate)
+        count = 0
 
         def translate(records, translations):
             for language in languages:
                 translated = [t.get(language, {}) for t in translations]
-                with Transaction().set_context(language=language):
-                    cls.write(*chain(*filter(itemgetter(1),
-                                zip(([r] for r in records), translated))))
-        count = 0
-        if to_create:
-            records = cls.create(to_create)
-            translate(records, to_create_translations)
-            count += len(records)
-        if to_write:
-            cls.write(*to_write)
-            records = sum(to_write[0:None:2], [])
-            translate(records, to_write_translations)
-            count += len(records)
+                args = list(chain(*filter(itemgetter(1),
+                            zip(([r] for r in records), translated))))
+                if args:
+                    with Transaction().set_context(language=language):
+                        cls.write(*args)
+
+        def flush():
+            nonlocal count
+            if to_create:
+                records = cls.create(to_create)
+                translate(records, to_create_translations)
+                count += len(records)
+            if to_write:
+                cls.write(*to_write)
+                records = sum(to_write[0:None:2], [])
+                translate(records, to_write_translations)
+                count += len(records)
+            for values in [to_create, to_create_translations,
+                    to_write, to_write_translations]:
+                values.clear()
+
+        position = 0
+        while position < len(data):
+            (row, nbrmax, translate_) = \
+                process_lines(data, [], fields_def, position)
+            position += max(nbrmax, 1)
+            if dispatch(to_create, to_write, row):
+                to_write_translations.append(translate_)
+            else:
+                to_create_translations.append(translate_)
+            languages.update(translate_)
+            if (len(to_create) + len(to_write) // 2) >= _import_batch:
+                flush()
+        flush()
         return count
 
     @classmethod
@@ -1025,12 +1301,13 @@ class ModelStorage(Model):
     @without_check_access
     def _validate(cls, records, field_names=None):
         pool = Pool()
+        transaction = Transaction()
         # Ensure that records are readable
-        with Transaction().set_context(_check_access=False):
+        with transaction.set_context(_check_access=False):
             records = cls.browse(records)
 
         ctx_pref = {}
-        if Transaction().user:
+        if transaction.user:
             try:
                 User = pool.get('res.user')
             except KeyError:
@@ -1038,29 +1315,9 @@ class ModelStorage(Model):
             else:
                 ctx_pref = User.get_preferences(context_only=True)
 
-        def is_pyson(test):
-            if isinstance(test, PYSON):
-                return True
-            if isinstance(test, (list, tuple)):
-                for i in test:
-                    if isinstance(i, PYSON):
-                        return True
-                    if isinstance(i, (list, tuple)):
-                        if is_pyson(i):
-                            return True
-            if isinstance(test, dict):
-                for key, value in list(test.items()):
-                    if isinstance(value, PYSON):
-                        return True
-                    if isinstance(value, (list, tuple, dict)):
-                        if is_pyson(value):
-                            return True
-            return False
-
-        def validate_domain(field):
-            if not field.domain:
-                return
-            if field._type in ['dict', 'reference']:
+        def collect_domain(validation, checks):
+            field = validation.field
+            if validation.domain is None:
                 return
             if field._type in ('many2one', 'one2many'):
                 Relation = pool.get(field.model_name)
@@ -1069,17 +1326,16 @@ class ModelStorage(Model):
             else:
                 Relation = cls
             domains = defaultdict(list)
-            if is_pyson(field.domain):
-                pyson_domain = PYSONEncoder().encode(field.domain)
+            if validation.domain_pyson:
                 for record in records:
                     domain = freeze(_record_eval_pyson(
-                            record, pyson_domain, encoded=True))
+                            record, validation.domain, encoded=True))
                     domains[domain].append(record)
                 # Select strategy depending if it is closer to one domain per
                 # record or one domain for all records
                 if len(domains) > len(records) * 0.5:
                     # Do not use IN_MAX to let spaces for the pyson domain
-                    in_max = Transaction().database.IN_MAX
+                    in_max = transaction.database.IN_MAX
                     count = in_max // 10
                     new_domains = {}
                     for sub_domains in grouped_slice(
@@ -1102,10 +1358,13 @@ class ModelStorage(Model):
                     else:
                         domains = new_domains
             else:
-                domains[freeze(field.domain)].extend(records)
+                domains[validation.domain].extend(records)
 
             for domain, sub_records in domains.items():
-                validate_relation_domain(field, sub_records, Relation, domain)
+                relations = relation_domain(field, sub_records)
+                if relations:
+                    checks[Relation, domain].append(
+                        (field, sub_records, relations))
 
         def relation_domain(field, records):
             if field._type in ('many2one', 'one2many', 'many2many', 'one2one'):
@@ -1121,107 +1380,155 @@ class ModelStorage(Model):
                 relations = set(records)
             return relations
 
-        def validate_relation_domain(field, records, Relation, domain):
-            relations = relation_domain(field, records)
-            if relations:
-                for sub_relations in grouped_slice(relations, 1):
-                    sub_relations = set(sub_relations)
+        def search_relation_domains(checks):
+            "Run one search per target model and domain for all the fields"
+            invalids = {}
+            for (Relation, domain), groups in checks.items():
+                ids = set()
+                for _, _, relations in groups:
+                    ids.update(r.id for r in relations)
+                found = set()
+                for sub_ids in grouped_slice(list(ids)):
                     # Use root user to skip access rules
-                    with Transaction().set_user(0):
-                        finds = Relation.search(['AND',
-                                [('id', 'in', [r.id for r in sub_relations])],
-                                domain,
-                                ])
-                    invalid_records = sub_relations - set(finds)
+                    with transaction.set_user(0):
+                        found.update(r.id for r in Relation.search(['AND',
+                                    [('id', 'in', list(sub_ids))],
+                                    domain,
+                                    ]))
+                for field, sub_records, relations in groups:
+                    if field.name in invalids:
+                        continue
+                    invalid_records = [
+                        r for r in relations if r.id not in found]
                     if invalid_records:
-                        invalid_record = invalid_records.pop()
-                        domain = field.domain
-                        if is_pyson(domain):
-                            domain = _record_eval_pyson(records[0], domain)
-                        msg = gettext(
-                            'ir.msg_domain_validation_record',
-                            **cls.__names__(field.name))
-                        fields = set()
-                        level = 0
-                        if field not in Relation._fields.values():
-                            expression = domain_parse(domain)
-                            for variable in expression.variables:
-                                parts = variable.split('.')
-                                fields.add(parts[0])
-                                level = max(level, len(parts))
-                        else:
-                            fields.add(field.name)
-                        for field_name in sorted(fields):
-                            invalid_domain = domain_inversion(
-                                domain, field_name,
-                                EvalEnvironment(invalid_record, Relation))
-                            if isinstance(invalid_domain, bool):
-                                continue
-                            field_def = Relation.fields_get(
-                                [field_name], level=level)
-                            raise DomainValidationError(
-                                msg, domain=(invalid_domain, field_def))
-                        raise DomainValidationError(msg)
+                        invalids[field.name] = (
+                            Relation, sub_records, invalid_records[0])
+            return invalids
+
+        def raise_domain_error(field, Relation, records, invalid_record):
+            domain = field.domain
+            if _is_pyson(domain):
+                domain = _record_eval_pyson(records[0], domain)
+            msg = gettext(
+                'ir.msg_domain_validation_record',
+                **cls.__names__(field.name))
+            fields = set()
+            level = 0
+            if field not in Relation._fields.values():
+                expression = domain_parse(domain)
+                for variable in expression.variables:
+                    parts = variable.split('.')
+                    fields.add(parts[0])
+                    level = max(level, len(parts))
+            else:
+                fields.add(field.name)
+            for field_name in sorted(fields):
+                invalid_domain = domain_inversion(
+                    domain, field_name,
+                    EvalEnvironment(invalid_record, Relation))
+                if isinstance(invalid_domain, bool):
+                    continue
+                field_def = Relation.fields_get(
+                    [field_name], level=level)
+                raise DomainValidationError(
+                    msg, domain=(invalid_domain, field_def))
+            raise DomainValidationError(msg)
+
+        def required_test(value, field_name, field):
+            if ((
+                        isinstance(value,
+                            (type(None), bool, list, tuple, str, dict))
+                        and not value)
+                    or (field._type == 'reference'
+                        and not isinstance(value, ModelStorage))):
+                # JCA : Add log to help debugging
+                logging.getLogger().debug(
+                    'Field %s of %s is required' %
+                    (field_name, cls.__name__))
+                raise RequiredValidationError(
+                    gettext('ir.msg_required_validation_record',
+                        **cls.__names__(field_name)))
+
+        def digits_test(value, digits, field_name):
+            def raise_error(value):
+                error_args = cls.__names__(field_name)
+                error_args['digits'] = digits[1]
+                error_args['value'] = repr(value)
+                raise DigitsValidationError(
+                    gettext('ir.msg_digits_validation_record',
+                        **error_args))
+            if (value is None
+                    or not digits
+                    or any(d is None for d in digits)):
+                return
+            if isinstance(value, Decimal):
+                exp = Decimal('.'.join(['0', '0' * digits[1]]))
+                if value.quantize(exp) != value:
+                    raise_error(value)
+            else:
+                if not (round(value, digits[1]) == float(value)):
+                    raise_error(value)
+
+        def format_test(value, format, field_name):
+            if not value:
+                return
+            if not isinstance(value, datetime.time):
+                value = value.time()
+            if value != datetime.datetime.strptime(
+                    value.strftime(format), format).time():
+                error_args = cls.__names__(field_name)
+                error_args['value'] = value
+                raise TimeFormatValidationError(
+                    gettext('ir.msg_time_format_validation_record',
+                        **error_args))
 
         field_names = set(field_names or [])
-        function_fields = {name for name, field in cls._fields.items()
-            if isinstance(field, fields.Function)}
+        function_fields = cls._function_fields
+        plan = [v for v in cls._get_validation_plan()
+            if not field_names
+            or v.name in field_names
+            or v.depends & field_names
+            or v.depends & function_fields]
         ctx_pref['active_test'] = False
-        with Transaction().set_context(ctx_pref):
-            for field_name, field in cls._fields.items():
-                depends = set(field.depends)
-                if (field_names
-                        and field_name not in field_names
-                        and not (depends & field_names)
-                        and not (depends & function_fields)):
-                    continue
-                if isinstance(field, fields.Function):
-                    continue
+        with transaction.set_context(ctx_pref):
+            # The relation domains of all the fields are checked first to
+            # group the searches but the errors are raised in fields order
+            checks = defaultdict(list)
+            for validation in plan:
+                collect_domain(validation, checks)
+            invalids = search_relation_domains(checks)
+
+            for validation in plan:
+                field_name, field = validation.name, validation.field
+
+                if field_name in invalids:
+                    raise_domain_error(field, *invalids[field_name])
 
-                validate_domain(field)
-
-                def required_test(value, field_name, field):
-                    if ((
-                                isinstance(value,
-                                    (type(None), bool, list, tuple, str, dict))
-                                and not value)
-                            or (field._type == 'reference'
-                                and not isinstance(value, ModelStorage))):
-                        # JCA : Add log to help debugging
-                        logging.getLogger().debug(
-                            'Field %s of %s is required' %
-                            (field_name, cls.__name__))
-                        raise RequiredValidationError(
-                            gettext('ir.msg_required_validation_record',
-                                **cls.__names__(field_name)))
                 # validate states required
-                if field.states and 'required' in field.states:
-                    if is_pyson(field.states['required']):
-                        pyson_required = PYSONEncoder().encode(
-                                field.states['required'])
-                        for record in records:
-                            required = _record_eval_pyson(
-                                record, pyson_required, encoded=True)
-                            if required:
-                                required_test(getattr(record, field_name),
-                                    field_name, field)
-                    else:
-                        if field.states['required']:
-                            for record in records:
-                                required_test(getattr(record, field_name),
-                                    field_name, field)
+                if validation.states_required_pyson:
+                    for record in records:
+                        required = _record_eval_pyson(
+                            record, validation.states_required, encoded=True)
+                        if required:
+                            required_test(getattr(record, field_name),
+                                field_name, field)
+                elif validation.states_required:
+                    for record in records:
+                        required_test(getattr(record, field_name),
+                            field_name, field)
                 # validate required
                 if field.required:
                     for record in records:
                         required_test(
                             getattr(record, field_name), field_name, field)
                 # validate size
-                if hasattr(field, 'size') and field.size is not None:
+                if validation.size is not None:
                     for record in records:
-                        if isinstance(field.size, PYSON):
-                            field_size = _record_eval_pyson(record, field.size)
+                        if validation.size_pyson:
+                            field_size = _record_eval_pyson(
+                                record, validation.size, encoded=True)
                         else:
-                            field_size = field.size
+                            field_size = validation.size
                         size = len(getattr(record, field_name) or '')
                         if (size > field_size >= 0):
                             error_args = cls.__names__(field_name)
@@ -1231,43 +1538,21 @@ class ModelStorage(Model):
                                 gettext('ir.msg_size_validation_record',
                                     **error_args))
 
-                def digits_test(value, digits, field_name):
-                    def raise_error(value):
-                        error_args = cls.__names__(field_name)
-                        error_args['digits'] = digits[1]
-                        error_args['value'] = repr(value)
-                        raise DigitsValidationError(
-                            gettext('ir.msg_digits_validation_record',
-                                **error_args))
-                    if (value is None
-                            or not digits
-                            or any(d is None for d in digits)):
-                        return
-                    if isinstance(value, Decimal):
-                        exp = Decimal('.'.join(['0', '0' * digits[1]]))
-                        if value.quantize(exp) != value:
-                            raise_error(value)
-                    else:
-                        if not (round(value, digits[1]) == float(value)):
-                            raise_error(value)
                 # validate digits
-                if getattr(field, 'digits', None):
-                    if is_pyson(field.digits):
-                        pyson_digits = PYSONEncoder().encode(field.digits)
-                        for record in records:
-                            digits = _record_eval_pyson(
-                                record, pyson_digits, encoded=True)
-                            digits_test(getattr(record, field_name), digits,
-                                field_name)
-                    else:
-                        for record in records:
-                            digits_test(getattr(record, field_name),
-                                field.digits, field_name)
+                if validation.digits_pyson:
+                    for record in records:
+                        digits = _record_eval_pyson(
+                            record, validation.digits, encoded=True)
+                        digits_test(getattr(record, field_name), digits,
+                            field_name)
+                elif validation.digits:
+                    for record in records:
+                        digits_test(getattr(record, field_name),
+                            validation.digits, field_name)
 
                 # validate selection
                 if hasattr(field, 'selection') and field.selection:
-                    if isinstance(field.selection, (tuple, list)):
-                        test = set(dict(field.selection).keys())
+                    test = validation.selection
                     for record in records:
                         value = getattr(record, field_name)
                         if field._type == 'reference':
@@ -1275,7 +1560,7 @@ class ModelStorage(Model):
                                 value = value.__class__.__name__
                             elif value:
                                 value, _ = value.split(',')
-                        if not isinstance(field.selection, (tuple, list)):
+                        if validation.selection is None:
                             sel_func = getattr(cls, field.selection)
                             if not is_instance_method(cls, field.selection):
                                 test = sel_func()
@@ -1285,10 +1570,10 @@ class ModelStorage(Model):
                                 test = set(dict(test))
                             except:
                                 raise Exception((test, field_name, cls))
-                        # None and '' are equivalent
-                        if '' in test or None in test:
-                            test.add('')
-                            test.add(None)
+                            # None and '' are equivalent
+                            if '' in test or None in test:
+                                test.add('')
+                                test.add(None)
                         if field._type != 'multiselection':
                             values = [value]
                         else:
@@ -1306,38 +1591,17 @@ class ModelStorage(Model):
                                         'ir.msg_selection_validation_record',
                                         **error_args))
 
-                def format_test(value, format, field_name):
-                    if not value:
-                        return
-                    if not isinstance(value, datetime.time):
-                        value = value.time()
-                    if value != datetime.datetime.strptime(
-                            value.strftime(format), format).time():
-                        error_args = cls.__names__(field_name)
-                        error_args['value'] = value
-                        raise TimeFormatValidationError(
-                            gettext('ir.msg_time_format_validation_record',
-                                **error_args))
-
                 # validate time format
-                if (field._type in ('datetime', 'time')
-                        and field_name not in ('create_date', 'write_date')):
-                    if is_pyson(field.format):
-                        pyson_format = PYSONDecoder().encode(field.format)
-                        for record in records:
-                            env = EvalEnvironment(record, cls)
-                            env.update(Transaction().context)
-                            env['current_date'] = datetime.datetime.today()
-                            env['time'] = time
-                            env['context'] = Transaction().context
-                            env['active_id'] = record.id
-                            format = PYSONDecoder(env).decode(pyson_format)
-                            format_test(getattr(record, field_name), format,
-                                field_name)
-                    else:
-                        for record in records:
-                            format_test(getattr(record, field_name),
-                                field.format, field_name)
+                if validation.format_pyson:
+                    for record in records:
+                        format = _record_eval_pyson(
+                            record, validation.format, encoded=True)
+                        format_test(getattr(record, field_name), format,
+                            field_name)
+                elif validation.format:
+                    for record in records:
+                        format_test(getattr(record, field_name),
+                            validation.format, field_name)
 
         for record in records:
             record.pre_validate()
@@ -1406,7 +1670,7 @@ class ModelStorage(Model):
     def _cache(self):
         cache = self._transaction_cache
         if self.__name__ not in cache:
-            cache[self.__name__] = LRUDict(cache_size())
+            cache[self.__name__] = LRUDictTransaction(cache_size())
         return cache[self.__name__]
 
     def __getattr__(self, name):
@@ -1442,31 +1706,12 @@ class ModelStorage(Model):
             }
         if field.loading == 'eager' and not skip_eager:
             FieldAccess = Pool().get('ir.model.field.access')
-            fread_accesses = {}
-            fread_accesses.update(FieldAccess.check(self.__name__,
-                list(self._fields.keys()), 'read', access=True))
-            to_remove = set(x for x, y in fread_accesses.items()
-                    if not y and x != name)
-
-            def not_cached(item):
-                fname, field = item
-                return (fname not in self._cache.get(self.id, {})
-                    and fname not in self._local_cache.get(self.id, {}))
-
-            def to_load(item):
-                fname, field = item
-                return (field.loading == 'eager'
-                    and fname not in to_remove)
-
-            def overrided(item):
-                fname, field = item
-                return fname in self._fields
-
-            ifields = filter(to_load,
-                filter(not_cached,
-                    iter(self._fields.items())))
-            ifields = islice(ifields, 0, _cache_field)
-            ffields.update(ifields)
+            cached = self._cache.get(self.id, {})
+            local_cached = self._local_cache.get(self.id, {})
+            ifields = ((fname, self._fields[fname])
+                for fname in FieldAccess.get_eager_fields(self.__name__)
+                if fname not in cached and fname not in local_cached)
+            ffields.update(islice(ifields, 0, _cache_field))
 
         require_context_field = False
         # add datetime_field
@@ -1506,53 +1751,7 @@ class ModelStorage(Model):
             self._transaction.database.IN_MAX)
 
         def instantiate(field, value, data):
-            if field._type in ('many2one', 'one2one', 'reference'):
-                # ABDC: Fix when data is an empty string, we should return
-                # None
-                if value is None or value is False or value == '':
-                    return None
-            elif field._type in ('one2many', 'many2many'):
-                if not value:
-                    return ()
-            try:
-                if field._type == 'reference':
-                    model_name, record_id = value.split(',')
-                    Model = Pool().get(model_name)
-                    try:
-                        record_id = int(record_id)
-                    except ValueError:
-                        return value
-                    if record_id < 0:
-                        return value
-                    value = record_id
-                else:
-                    Model = field.get_target()
-            except KeyError:
-                return value
-            transaction = Transaction()
-            ctx = {}
-            if field.context:
-                pyson_context = PYSONEncoder().encode(field.context)
-                ctx.update(PYSONDecoder(data).decode(pyson_context))
-            datetime_ = None
-            if getattr(field, 'datetime_field', None):
-                datetime_ = data.get(field.datetime_field)
-                ctx = {'_datetime': datetime_}
-            with transaction.set_context(**ctx):
-                kwargs = {}
-                key = (Model, freeze(ctx))
-                kwargs['_local_cache'] = model2cache.setdefault(key,
-                    LRUDictTransaction(cache_size()))
-                kwargs['_ids'] = ids = model2ids.setdefault(key, [])
-                kwargs['_transaction_cache'] = transaction.get_cache()
-                kwargs['_transaction'] = transaction
-                if field._type in ('many2one', 'one2one', 'reference'):
-                    value = int(value)
-                    ids.append(value)
-                    return Model(value, **kwargs)
-                elif field._type in ('one2many', 'many2many'):
-                    ids.extend(int(x) for x in value)
-                    return tuple(Model(id, **kwargs) for id in value)
+            return _instantiate(field, value, data, model2ids, model2cache)
 
         model2ids = {}
         model2cache = {}
@@ -1577,8 +1776,7 @@ class ModelStorage(Model):
             for data in read_data:
                 for fname, field in ffields.items():
                     fvalue = data[fname]
-                    if field._type in ('many2one', 'one2one', 'one2many',
-                            'many2many', 'reference'):
+                    if field._type in _relation_types:
                         fvalue = instantiate(field, data[fname], data)
                     if data['id'] == self.id:
                         if (self._init_values is not None
@@ -1586,17 +1784,12 @@ class ModelStorage(Model):
                             self._init_values[fname] = fvalue
                         if fname == name:
                             value = fvalue
-                    if (field._type not in ('many2one', 'one2one', 'one2many',
-                                'many2many', 'reference', 'binary')
-                            and not isinstance(field, fields.Function)):
+                    if not _local_cached(field):
                         continue
                     if data['id'] not in self._local_cache:
                         self._local_cache[data['id']] = {}
                     self._local_cache[data['id']][fname] = fvalue
-                    if (field._type not in ('many2one', 'reference')
-                            or field.context
-                            or getattr(field, 'datetime_field', None)
-                            or isinstance(field, fields.Function)):
+                    if not _transaction_cached(field):
                         del data[fname]
                 if data['id'] not in self._cache:
                     self._cache[data['id']] = {}
@@ -1786,6 +1979,76 @@ class EvalEnvironment(dict):
         return bool(self._record)
 
 
+_relation_types = {
+    'many2one', 'one2one', 'one2many', 'many2many', 'reference'}
+
+
+def _local_cached(field):
+    "Test if the value of field is stored in the local cache"
+    return (field._type in _relation_types
+        or field._type == 'binary'
+        or isinstance(field, fields.Function))
+
+
+def _transaction_cached(field):
+    "Test if the read value of a local cached field stays in the cache"
+    return (field._type in ('many2one', 'reference')
+        and not field.context
+        and not getattr(field, 'datetime_field', None)
+        and not isinstance(field, fields.Function))
+
+
+def _instantiate(field, value, data, model2ids, model2cache):
+    "Return the instance(s) for the value read of the relation field"
+    if field._type in ('many2one', 'one2one', 'reference'):
+        # ABDC: Fix when data is an empty string, we should return
+        # None
+        if value is None or value is False or value == '':
+            return None
+    elif field._type in ('one2many', 'many2many'):
+        if not value:
+            return ()
+    try:
+        if field._type == 'reference':
+            model_name, record_id = value.split(',')
+            Model = Pool().get(model_name)
+            try:
+                record_id = int(record_id)
+            except ValueError:
+                return value
+            if record_id < 0:
+                return value
+            value = record_id
+        else:
+            Model = field.get_target()
+    except KeyError:
+        return value
+    transaction = Transaction()
+    ctx = {}
+    if field.context:
+        pyson_context = PYSONEncoder().encode(field.context)
+        ctx.update(PYSONDecoder(data).decode(pyson_context))
+    datetime_ = None
+    if getattr(field, 'datetime_field', None):
+        datetime_ = data.get(field.datetime_field)
+        ctx = {'_datetime': datetime_}
+    with transaction.set_context(**ctx):
+        kwargs = {}
+        key = (Model, freeze(ctx))
+        kwargs['_local_cache'] = model2cache.setdefault(key,
+            LRUDictTransaction(cache_size()))
+        kwargs['_ids'] = ids = model2ids.setdefault(key, [])
+        kwargs['_transaction_cache'] = transaction.get_cache()
+        kwargs['_transaction'] = transaction
+        if field._type in ('many2one', 'one2one', 'reference'):
+            value = int(value)
+            ids.append(value)
+            return Model(value, **kwargs)
+        elif field._type in ('one2many', 'many2many'):
+            ids.extend(int(x) for x in value)
+            return tuple(Model(id, **kwargs) for id in value)
+
+
 def _record_eval_pyson(record, source, encoded=False):
     transaction = Transaction()
     if not encoded:
@@ -1802,3 +2065,70 @@ def _record_eval_pyson(record, source, encoded=False):
 
 
 _pyson_encoder = PYSONEncoder()
+
+
+def _is_pyson(test):
+    if isinstance(test, PYSON):
+        return True
+    if isinstance(test, (list, tuple)):
+        for i in test:
+            if isinstance(i, PYSON):
+                return True
+            if isinstance(i, (list, tuple)):
+                if _is_pyson(i):
+                    return True
+    if isinstance(test, dict):
+        for key, value in list(test.items()):
+            if isinstance(value, PYSON):
+                return True
+            if isinstance(value, (list, tuple, dict)):
+                if _is_pyson(value):
+                    return True
+    return False
+
+
+class _FieldValidation(object):
+    "The validation of a field with its PYSON already encoded"
+    __slots__ = ('name', 'field', 'depends',
+        'domain', 'domain_pyson',
+        'states_required', 'states_required_pyson',
+        'size', 'size_pyson',
+        'digits', 'digits_pyson',
+        'selection',
+        'format', 'format_pyson')
+
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+        self.depends = frozenset(field.depends)
+
+        self.domain, self.domain_pyson = None, False
+        if field.domain and field._type not in {'dict', 'reference'}:
+            self.domain, self.domain_pyson = self._compile(field.domain)
+            if not self.domain_pyson:
+                self.domain = freeze(self.domain)
+        self.states_required, self.states_required_pyson = self._compile(
+            field.states.get('required') if field.states else None)
+        self.size, self.size_pyson = self._compile(
+            getattr(field, 'size', None))
+        self.digits, self.digits_pyson = self._compile(
+            getattr(field, 'digits', None))
+
+        self.selection = None
+        selection = getattr(field, 'selection', None)
+        if isinstance(selection, (tuple, list)):
+            self.selection = set(dict(selection).keys())
+            # None and '' are equivalent
+            if '' in self.selection or None in self.selection:
+                self.selection.update({'', None})
+
+        self.format, self.format_pyson = None, False
+        if (field._type in {'datetime', 'time'}
+                and name not in {'create_date', 'write_date'}):
+            self.format, self.format_pyson = self._compile(field.format)
+
+    @staticmethod
+    def _compile(value):
+        if _is_pyson(value):
+            return _pyson_encoder.encode(value), True
+        return value, False
@@ -240,6 +240,63 @@ class ModelView(Model):
             return result
         result = {'model': cls.__name__}
         pool = Pool()
+        ViewCompiled = pool.get('ir.ui.view.compiled')
+
+        compiled = ViewCompiled.get(cls.__name__, view_id, view_type)
+        if compiled is None:
+            compiled, _ = cls._fields_view_arch(view_id, view_type)
+        result.update(compiled)
+
+        if level is None:
+            level = 1 if result['type'] == 'tree' else 0
+
+        # Update arch and compute fields from arch
+        parser = etree.XMLParser(remove_blank_text=True)
+        try:
+            encoded_arch = result['arch'].encode('utf-8')
+        except UnicodeEncodeError:
+            encoded_arch = result['arch']
+        tree = etree.fromstring(encoded_arch, parser)
+        xarch, xfields = cls._view_look_dom_arch(
+            tree, result['type'], result['field_childs'], level=level)
+        result['arch'] = xarch
+        result['fields'] = xfields
+
+        if result['field_childs']:
+            child_field = result['field_childs']
+            result['children_definitions'] = defs = {}
+            model = cls
+            requisite_fields = list(result['fields'].keys())
+            requisite_fields.remove(child_field)
+            while model and model.__name__ not in defs:
+                fields_to_get = [rfield for rfield in requisite_fields
+                    if hasattr(model, rfield)]
+                defs[model.__name__] = model.fields_get(fields_to_get
+                    + [child_field])
+                field = getattr(model, child_field, None)
+                if field:
+                    model = pool.get(field.model_name)
+                else:
+                    model = None
+        else:
+            result['children_definitions'] = {}
+
+        if not config.getboolean('cache', 'disable_fields_view_get_cache',
+                default=False):
+            cls._fields_view_get_cache.set(key, result)
+        return result
+
+    @classmethod
+    def _fields_view_arch(cls, view_id=None, view_type='form'):
+        """
+        Return the definition of the view with the inheritance applied and if
+        it depends only on the stored views.
+        The definition is a dictionary with keys: type, view_id, arch and
+        field_childs.
+        """
+        result = {}
+        compilable = True
+        pool = Pool()
         View = pool.get('ir.ui.view')
 
         view = None
@@ -272,6 +329,8 @@ class ModelView(Model):
 
             # Check if view is not from an inherited model
             if view.model != cls.__name__:
+                # The architecture is translated and filtered by access
+                compilable = False
                 Inherit = pool.get(view.model)
                 result['arch'] = Inherit.fields_view_get(view.id)['arch']
                 real_view_id = inherit_view_id
@@ -308,6 +367,7 @@ class ModelView(Model):
             tree = etree.fromstring(encoded_arch, parser=parser)
             for view in views:
                 if view.domain:
+                    compilable = False
                     if not PYSONDecoder({'context': Transaction().context}
                             ).decode(view.domain):
                         continue
@@ -349,45 +409,8 @@ class ModelView(Model):
             result['arch'] = xml
             result['field_childs'] = None
             result['view_id'] = view_id
-
-        if level is None:
-            level = 1 if result['type'] == 'tree' else 0
-
-        # Update arch and compute fields from arch
-        parser = etree.XMLParser(remove_blank_text=True)
-        try:
-            encoded_arch = result['arch'].encode('utf-8')
-        except UnicodeEncodeError:
-            encoded_arch = result['arch']
-        tree = etree.fromstring(encoded_arch, parser)
-        xarch, xfields = cls._view_look_dom_arch(
-            tree, result['type'], result['field_childs'], level=level)
-        result['arch'] = xarch
-        result['fields'] = xfields
-
-        if result['field_childs']:
-            child_field = result['field_childs']
-            result['children_definitions'] = defs = {}
-            model = cls
-            requisite_fields = list(result['fields'].keys())
-            requisite_fields.remove(child_field)
-            while model and model.__name__ not in defs:
-                fields_to_get = [rfield for rfield in requisite_fields
-                    if hasattr(model, rfield)]
-                defs[model.__name__] = model.fields_get(fields_to_get
-                    + [child_field])
-                field = getattr(model, child_field, None)
-                if field:
-                    model = pool.get(field.model_name)
-                else:
-                    model = None
-        else:
-            result['children_definitions'] = {}
-
-        if not config.getboolean('cache', 'disable_fields_view_get_cache',
-                default=False):
-            cls._fields_view_get_cache.set(key, result)
-        return result
+            compilable = False
+        return result, compilable
 
     @classmethod
     def view_toolbar_get(cls):
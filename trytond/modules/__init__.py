@@ -6,6 +6,7 @@ import importlib
 import itertools
 import logging
 import configparser
+import time
 from glob import iglob
 from collections import defaultdict
 from importlib.machinery import FileFinder, SourceFileLoader, SOURCE_SUFFIXES
@@ -32,6 +33,9 @@ MODULES_PATH = os.path.abspath(os.path.dirname(__file__))
 
 MODULES = []
 
+# The duration in seconds of the import and registration of each module
+IMPORT_TIMES = {}
+
 EGG_MODULES = {}
 
 #PKUNK 9502 Add auto_uninstall
@@ -262,6 +266,7 @@ def load_module_graph(graph, pool, update=None, lang=None):
                     # Feed the parser with xml content:
                     with tools.file_open(OPJ(module, filename), 'rb') as fp:
                         tryton_parser.parse_xmlstream(fp)
+                tryton_parser.log_timings(logging_prefix)
 
                 modules_todo.append((module, list(tryton_parser.to_delete)))
 
@@ -336,12 +341,10 @@ def register_classes():
     '''
     Import modules to register the classes in the Pool
     '''
-    import trytond.ir
-    trytond.ir.register()
-    import trytond.res
-    trytond.res.register()
-    import trytond.tests
-    trytond.tests.register()
+    for module in ('ir', 'res', 'tests'):
+        start = time.perf_counter()
+        importlib.import_module('trytond.' + module).register()
+        IMPORT_TIMES[module] = time.perf_counter() - start
 
     for node in create_graph(get_module_list()):
         module = node.name
@@ -351,10 +354,12 @@ def register_classes():
             MODULES.append(module)
             continue
 
+        start = time.perf_counter()
         the_module = import_module(module)
         # Some modules register nothing in the Pool
         if hasattr(the_module, 'register'):
             the_module.register()
+        IMPORT_TIMES[module] = time.perf_counter() - start
         MODULES.append(module)
 
 
@@ -528,7 +533,9 @@ def load_modules(
                         raise
                     update += e.missings
 
-            load_module_graph(graph, pool, update, lang)
+            # The definitions of the tables are loaded at once
+            with backend.TableHandler.schema_snapshot():
+                load_module_graph(graph, pool, update, lang)
 
             if update:
                 cursor.execute(*ir_module.select(ir_module.name,
@@ -553,6 +560,11 @@ def load_modules(
 
                 Module = pool.get('ir.module')
                 Module.update_list()
+
+                if config.getboolean(
+                        'cache', 'compiled_views', default=False):
+                    ViewCompiled = pool.get('ir.ui.view.compiled')
+                    ViewCompiled.compile()
         # Need to commit to unlock SQLite database
         transaction.commit()
 
@@ -1,9 +1,13 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
 from collections import defaultdict, OrderedDict
-from threading import RLock
+from threading import RLock, Thread
+import gc
 import logging
-from trytond.modules import load_modules, register_classes
+import os
+import time
+from trytond.modules import (load_modules, register_classes, IMPORT_TIMES,
+    MODULES, create_graph, ir_module)
 from trytond.transaction import Transaction
 import builtins
 
@@ -56,6 +60,9 @@ class Pool(object):
     _instances = {}
     _init_hooks = {}
     _post_init_calls = {}
+    _reverse_relations = {}
+    _profile = {}
+    _preforked = ()
 
     def __new__(cls, database_name=None):
         if database_name is None:
@@ -127,6 +134,7 @@ class Pool(object):
         with lock:
             if database_name in cls._pool:
                 del cls._pool[database_name]
+            cls._reverse_relations.pop(database_name, None)
 
     @classmethod
     def database_list(cls):
@@ -168,6 +176,9 @@ class Pool(object):
             if not update and self._pool.get(self.database_name):
                 return
             logger.info('init pool for "%s"', self.database_name)
+            start = time.perf_counter()
+            self._profile[self.database_name] = defaultdict(
+                lambda: defaultdict(float))
             self._pool.setdefault(self.database_name, {})
             # Clean the _pool before loading modules
             for type in list(self.classes.keys()):
@@ -177,9 +188,179 @@ class Pool(object):
                     lang=lang, activatedeps=activatedeps)
             if restart:
                 self.init()
+            else:
+                self._log_profile(time.perf_counter() - start)
             # ABDC: inter-workers communication
             if update:
-                iwc.broadcast_init_pool(self.database_name)
+                iwc.broadcast_init_pool(self.database_name,
+                    update if isinstance(update, (list, tuple)) else None)
+
+    def reload(self, modules):
+        '''
+        Reload the classes registered by the modules
+
+        The classes are set up in a new registry which replaces the current
+        one at once, so the running requests finish with the classes they got.
+        '''
+        from trytond.cache import BaseCache
+        database_name = self.database_name
+        with self._locks[database_name]:
+            current = self._pool.get(database_name)
+            if not current:
+                return self.init()
+            logger.info('reload pool for "%s": %s',
+                database_name, ','.join(modules))
+            with Transaction().start(database_name, 0, readonly=True) \
+                    as transaction:
+                cursor = transaction.connection.cursor()
+                cursor.execute(*ir_module.select(ir_module.name,
+                        where=ir_module.state == 'activated'))
+                activated = {n for n, in cursor}
+                graph = create_graph(activated)
+                registry, rebuilt = self._build(
+                    current, modules, activated, graph)
+
+                self._pool[database_name] = registry
+                self._reverse_relations.pop(database_name, None)
+                self._post_init_calls[database_name] = [hook
+                    for node in graph
+                    for hook in self._init_hooks.get(node.name, [])]
+                for module in modules:
+                    for hook in self._init_hooks.get(module, []):
+                        hook(self, None)
+
+            # Clear the caches of the rebuilt classes and their bases
+            caches = {}
+            for cls in rebuilt:
+                for klass in cls.__mro__:
+                    for value in vars(klass).values():
+                        if isinstance(value, BaseCache):
+                            caches[value._name] = value
+            for name in BaseCache._with_dependents(list(caches)):
+                caches.setdefault(name, BaseCache._instances.get(name))
+            for inst in caches.values():
+                if hasattr(inst, '_clear'):
+                    inst._clear(database_name)
+
+    def _build(self, current, modules, activated, graph):
+        """Return a copy of the registry with the classes of modules rebuilt
+        and the list of the classes which have changed"""
+        names = {}
+        registry = {}
+        for type_, classes in current.items():
+            names[type_] = {cls.__name__
+                for module in modules
+                for cls in self.classes[type_].get(module, {})}
+            registry[type_] = {n: c for n, c in classes.items()
+                if n not in names[type_]}
+        for node in graph:
+            module = node.name
+            if module not in MODULES:
+                continue
+            for type_ in self.classes.keys():
+                for cls, depends in self.classes[type_].get(
+                        module, {}).items():
+                    if (cls.__name__ not in names[type_]
+                            or not depends.issubset(activated)):
+                        continue
+                    previous_cls = registry[type_].get(cls.__name__)
+                    # Always create a new class to not set up again the
+                    # class of the current registry
+                    if previous_cls is not None:
+                        bases = (cls, previous_cls)
+                    else:
+                        bases = (cls,)
+                    cls = type(cls.__name__, bases, {'__slots__': ()})
+                    registry[type_][cls.__name__] = cls
+        classes = {type_: [registry[type_][n]
+                for n in names[type_] if n in registry[type_]]
+            for type_ in registry}
+        for lst in classes.values():
+            for cls in lst:
+                cls.__setup__()
+            for cls in lst:
+                cls.__post_setup__()
+
+        # The mixins of the reloaded modules are applied to all the classes
+        # like setup_mixin does and the others only to the rebuilt classes
+        for node in graph:
+            for parent, mixin in self.classes_mixin.get(node.name, []):
+                for type_, lst in registry.items():
+                    for name, cls in list(lst.items()):
+                        if (node.name not in modules
+                                and name not in names[type_]):
+                            continue
+                        if (not issubclass(cls, parent)
+                                or issubclass(cls, mixin)):
+                            continue
+                        lst[name] = type(cls.__name__, (mixin, cls), {})
+        rebuilt = [cls for type_, lst in registry.items()
+            for name, cls in lst.items()
+            if current[type_].get(name) is not cls]
+        return registry, rebuilt
+
+    @classmethod
+    def prefork(cls, database_names):
+        '''
+        Init the pools of the databases in the current process so the forked
+        processes inherit them instead of loading the modules again
+        '''
+        from trytond import iwc, backend
+        from trytond.cache import Cache
+        threads = []
+        for name in database_names:
+            thread = Thread(target=cls(name).init)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        # The connections and the listener threads can not be shared with the
+        # forked processes
+        iwc.stop()
+        for name in database_names:
+            Cache.drop(name)
+            backend.Database(name).close()
+        # Before Python 3.7, the locks and the inter-workers communication
+        # are only recreated lazily by the forked processes
+        if not cls._preforked and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=cls._after_fork)
+        cls._preforked = tuple(database_names)
+        # Prevent the garbage collector to touch the loaded objects and so
+        # to copy their memory pages in each forked process
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+    @classmethod
+    def _after_fork(cls):
+        from trytond import iwc
+        cls._lock = RLock()
+        cls._locks = {name: RLock() for name in cls._locks}
+        for name in cls._preforked:
+            if name in cls._pool:
+                iwc.start(name)
+
+    def get_profile(self):
+        '''
+        Return the durations in seconds of the last init of the pool by kind
+        ('import', '__setup__', '__post_setup__', 'setup_mixin') and by name
+        of module or class
+        '''
+        profile = {k: dict(v) for k, v in self._profile.get(
+                self.database_name, {}).items()}
+        profile['import'] = dict(IMPORT_TIMES)
+        return profile
+
+    def _log_profile(self, duration, limit=10):
+        logger.info('pool for "%s" initialized in %.3fs',
+            self.database_name, duration)
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        for kind, durations in sorted(self.get_profile().items()):
+            logger.debug('%s: %.3fs', kind, sum(durations.values()))
+            for name, duration in sorted(
+                    durations.items(), key=lambda i: i[1],
+                    reverse=True)[:limit]:
+                logger.debug('%s: %s %.3fs', kind, name, duration)
 
     def post_init(self, update):
         for hook in self._post_init_calls[self.database_name]:
@@ -257,17 +438,24 @@ class Pool(object):
             for type_ in self._pool[self.database_name]:
                 classes[type_] = list(
                     self._pool[self.database_name][type_].values())
+        profile = self._profile.get(self.database_name)
         for type_, lst in classes.items():
-            for cls in lst:
-                cls.__setup__()
-            for cls in lst:
-                cls.__post_setup__()
+            for method in ['__setup__', '__post_setup__']:
+                for cls in lst:
+                    start = time.perf_counter()
+                    getattr(cls, method)()
+                    if profile is not None:
+                        profile[method][cls.__name__] += (
+                            time.perf_counter() - start)
+        self._reverse_relations.pop(self.database_name, None)
 
     def setup_mixin(self, modules):
         logger.info('setup mixin for "%s"', self.database_name)
+        profile = self._profile.get(self.database_name)
         for module in modules:
             if module not in self.classes_mixin:
                 continue
+            start = time.perf_counter()
             for type_ in list(self.classes.keys()):
                 for _, cls in self.iterobject(type=type_):
                     for parent, mixin in self.classes_mixin[module]:
@@ -276,6 +464,31 @@ class Pool(object):
                             continue
                         cls = type(cls.__name__, (mixin, cls), {})
                         self.add(cls, type=type_)
+            if profile is not None:
+                profile['setup_mixin'][module] += time.perf_counter() - start
+        self._reverse_relations.pop(self.database_name, None)
+
+    def get_reverse_relations(self, model_name):
+        '''
+        Return a tuple of (model name, field name, ondelete) for the Many2One
+        fields targeting the model
+
+        The index is built once for all the models after the setup.
+        '''
+        relations = self._reverse_relations.get(self.database_name)
+        if relations is None:
+            from trytond.model import fields
+            with self._locks[self.database_name]:
+                relations = defaultdict(list)
+                for name, model in self.iterobject():
+                    for field_name, field in getattr(
+                            model, '_fields', {}).items():
+                        if isinstance(field, fields.Many2One):
+                            relations[field.model_name].append(
+                                (name, field_name, field.ondelete))
+                relations = {k: tuple(v) for k, v in relations.items()}
+                self._reverse_relations[self.database_name] = relations
+        return relations.get(model_name, ())
 
 
 def isregisteredby(obj, module, type_='model'):
@@ -262,6 +262,22 @@ def _dispatch(request, pool, *args, **kwargs):
     except Exception:
         perf_logger.exception('on_execute failed')
 
+    etag_key = etag = None
+    if rpc.readonly and rpc.cache:
+        etag_key = rpc.cache.etag_key(user, obj, method, args, kwargs)
+        if request.if_none_match:
+            with Transaction().start(
+                    pool.database_name, user, readonly=True):
+                etag = rpc.cache.get_etag(etag_key)
+            if etag and request.if_none_match.contains(etag):
+                if request.authorization.type == 'session':
+                    security.reset_user_session(pool.database_name, user,
+                        request.authorization.get('session'))
+                response = Response(status=HTTPStatus.NOT_MODIFIED)
+                response.set_etag(etag)
+                response.headers.extend(rpc.cache.headers())
+                return response
+
     retry = config.getint('database', 'retry')
     for count in range(retry, -1, -1):
         if count != retry:
@@ -329,6 +345,8 @@ def _dispatch(request, pool, *args, **kwargs):
                     log_exception(slow_logger.error, slow_msg, *slow_args)
 
                 raise
+            if etag_key:
+                etag = rpc.cache.set_etag(etag_key, result)
             # Need to commit to unlock SQLite database
             transaction.commit()
         if request.authorization.type == 'session':
@@ -372,4 +390,6 @@ def _dispatch(request, pool, *args, **kwargs):
         response = app.make_response(request, result)
         if rpc.readonly and rpc.cache:
             response.headers.extend(rpc.cache.headers())
+            if etag:
+                response.set_etag(etag)
         return response
@@ -77,6 +77,7 @@ class Group(DeactivableMixin, ModelSQL, ModelView):
         pool.get('ir.rule')._domain_get_cache.clear()
         # Restart the cache for get_groups
         pool.get('res.user')._get_groups_cache.clear()
+        pool.get('res.user')._get_groups_key_cache.clear()
         # Restart the cache for get_preferences
         pool.get('res.user')._get_preferences_cache.clear()
         # Restart the cache for model access and view
@@ -93,6 +94,7 @@ class Group(DeactivableMixin, ModelSQL, ModelView):
         pool.get('ir.rule')._domain_get_cache.clear()
         # Restart the cache for get_groups
         pool.get('res.user')._get_groups_cache.clear()
+        pool.get('res.user')._get_groups_key_cache.clear()
         # Restart the cache for get_preferences
         pool.get('res.user')._get_preferences_cache.clear()
         # Restart the cache for model access and view
@@ -108,6 +110,7 @@ class Group(DeactivableMixin, ModelSQL, ModelView):
         pool.get('ir.rule')._domain_get_cache.clear()
         # Restart the cache for get_groups
         pool.get('res.user')._get_groups_cache.clear()
+        pool.get('res.user')._get_groups_key_cache.clear()
         # Restart the cache for get_preferences
         pool.get('res.user')._get_preferences_cache.clear()
         # Restart the cache for model access and view
@@ -152,7 +152,18 @@ class User(DeactivableMixin, ModelSQL, ModelView):
             'get_sessions')
     _get_preferences_cache = Cache('res_user.get_preferences')
     _get_groups_cache = Cache('res_user.get_groups')
+    _get_groups_key_cache = Cache(
+        'res_user.get_groups_key', size_limit=10240, context=False)
     _get_login_cache = Cache('res_user._get_login', context=False)
+    _get_bootstrap_cache = Cache('res_user.get_bootstrap', depends=[
+            'res_user.get_preferences',
+            'res_user.get_groups',
+            'modelview.fields_view_get',
+            'modelview.view_toolbar_get',
+            'ir_model_access.get_access',
+            'ir_model_field_access.check',
+            'ir.translation',
+            ])
 
     @classmethod
     def __setup__(cls):
@@ -162,6 +173,7 @@ class User(DeactivableMixin, ModelSQL, ModelView):
                 'set_preferences': RPC(
                     readonly=False, check_access=False, fresh_session=True),
                 'get_preferences_fields_view': RPC(check_access=False),
+                'get_bootstrap': RPC(check_access=False),
                 })
         table = cls.__table__()
         cls._sql_constraints += [
@@ -396,6 +408,7 @@ class User(DeactivableMixin, ModelSQL, ModelView):
         pool.get('ir.rule')._domain_get_cache.clear()
         # Restart the cache for get_groups
         cls._get_groups_cache.clear()
+        cls._get_groups_key_cache.clear()
         # Restart the cache for _get_login
         cls._get_login_cache.clear()
         # Restart the cache for get_preferences
@@ -459,21 +472,29 @@ class User(DeactivableMixin, ModelSQL, ModelView):
             fields = cls._context_fields
         else:
             fields = cls._preferences_fields + cls._context_fields
+        names = {'language.code', 'language.date', 'language.grouping',
+            'language.decimal_point', 'language.thousands_sep'}
+        for field in fields:
+            names.add(field)
+            if (cls._fields[field]._type == 'many2one'
+                    and field != 'language'):
+                names.add(field + '.rec_name')
+        values, = cls.read([user.id], list(names))
+        language = values['language.']
         for field in fields:
             if cls._fields[field]._type in ('many2one',):
                 if field == 'language':
-                    if user.language:
-                        res['language'] = user.language.code
+                    if language:
+                        res['language'] = language['code']
                     else:
                         res['language'] = Config.get_language()
                 else:
-                    res[field] = None
-                    if getattr(user, field):
-                        res[field] = getattr(user, field).id
+                    res[field] = values[field]
+                    if values[field] is not None:
                         res[field + '.rec_name'] = \
-                            getattr(user, field).rec_name
+                            values[field + '.']['rec_name']
             elif cls._fields[field]._type in ('one2many', 'many2many'):
-                res[field] = [x.id for x in getattr(user, field)]
+                res[field] = list(values[field])
                 if field == 'actions' and user.login == 'admin':
                     config_wizard_id = ModelData.get_id('ir',
                         'act_module_config_wizard')
@@ -485,18 +506,18 @@ class User(DeactivableMixin, ModelSQL, ModelView):
                                 ]):
                         res[field].insert(0, action_id)
             else:
-                res[field] = getattr(user, field)
+                res[field] = values[field]
 
-        if user.language:
-            date = user.language.date
+        if language:
+            date = language['date']
             for i, j in [('%a', ''), ('%A', ''), ('%b', '%m'), ('%B', '%m'),
                     ('%j', ''), ('%U', ''), ('%w', ''), ('%W', '')]:
                 date = date.replace(i, j)
             res['locale'] = {
                 'date': date,
-                'grouping': literal_eval(user.language.grouping),
-                'decimal_point': user.language.decimal_point,
-                'thousands_sep': user.language.thousands_sep,
+                'grouping': literal_eval(language['grouping']),
+                'decimal_point': language['decimal_point'],
+                'thousands_sep': language['thousands_sep'],
             }
         return res
 
@@ -588,6 +609,49 @@ class User(DeactivableMixin, ModelSQL, ModelView):
                 selection.append((action.id, action.rec_name))
         return res
 
+    @classmethod
+    def get_bootstrap(cls, views=None):
+        """
+        Return in a single call what the client loads after the login.
+        views is a list of (model, view_id, view_type) for which the
+        definition and the toolbar are returned.
+        The result is a dictionary with keys:
+            - preferences: the result of get_preferences
+            - preferences_view: the result of get_preferences_fields_view
+            - views: the list of fields_view_get results of views
+            - toolbars: a dictionary of view_toolbar_get results per model
+            - menu: the definition of the root menus
+        """
+        pool = Pool()
+        Menu = pool.get('ir.ui.menu')
+        views = tuple(
+            (model, view_id, view_type)
+            for model, view_id, view_type in (views or []))
+        key = (tuple(sorted(cls.get_groups())), views)
+        bootstrap = cls._get_bootstrap_cache.get(key)
+        if bootstrap is None:
+            bootstrap = {
+                'preferences': cls.get_preferences(False),
+                'preferences_view': cls.get_preferences_fields_view(),
+                'views': [],
+                'toolbars': {},
+                }
+            for model, view_id, view_type in views:
+                Model = pool.get(model)
+                if 'fields_view_get' not in Model.__rpc__:
+                    raise ValueError('%s has no view' % model)
+                bootstrap['views'].append(Model.fields_view_get(
+                        view_id=view_id, view_type=view_type))
+                if model not in bootstrap['toolbars']:
+                    bootstrap['toolbars'][model] = Model.view_toolbar_get()
+            cls._get_bootstrap_cache.set(key, bootstrap)
+        bootstrap = bootstrap.copy()
+        with Transaction().set_context(_check_access=True):
+            menus = Menu.search([('parent', '=', None)])
+            bootstrap['menu'] = Menu.read([m.id for m in menus],
+                ['name', 'icon', 'childs', 'favorite'])
+        return bootstrap
+
     @classmethod
     def get_groups(cls):
         '''
@@ -601,6 +665,27 @@ class User(DeactivableMixin, ModelSQL, ModelView):
         cls._get_groups_cache.set(user, groups)
         return groups
 
+    @classmethod
+    def get_groups_key(cls):
+        '''
+        Return the sorted tuple of all the group ids of the user
+        It is used as key by the caches which depend only on the groups.
+        '''
+        pool = Pool()
+        UserGroup = pool.get('res.user-res.group')
+        transaction = Transaction()
+        user = transaction.user
+        key = cls._get_groups_key_cache.get(user)
+        if key is not None:
+            return tuple(key)
+        user_group = UserGroup.__table__()
+        cursor = transaction.connection.cursor()
+        cursor.execute(*user_group.select(user_group.group,
+                where=user_group.user == user))
+        key = tuple(sorted({g for g, in cursor}))
+        cls._get_groups_key_cache.set(user, key)
+        return key
+
     @classmethod
     def _get_login(cls, login):
         result = cls._get_login_cache.get(login)
@@ -854,6 +939,34 @@ class UserGroup(ModelSQL):
     group = fields.Many2One('res.group', 'Group', ondelete='CASCADE',
             select=True, required=True)
 
+    @classmethod
+    def create(cls, vlist):
+        user_groups = super(UserGroup, cls).create(vlist)
+        cls._clear_cache()
+        return user_groups
+
+    @classmethod
+    def write(cls, *args):
+        super(UserGroup, cls).write(*args)
+        cls._clear_cache()
+
+    @classmethod
+    def delete(cls, user_groups):
+        super(UserGroup, cls).delete(user_groups)
+        cls._clear_cache()
+
+    @classmethod
+    def _clear_cache(cls):
+        pool = Pool()
+        User = pool.get('res.user')
+        # Restart the caches depending on the groups of the users
+        User._get_groups_cache.clear()
+        User._get_groups_key_cache.clear()
+        User._get_preferences_cache.clear()
+        pool.get('ir.rule')._domain_get_cache.clear()
+        pool.get('ir.model.access')._get_access_cache.clear()
+        pool.get('ir.model.field.access')._get_access_cache.clear()
+
 
 class Warning_(ModelSQL, ModelView):
     'User Warning'
@@ -2,7 +2,11 @@
 # this repository contains the full copyright notices and license terms.
 import copy
 import datetime as dt
+import hashlib
+import time
 
+from trytond.cache import Cache, freeze
+from trytond.cache_serializer import pack
 from trytond.transaction import Transaction
 
 __all__ = ['RPC']
@@ -87,10 +91,43 @@ class RPC(object):
 
 class RPCCache:
     __slots__ = ('duration',)
+    # The results are computed from these caches
+    _etags = Cache('rpc.etag', size_limit=10240, context=False, depends=[
+            'modelview.fields_view_get',
+            'modelview.view_toolbar_get',
+            'ir_action_keyword.get_keyword',
+            'ir_model_access.get_access',
+            'ir_model_field_access.check',
+            'ir.model.button.groups',
+            'ir.model.button.rules',
+            'res_user.get_groups',
+            'ir.translation',
+            ])
 
     def __init__(self, days=0, seconds=0):
         self.duration = dt.timedelta(days=days, seconds=seconds)
 
+    @staticmethod
+    def etag_key(user, obj, method, args, kwargs):
+        return (user, obj.__name__, method, freeze(args), freeze(kwargs))
+
+    def get_etag(self, key):
+        "Return the ETag of the last result for the key if not expired"
+        value = self._etags.get(key)
+        if value:
+            etag, timestamp = value
+            if time.time() - timestamp < self.duration.total_seconds():
+                return etag
+
+    def set_etag(self, key, result):
+        "Store and return the ETag of the result for the key"
+        try:
+            etag = hashlib.sha1(pack(result)).hexdigest()
+        except (TypeError, ValueError):
+            return
+        self._etags.set(key, (etag, time.time()))
+        return etag
+
     def headers(self):
         return {
             'X-Tryton-Cache': int(self.duration.total_seconds()),
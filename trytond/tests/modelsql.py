@@ -76,6 +76,23 @@ class ModelSQLOne2ManyTarget(ModelSQL):
     origin = fields.Many2One('test.modelsql.one2many', "Origin")
 
 
+class ModelSQLDelete(ModelSQL):
+    "ModelSQL to test delete"
+    __name__ = 'test.modelsql.delete'
+    name = fields.Char("Name")
+
+
+class ModelSQLDeleteTarget(ModelSQL):
+    "ModelSQL Target to test delete"
+    __name__ = 'test.modelsql.delete.target'
+    cascade = fields.Many2One(
+        'test.modelsql.delete', "Cascade", ondelete='CASCADE')
+    set_null = fields.Many2One(
+        'test.modelsql.delete', "Set Null", ondelete='SET NULL')
+    restrict = fields.Many2One(
+        'test.modelsql.delete', "Restrict", ondelete='RESTRICT')
+
+
 class NullOrder(ModelSQL):
     "Null Order"
     __name__ = 'test.modelsql.null_order'
@@ -153,6 +170,8 @@ def register(module):
         ModelSQLFieldSet,
         ModelSQLOne2Many,
         ModelSQLOne2ManyTarget,
+        ModelSQLDelete,
+        ModelSQLDeleteTarget,
         NullOrder,
         ModelTranslation,
         ModelCheck,
@@ -1,7 +1,8 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
-from trytond.model import ModelSQL, ModelStorage as ModelStorage_, fields
-from trytond.pyson import Eval
+from trytond.model import (
+    ModelSQL, ModelStorage as ModelStorage_, DeactivableMixin, fields)
+from trytond.pyson import Eval, If
 from trytond.transaction import Transaction
 from trytond.pool import Pool
 
@@ -61,6 +62,16 @@ class ModelStoragePYSONDomain(ModelSQL):
         depends=['constraint'])
 
 
+class ModelStorageDeactivableDomain(DeactivableMixin, ModelSQL):
+    "Deactivable model stored with a domain depending on active"
+    __name__ = 'test.modelstorage.deactivable_domain'
+    value = fields.Char(
+        "Value",
+        domain=[
+            If(Eval('active', True), ('value', '=', 'valid'), ()),
+            ])
+
+
 class ModelStorageRelationDomain(ModelSQL):
     "Model stored containing a relation field with a domain"
     __name__ = 'test.modelstorage.relation_domain'
@@ -121,6 +132,7 @@ def register(module):
         ModelStorageSave2ManyRelation,
         ModelStorageContext,
         ModelStoragePYSONDomain,
+        ModelStorageDeactivableDomain,
         ModelStorageRelationDomain,
         ModelStorageRelationDomainTarget,
         ModelStorageRelationDomain2,
@@ -889,6 +889,52 @@ class ModelFieldAccessReadTestCase(_ModelFieldAccessTestCase):
         with self.assertRaises(AccessError):
             TestAccess.search([], order=[('relate.value', 'ASC')])
 
+    @with_transaction(context=_context)
+    def test_eager_fields(self):
+        "Test eager fields without field access"
+        pool = Pool()
+        TestAccess = pool.get('test.access')
+        FieldAccess = pool.get('ir.model.field.access')
+
+        eager_fields = FieldAccess.get_eager_fields('test.access')
+
+        self.assertIn('field1', eager_fields)
+        self.assertIn('field2', eager_fields)
+        self.assertEqual(list(eager_fields), list(TestAccess._eager_fields))
+
+    @with_transaction(context=_context)
+    def test_eager_fields_no_access(self):
+        "Test eager fields without read access"
+        pool = Pool()
+        FieldAccess = pool.get('ir.model.field.access')
+
+        self.assertIn('field1', FieldAccess.get_eager_fields('test.access'))
+        FieldAccess.create([{
+                    'field': self.field1.id,
+                    'perm_read': False,
+                    }])
+        eager_fields = FieldAccess.get_eager_fields('test.access')
+
+        self.assertNotIn('field1', eager_fields)
+        self.assertIn('field2', eager_fields)
+
+    @with_transaction(context=_context)
+    def test_getattr_no_eager_access(self):
+        "Test getattr does not load eager field without read access"
+        pool = Pool()
+        TestAccess = pool.get('test.access')
+        FieldAccess = pool.get('ir.model.field.access')
+        record, = TestAccess.create([{}])
+        FieldAccess.create([{
+                    'field': self.field1.id,
+                    'perm_read': False,
+                    }])
+
+        record, = TestAccess.browse([record.id])
+        record.field2
+
+        self.assertNotIn('field1', record._cache[record.id])
+
 
 class ModelFieldAccessWriteTestCase(_ModelFieldAccessTestCase):
     _perm = 'perm_write'
@@ -916,6 +962,186 @@ class ModelFieldAccessWriteTestCase(_ModelFieldAccessTestCase):
             TestAccess.write([record], {'field2': 'test'})
 
 
+class ModelAccessGroupsTestCase(unittest.TestCase):
+    "Test Model Access cached per groups"
+
+    @classmethod
+    def setUpClass(cls):
+        activate_module('tests')
+
+    def _create_users(self, groups):
+        pool = Pool()
+        User = pool.get('res.user')
+        return User.create([{
+                    'login': login,
+                    'groups': [('add', [g.id for g in groups])],
+                    } for login in ['user1', 'user2']])
+
+    @with_transaction()
+    def test_groups_key(self):
+        "Test groups key"
+        pool = Pool()
+        Group = pool.get('res.group')
+        User = pool.get('res.user')
+        group1, group2 = Group.create([{'name': '1'}, {'name': '2'}])
+        user1, user2 = self._create_users([group2, group1])
+
+        with Transaction().set_user(user1.id):
+            key1 = User.get_groups_key()
+        with Transaction().set_user(user2.id):
+            key2 = User.get_groups_key()
+
+        self.assertEqual(key1, tuple(sorted([group1.id, group2.id])))
+        self.assertEqual(key1, key2)
+
+    @with_transaction(context=_context)
+    def test_access_shared(self):
+        "Test access shared by users with the same groups"
+        pool = Pool()
+        Group = pool.get('res.group')
+        User = pool.get('res.user')
+        Model = pool.get('ir.model')
+        ModelAccess = pool.get('ir.model.access')
+        model, = Model.search([('model', '=', 'test.access')])
+        group, = Group.create([{'name': 'Test'}])
+        ModelAccess.create([{
+                    'model': model.id,
+                    'group': None,
+                    'perm_read': False,
+                    }, {
+                    'model': model.id,
+                    'group': group.id,
+                    'perm_read': True,
+                    }])
+        user1, user2 = self._create_users([group])
+
+        with Transaction().set_user(user1.id):
+            access = ModelAccess.get_access(['test.access'])
+            groups = User.get_groups_key()
+
+        self.assertTrue(access['test.access']['read'])
+        self.assertEqual(
+            ModelAccess._get_access_cache.get((groups, 'test.access')),
+            access['test.access'])
+        with Transaction().set_user(user2.id):
+            self.assertEqual(
+                ModelAccess.get_access(['test.access']), access)
+
+    @with_transaction(context=_context)
+    def test_access_user_groups_changed(self):
+        "Test access when the groups of the user change"
+        pool = Pool()
+        Group = pool.get('res.group')
+        User = pool.get('res.user')
+        UserGroup = pool.get('res.user-res.group')
+        Model = pool.get('ir.model')
+        ModelAccess = pool.get('ir.model.access')
+        model, = Model.search([('model', '=', 'test.access')])
+        group, = Group.create([{'name': 'Test'}])
+        ModelAccess.create([{
+                    'model': model.id,
+                    'group': None,
+                    'perm_read': False,
+                    }, {
+                    'model': model.id,
+                    'group': group.id,
+                    'perm_read': True,
+                    }])
+        user1, user2 = self._create_users([group])
+
+        def check(user):
+            with Transaction().set_user(user.id):
+                return ModelAccess.check(
+                    'test.access', 'read', raise_exception=False)
+
+        self.assertTrue(check(user1))
+        self.assertTrue(check(user2))
+
+        User.write([user1], {'groups': [('remove', [group.id])]})
+        self.assertFalse(check(user1))
+        self.assertTrue(check(user2))
+
+        user_group, = UserGroup.search([('user', '=', user2.id)])
+        UserGroup.delete([user_group])
+        self.assertFalse(check(user2))
+
+        UserGroup.create([{'user': user1.id, 'group': group.id}])
+        self.assertTrue(check(user1))
+
+    @with_transaction(context=_context)
+    def test_access_group_deactivated(self):
+        "Test access when the group is deactivated"
+        pool = Pool()
+        Group = pool.get('res.group')
+        Model = pool.get('ir.model')
+        ModelAccess = pool.get('ir.model.access')
+        model, = Model.search([('model', '=', 'test.access')])
+        group, = Group.create([{'name': 'Test'}])
+        ModelAccess.create([{
+                    'model': model.id,
+                    'group': None,
+                    'perm_read': False,
+                    }, {
+                    'model': model.id,
+                    'group': group.id,
+                    'perm_read': True,
+                    }])
+        user1, _ = self._create_users([group])
+
+        with Transaction().set_user(user1.id):
+            self.assertTrue(ModelAccess.check(
+                    'test.access', 'read', raise_exception=False))
+        group.active = False
+        group.save()
+        with Transaction().set_user(user1.id):
+            self.assertFalse(ModelAccess.check(
+                    'test.access', 'read', raise_exception=False))
+
+    @with_transaction(context=_context)
+    def test_field_access_shared(self):
+        "Test field access shared by users with the same groups"
+        pool = Pool()
+        Group = pool.get('res.group')
+        User = pool.get('res.user')
+        Field = pool.get('ir.model.field')
+        FieldAccess = pool.get('ir.model.field.access')
+        field, = Field.search([
+                ('model.model', '=', 'test.access'),
+                ('name', '=', 'field1'),
+                ])
+        group, = Group.create([{'name': 'Test'}])
+        FieldAccess.create([{
+                    'field': field.id,
+                    'group': None,
+                    'perm_read': False,
+                    }])
+        user1, user2 = self._create_users([group])
+
+        with Transaction().set_user(user1.id):
+            access = FieldAccess.get_access(['test.access'])
+            eager_fields = FieldAccess.get_eager_fields('test.access')
+            groups = User.get_groups_key()
+
+        self.assertFalse(access['test.access']['field1']['read'])
+        self.assertNotIn('field1', eager_fields)
+        self.assertEqual(
+            FieldAccess._get_access_cache.get((groups, 'test.access')),
+            access['test.access'])
+        with Transaction().set_user(user2.id):
+            self.assertEqual(FieldAccess.get_access(['test.access']), access)
+
+        FieldAccess.create([{
+                    'field': field.id,
+                    'group': group.id,
+                    'perm_read': True,
+                    }])
+        with Transaction().set_user(user2.id):
+            self.assertTrue(FieldAccess.check(
+                    'test.access', ['field1'], raise_exception=False))
+            self.assertIn(
+                'field1', FieldAccess.get_eager_fields('test.access'))
+
+
 def suite():
     suite_ = unittest.TestSuite()
     suite_.addTests(unittest.TestLoader(
@@ -930,4 +1156,6 @@ def suite():
         ).loadTestsFromTestCase(ModelFieldAccessReadTestCase))
     suite_.addTests(unittest.TestLoader(
         ).loadTestsFromTestCase(ModelFieldAccessWriteTestCase))
+    suite_.addTests(unittest.TestLoader(
+        ).loadTestsFromTestCase(ModelAccessGroupsTestCase))
     return suite_
@@ -2,13 +2,20 @@
 # this repository contains the full copyright notices and license terms.
 import datetime
 import math
+import time
 import unittest
+from itertools import count
+from threading import Condition, Lock, Thread
+from unittest.mock import Mock, patch
 
 from sql import Select
 from sql import functions
 from sql.functions import CurrentTimestamp, ToChar
 
-from trytond.tests.test_tryton import activate_module, with_transaction
+from trytond import backend
+from trytond.pool import Pool
+from trytond.tests.test_tryton import (
+    activate_module, with_transaction, DB_NAME)
 from trytond.transaction import Transaction
 
 
@@ -144,6 +151,475 @@ class BackendTestCase(unittest.TestCase):
         cursor = Transaction().connection.cursor()
         cursor.execute(*Select([functions.SetSeed(1)]))
 
+    @with_transaction()
+    def test_pool_stats(self):
+        "Test pool statistics"
+        database = Transaction().database
+
+        stats = database.get_pool_stats()
+
+        self.assertGreaterEqual(stats['size'], 1)
+        self.assertGreaterEqual(stats['in_use'], 1)
+        self.assertGreaterEqual(stats['checkouts'], stats['reuses'])
+        self.assertGreaterEqual(stats['waits'], 0)
+        self.assertEqual(
+            sum(c for _, c in stats['wait_histogram']), stats['waits'])
+
+
+@unittest.skipUnless(backend.name == 'postgresql', "PostgreSQL specific")
+class PostgreSQLDatabaseTestCase(unittest.TestCase):
+    "Test the PostgreSQL database without server"
+
+    def database(self, replicas=0):
+        "Return a database with mocked connection pools"
+        from trytond.backend.postgresql.database import Database, _Replica
+        database = object.__new__(Database)
+        database.name = 'test'
+        database._connpool = Mock(closed=False)
+        database._pool_condition = Condition()
+        database._replicas = [_Replica(Mock()) for _ in range(replicas)]
+        database._replica_cycle = count()
+        database._replica_connections = {}
+        database._written_lsns = {}
+        database._written_lock = Lock()
+        database._waits = 0
+        database._wait_time = 0
+        database._wait_histogram = [0] * 5
+        for replica in database._replicas:
+            replica.pool.getconn.return_value = Mock(closed=False)
+        return database
+
+    def test_replica_round_robin(self):
+        "Test replica connections in round-robin"
+        database = self.database(replicas=2)
+        first, second = database._replicas
+
+        with patch.object(database, '_get_written_lsns', return_value={}):
+            conn1 = database._get_replica_connection(1)
+            conn2 = database._get_replica_connection(1)
+
+        self.assertIs(conn1, first.pool.getconn.return_value)
+        self.assertIs(conn2, second.pool.getconn.return_value)
+
+        database.put_connection(conn1)
+        first.pool.putconn.assert_called_once_with(conn1, close=False)
+        database._connpool.putconn.assert_not_called()
+
+    def test_replica_down(self):
+        "Test replica failing to connect is skipped"
+        database = self.database(replicas=1)
+        replica, = database._replicas
+        replica.pool.getconn.side_effect = Exception
+
+        with patch.object(database, '_get_written_lsns', return_value={}):
+            self.assertIsNone(database._get_replica_connection(1))
+            self.assertGreater(replica.down_until, 0)
+            self.assertIsNone(database._get_replica_connection(1))
+
+        self.assertEqual(replica.pool.getconn.call_count, 1)
+
+    def test_replica_busy(self):
+        "Test replica without free connection is not marked down"
+        from trytond.backend.postgresql.database import PoolError
+        database = self.database(replicas=1)
+        replica, = database._replicas
+        replica.pool.getconn.side_effect = PoolError
+
+        with patch.object(database, '_get_written_lsns', return_value={}):
+            self.assertIsNone(database._get_replica_connection(1))
+
+        self.assertEqual(replica.down_until, 0)
+
+    def test_replica_not_replayed(self):
+        "Test replica which has not replayed the writes of the user"
+        database = self.database(replicas=1)
+        replica, = database._replicas
+        conn = replica.pool.getconn.return_value
+
+        with patch.object(database, '_get_written_lsns',
+                    return_value={10: '0/10'}), \
+                patch.object(database, '_has_replayed',
+                    return_value=False) as has_replayed:
+            self.assertIsNone(database._get_replica_connection(1))
+
+        has_replayed.assert_called_once_with(conn, 1, {10: '0/10'})
+        replica.pool.putconn.assert_called_once_with(conn)
+
+    def test_replica_replayed(self):
+        "Test replica which has replayed the writes of the user"
+        database = self.database(replicas=1)
+        replica, = database._replicas
+
+        with patch.object(database, '_get_written_lsns',
+                    return_value={10: '0/10'}), \
+                patch.object(database, '_has_replayed', return_value=True):
+            conn = database._get_replica_connection(1)
+
+        self.assertIs(conn, replica.pool.getconn.return_value)
+
+    def test_get_connection_replica_fallback(self):
+        "Test get connection falls back to the primary"
+        database = self.database(replicas=1)
+
+        with patch.object(database, '_get_replica_connection',
+                return_value=None) as get_replica_connection:
+            conn = database.get_connection(readonly=True, user=1)
+
+        get_replica_connection.assert_called_once_with(1)
+        self.assertIs(conn, database._connpool.getconn.return_value)
+
+    def test_get_connection_wait(self):
+        "Test get connection is woken up when a connection is put back"
+        from trytond.backend.postgresql.database import PoolError
+        database = self.database()
+        conn = Mock()
+        database._connpool.getconn.side_effect = [PoolError, conn]
+
+        def put_connection():
+            time.sleep(0.1)
+            database.put_connection(Mock())
+        thread = Thread(target=put_connection)
+        thread.start()
+        start = time.monotonic()
+        self.assertIs(database.get_connection(), conn)
+        thread.join()
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(database._waits, 1)
+
+    def test_get_connection_timeout(self):
+        "Test get connection raises when no connection is put back"
+        from trytond.backend.postgresql.database import PoolError
+        database = self.database()
+        database._connpool.getconn.side_effect = PoolError
+
+        with patch('trytond.backend.postgresql.database.config') as config:
+            config.getint.return_value = 0
+            with self.assertRaises(PoolError):
+                database.get_connection()
+
+    def test_get_written_lsns(self):
+        "Test get the locations of the last writes from the primary"
+        database = self.database(replicas=1)
+        conn = database._connpool.getconn.return_value
+        conn.cursor.return_value.fetchall.return_value = [(10, '0/10')]
+
+        self.assertEqual(database._get_written_lsns(1), {10: '0/10'})
+        self.assertEqual(database._get_written_lsns(1), {10: '0/10'})
+
+        database._connpool.getconn.assert_called_once_with()
+        conn.rollback.assert_called_once_with()
+        database._connpool.putconn.assert_called_once_with(conn, close=False)
+
+    def test_get_written_lsns_expired(self):
+        "Test get the locations from the primary once expired"
+        database = self.database(replicas=1)
+        conn = database._connpool.getconn.return_value
+        conn.cursor.return_value.fetchall.return_value = [(10, '0/10')]
+
+        with patch('trytond.backend.postgresql.database._replica_write_cache',
+                0):
+            database._get_written_lsns(1)
+            database._get_written_lsns(1)
+
+        self.assertEqual(database._connpool.getconn.call_count, 2)
+
+    def test_get_written_lsns_primary_busy(self):
+        "Test the known locations are used when the primary is busy"
+        from trytond.backend.postgresql.database import PoolError
+        database = self.database(replicas=1)
+        replica, = database._replicas
+        database._connpool.getconn.side_effect = PoolError
+        database._written_lsns[1] = (None, {10: '0/10'})
+
+        with patch.object(database, '_has_replayed',
+                return_value=True) as has_replayed:
+            conn = database._get_replica_connection(1)
+
+        self.assertIs(conn, replica.pool.getconn.return_value)
+        has_replayed.assert_called_once_with(conn, 1, {10: '0/10'})
+
+    def test_get_written_lsns_failure(self):
+        "Test the known locations are used when the primary fails"
+        from trytond.backend.postgresql.database import DatabaseError
+        database = self.database(replicas=1)
+        conn = database._connpool.getconn.return_value
+        conn.cursor.return_value.execute.side_effect = DatabaseError
+        database._written_lsns[1] = (None, {10: '0/10'})
+
+        self.assertEqual(database._get_written_lsns(1), {10: '0/10'})
+        database._connpool.putconn.assert_called_once_with(conn, close=False)
+
+    def test_has_replayed(self):
+        "Test replica has replayed the locations of each process"
+        database = self.database(replicas=1)
+        conn = Mock()
+        conn.cursor.return_value.fetchall.return_value = [
+            (10, '0/20'), (11, '1/0')]
+
+        self.assertTrue(database._has_replayed(conn, 1, {10: '0/10'}))
+        self.assertTrue(database._has_replayed(
+                conn, 1, {10: '0/20', 11: '0/FFFFFFFF'}))
+        self.assertFalse(database._has_replayed(conn, 1, {10: '0/21'}))
+        self.assertFalse(database._has_replayed(conn, 1, {12: '0/1'}))
+
+    def test_written(self):
+        "Test written registers the location in the transaction"
+        database = self.database(replicas=1)
+        connection = Mock()
+        connection.cursor.return_value.fetchone.return_value = (10, '0/10')
+
+        database.written(connection, 1)
+
+        connection.cursor.return_value.execute.assert_called_once()
+        connection.commit.assert_not_called()
+        self.assertEqual(database._written_lsns[1], (None, {10: '0/10'}))
+
+    def test_written_without_replicas(self):
+        "Test written does nothing without replicas"
+        database = self.database()
+        connection = Mock()
+
+        database.written(connection, 1)
+
+        connection.cursor.assert_not_called()
+
+
+@unittest.skipUnless(backend.name == 'postgresql', "PostgreSQL specific")
+class PostgreSQLPreparedStatementTestCase(unittest.TestCase):
+    "Test the prepared statements of PostgreSQL"
+
+    @classmethod
+    def setUpClass(cls):
+        activate_module('tests')
+
+    def connection(self, size=2):
+        "Return a new connection which prepares the statements"
+        from psycopg2 import connect
+        from trytond.backend.postgresql.database import (
+            Database, PreparedConnection)
+        params = Database._connection_params(DB_NAME)
+        params['connection_factory'] = PreparedConnection
+        conn = connect(**params)
+        self.addCleanup(conn.close)
+        conn.statement_cache.size = size
+        return conn
+
+    def prepared(self, conn):
+        "Return the names of the statements prepared on the connection"
+        cursor = conn.cursor()
+        cursor.execute('SELECT name FROM pg_prepared_statements')
+        return {n for n, in cursor}
+
+    def cursor(self, conn, threshold=2):
+        "Return a preparing cursor with the threshold"
+        from trytond.backend.postgresql import database
+        patcher = patch.object(database, '_prepare_threshold', threshold)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return conn.cursor(cursor_factory=database.PreparedCursor)
+
+    def test_to_prepare(self):
+        "Test the placeholders are numbered"
+        from trytond.backend.postgresql.database import _to_prepare
+
+        self.assertEqual(
+            _to_prepare('SELECT a FROM t WHERE b = %s AND c = %s'),
+            'SELECT a FROM t WHERE b = $1 AND c = $2')
+        self.assertEqual(
+            _to_prepare("SELECT a FROM t WHERE b LIKE 'x%%' AND c = %s"),
+            "SELECT a FROM t WHERE b LIKE 'x%' AND c = $1")
+        self.assertEqual(_to_prepare('SELECT 1'), 'SELECT 1')
+
+    def test_prepare_threshold(self):
+        "Test a SELECT is prepared after the threshold"
+        conn = self.connection()
+        cursor = self.cursor(conn, threshold=2)
+        query = 'SELECT id FROM ir_model WHERE id = %s'
+
+        cursor.execute(query, (1,))
+        self.assertNotIn(query, conn.statement_cache.statements)
+        cursor.execute(query, (1,))
+        self.assertIn(query, conn.statement_cache.statements)
+        cursor.execute(query, (1,))
+        self.assertEqual(cursor.fetchall(), [(1,)])
+
+        name, _ = conn.statement_cache.statements[query]
+        self.assertEqual(self.prepared(conn), {name})
+
+    def test_prepare_not_select(self):
+        "Test the statements which are not SELECT are not prepared"
+        conn = self.connection()
+        cursor = self.cursor(conn, threshold=1)
+
+        for _ in range(2):
+            cursor.execute('SET LOCAL statement_timeout = %s', ('0',))
+
+        self.assertFalse(conn.statement_cache.statements)
+        self.assertFalse(conn.statement_cache.seen)
+        self.assertEqual(self.prepared(conn), set())
+
+    def test_prepare_eviction(self):
+        "Test the least recently used statement is deallocated"
+        from trytond.backend.postgresql.database import _prepare_stats
+        conn = self.connection(size=1)
+        cursor = self.cursor(conn, threshold=1)
+        first = 'SELECT id FROM ir_model WHERE id = %s'
+        second = 'SELECT id FROM ir_model WHERE id > %s'
+        evictions = _prepare_stats['evictions']
+
+        cursor.execute(first, (1,))
+        cursor.execute(second, (1,))
+
+        statements = conn.statement_cache.statements
+        self.assertEqual(list(statements), [second])
+        self.assertEqual(self.prepared(conn), {statements[second][0]})
+        self.assertEqual(_prepare_stats['evictions'], evictions + 1)
+
+    def test_prepare_failure(self):
+        "Test a statement which can not be prepared"
+        conn = self.connection()
+        cursor = self.cursor(conn, threshold=1)
+        # The type of the parameter can not be determined
+        query = 'SELECT %s'
+
+        cursor.execute(query, (1,))
+        cursor.execute(query, (1,))
+
+        self.assertIn(query, conn.statement_cache.failed)
+        self.assertEqual(cursor.fetchall(), [(1,)])
+
+    def test_prepare_failure_eviction(self):
+        "Test the least recently failed statement is forgotten"
+        conn = self.connection(size=1)
+        cursor = self.cursor(conn, threshold=1)
+        # The type of the parameter can not be determined
+        queries = ['SELECT %%s, %s' % i for i in range(5)]
+
+        for query in queries:
+            cursor.execute(query, (1,))
+
+        self.assertEqual(list(conn.statement_cache.failed), queries[1:])
+
+
+@unittest.skipUnless(backend.name == 'postgresql', "PostgreSQL specific")
+class PostgreSQLSchemaSnapshotTestCase(unittest.TestCase):
+    "Test the schema snapshot of PostgreSQL"
+
+    @classmethod
+    def setUpClass(cls):
+        activate_module('tests')
+
+    def snapshot(self):
+        "Return a snapshot with tables foo and bar"
+        from trytond.backend.postgresql.table import _SchemaSnapshot
+        snapshot = _SchemaSnapshot()
+        snapshot.tables = {
+            'foo': {'indexes': ['foo_index']},
+            'bar': {'indexes': []},
+            }
+        snapshot.sequences = set()
+        return snapshot
+
+    def test_invalidate_table(self):
+        "Test invalidate the snapshot with table DDL"
+        snapshot = self.snapshot()
+
+        snapshot.invalidate('ALTER TABLE "foo" ADD COLUMN "baz" INTEGER')
+
+        self.assertIsNone(snapshot.get('foo'))
+        self.assertIsNotNone(snapshot.get('bar'))
+
+    def test_invalidate_index(self):
+        "Test invalidate the snapshot with index DDL"
+        snapshot = self.snapshot()
+
+        snapshot.invalidate('DROP INDEX "foo_index"')
+
+        self.assertIsNone(snapshot.get('foo'))
+        self.assertIsNotNone(snapshot.get('bar'))
+
+    def test_invalidate_comment(self):
+        "Test invalidate the snapshot with comments"
+        snapshot = self.snapshot()
+
+        snapshot.invalidate('COMMENT ON COLUMN "foo"."baz" IS \'Baz\'')
+        snapshot.invalidate('COMMENT ON TABLE "bar" IS \'Bar\'')
+
+        self.assertIsNone(snapshot.get('foo'))
+        self.assertIsNone(snapshot.get('bar'))
+        self.assertIsNotNone(snapshot.tables)
+
+    def test_invalidate_sequence(self):
+        "Test create sequence adds it to the snapshot"
+        snapshot = self.snapshot()
+
+        snapshot.invalidate('CREATE SEQUENCE "foo_id_seq"')
+
+        self.assertEqual(snapshot.sequences, {'foo_id_seq'})
+        self.assertIsNotNone(snapshot.get('foo'))
+
+    def test_invalidate_unknown(self):
+        "Test unknown DDL drops the snapshot"
+        snapshot = self.snapshot()
+
+        snapshot.invalidate('ALTER SEQUENCE "foo_id_seq" RESTART')
+
+        self.assertIsNone(snapshot.tables)
+        self.assertIsNone(snapshot.sequences)
+
+    @with_transaction()
+    def test_snapshot_hit(self):
+        "Test table handler uses the snapshot without querying the table"
+        from trytond.backend.postgresql.database import PerfCursor
+        from trytond.backend.postgresql.table import _snapshots
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        transaction = Transaction()
+        execute = PerfCursor.execute
+        queries = []
+
+        def record(cursor, query, vars=None):
+            queries.append(query)
+            return execute(cursor, query, vars)
+
+        with backend.TableHandler.schema_snapshot():
+            Model.__table_handler__()
+            definitions = _snapshots[transaction.connection].get(
+                Model._table)
+            self.assertEqual(definitions['comment'], Model.__doc__)
+            self.assertIn('id', definitions['columns'])
+
+            with patch.object(PerfCursor, 'execute', record):
+                Model.__table_handler__()
+
+        self.assertEqual(queries, [])
+
+    @with_transaction()
+    def test_snapshot_invalidated(self):
+        "Test table handler reloads the definitions after a DDL"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        cursor = Transaction().connection.cursor()
+
+        with backend.TableHandler.schema_snapshot():
+            table = Model.__table_handler__()
+            self.assertFalse(table.column_exist('snapshot'))
+
+            cursor.execute('ALTER TABLE "%s" ADD COLUMN snapshot INTEGER'
+                % Model._table)
+            table = Model.__table_handler__()
+
+            self.assertTrue(table.column_exist('snapshot'))
+
 
 def suite():
-    return unittest.TestLoader().loadTestsFromTestCase(BackendTestCase)
+    suite_ = unittest.TestSuite()
+    loader = unittest.TestLoader()
+    suite_.addTests(loader.loadTestsFromTestCase(BackendTestCase))
+    suite_.addTests(loader.loadTestsFromTestCase(PostgreSQLDatabaseTestCase))
+    suite_.addTests(loader.loadTestsFromTestCase(
+            PostgreSQLPreparedStatementTestCase))
+    suite_.addTests(loader.loadTestsFromTestCase(
+            PostgreSQLSchemaSnapshotTestCase))
+    return suite_
@@ -13,6 +13,9 @@ from trytond.transaction import Transaction
 
 cache = MemoryCache('test.cache')
 cache_expire = MemoryCache('test.cache_expire', duration=1)
+cache_depends = MemoryCache('test.cache_depends', depends=['test.cache'])
+cache_depends_depends = MemoryCache(
+    'test.cache_depends_depends', depends=['test.cache_depends'])
 
 
 class CacheTestCase(unittest.TestCase):
@@ -151,6 +154,36 @@ class MemoryCacheTestCase(unittest.TestCase):
         self.addCleanup(transaction3.stop)
         self.assertEqual(cache.get('foo'), None)
 
+    def test_memory_cache_depends(self):
+        "Test MemoryCache cleared with the caches it depends on"
+        caches = [cache, cache_depends, cache_depends_depends, cache_expire]
+        with Transaction().start(DB_NAME, USER):
+            for cache_ in caches:
+                cache_.set('foo', 'bar')
+
+        with Transaction().start(DB_NAME, USER) as transaction:
+            cache.clear()
+            self.assertEqual(MemoryCache._reset[transaction], {
+                    'test.cache', 'test.cache_depends',
+                    'test.cache_depends_depends'})
+        self.wait_cache_sync()
+
+        with Transaction().start(DB_NAME, USER):
+            self.assertEqual(
+                [c.get('foo') for c in caches], [None, None, None, 'bar'])
+
+    def test_memory_cache_depends_not_dependency(self):
+        "Test MemoryCache does not clear the caches it depends on"
+        with Transaction().start(DB_NAME, USER):
+            cache.set('foo', 'bar')
+
+        with Transaction().start(DB_NAME, USER):
+            cache_depends.clear()
+        self.wait_cache_sync()
+
+        with Transaction().start(DB_NAME, USER):
+            self.assertEqual(cache.get('foo'), 'bar')
+
     @with_transaction()
     def test_memory_cache_expire(self):
         "Test expired cache"
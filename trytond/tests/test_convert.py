@@ -0,0 +1,211 @@
+# This file is part of Tryton.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+from trytond.convert import TrytondXmlHandler
+from trytond.pool import Pool
+from trytond.tests.test_tryton import activate_module, with_transaction
+
+
+class ConvertTestCase(unittest.TestCase):
+    "Test convert"
+
+    @classmethod
+    def setUpClass(cls):
+        activate_module('tests')
+
+    def parse(self, data):
+        "Parse the XML data and return the create and write calls"
+        pool = Pool()
+        calls = []
+        create_records = TrytondXmlHandler.create_records
+        write_records = TrytondXmlHandler.write_records
+
+        def create(handler, model, vlist, fs_ids):
+            calls.append(('create', model, list(fs_ids)))
+            return create_records(handler, model, vlist, fs_ids)
+
+        def write(handler, module, model, *args):
+            calls.append(('write', model, list(args[4::6])))
+            return write_records(handler, module, model, *args)
+
+        handler = TrytondXmlHandler(
+            pool, 'tests', 'activated', ['ir', 'res', 'tests'])
+        with patch.object(TrytondXmlHandler, 'create_records', create), \
+                patch.object(TrytondXmlHandler, 'write_records', write):
+            handler.parse_xmlstream(BytesIO(data.encode('utf-8')))
+        return calls
+
+    def get_record(self, fs_id):
+        "Return the record of the fs_id"
+        pool = Pool()
+        ModelData = pool.get('ir.model.data')
+        data, = ModelData.search([
+                ('module', '=', 'tests'),
+                ('fs_id', '=', fs_id),
+                ])
+        Model = pool.get(data.model)
+        return Model(data.db_id)
+
+    @with_transaction(user=0)
+    def test_grouped(self):
+        "Test records are created with one call per model"
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target1">
+                <field name="value" eval="1"/>
+            </record>
+            <record model="test.many2one_target" id="convert_target2">
+                <field name="value" eval="2"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target',
+                    ['convert_target1', 'convert_target2']),
+                ])
+
+    @with_transaction(user=0)
+    def test_grouped_models_order(self):
+        "Test only the consecutive records of the same model are grouped"
+        calls = self.parse("""<tryton><data>
+            <record model="ir.sequence" id="convert_sequence1">
+                <field name="name">Sequence 1</field>
+                <field name="code">test</field>
+            </record>
+            <record model="ir.sequence.type" id="convert_sequence_type">
+                <field name="name">Convert</field>
+                <field name="code">convert</field>
+            </record>
+            <record model="ir.sequence" id="convert_sequence2">
+                <field name="name">Sequence 2</field>
+                <field name="code">convert</field>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'ir.sequence', ['convert_sequence1']),
+                ('create', 'ir.sequence.type', ['convert_sequence_type']),
+                ('create', 'ir.sequence', ['convert_sequence2']),
+                ])
+        self.assertEqual(self.get_record('convert_sequence2').code, 'convert')
+
+    @with_transaction(user=0)
+    def test_not_grouped(self):
+        "Test records are created one by one with grouped 0"
+        calls = self.parse("""<tryton><data grouped="0">
+            <record model="test.many2one_target" id="convert_target1">
+                <field name="value" eval="1"/>
+            </record>
+            <record model="test.many2one_target" id="convert_target2">
+                <field name="value" eval="2"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target', ['convert_target1']),
+                ('create', 'test.many2one_target', ['convert_target2']),
+                ])
+
+    @with_transaction(user=0)
+    def test_ref_pending(self):
+        "Test reference to a pending record creates it"
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="1"/>
+            </record>
+            <record model="test.many2one" id="convert_many2one">
+                <field name="many2one" ref="convert_target"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target', ['convert_target']),
+                ('create', 'test.many2one', ['convert_many2one']),
+                ])
+        self.assertEqual(
+            self.get_record('convert_many2one').many2one,
+            self.get_record('convert_target'))
+
+    @with_transaction(user=0)
+    def test_ref_pending_write(self):
+        "Test reference to a pending written record writes it"
+        self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="1"/>
+            </record>
+        </data></tryton>""")
+
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="2"/>
+            </record>
+            <record model="test.many2one" id="convert_many2one">
+                <field name="many2one" ref="convert_target"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('write', 'test.many2one_target', ['convert_target']),
+                ('create', 'test.many2one', ['convert_many2one']),
+                ])
+        self.assertEqual(self.get_record('convert_target').value, 2)
+
+    @with_transaction(user=0)
+    def test_redefined(self):
+        "Test record defined again in the same block"
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="1"/>
+            </record>
+            <record model="test.many2one_target" id="convert_target"
+                    update="1">
+                <field name="value" eval="2"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target', ['convert_target']),
+                ('write', 'test.many2one_target', ['convert_target']),
+                ])
+        self.assertEqual(self.get_record('convert_target').value, 2)
+
+    @with_transaction(user=0)
+    def test_search(self):
+        "Test search attribute creates the pending records"
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="4242"/>
+            </record>
+            <record model="test.many2one" id="convert_many2one">
+                <field name="many2one" search="[('value', '=', 4242)]"/>
+            </record>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target', ['convert_target']),
+                ('create', 'test.many2one', ['convert_many2one']),
+                ])
+        self.assertEqual(
+            self.get_record('convert_many2one').many2one,
+            self.get_record('convert_target'))
+
+    @with_transaction(user=0)
+    def test_menuitem(self):
+        "Test menuitem creates the pending records"
+        calls = self.parse("""<tryton><data>
+            <record model="test.many2one_target" id="convert_target">
+                <field name="value" eval="1"/>
+            </record>
+            <menuitem id="convert_menu" name="Convert"/>
+        </data></tryton>""")
+
+        self.assertEqual(calls, [
+                ('create', 'test.many2one_target', ['convert_target']),
+                ('create', 'ir.ui.menu', ['convert_menu']),
+                ])
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(ConvertTestCase)
@@ -2,6 +2,7 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of
 # this repository contains the full copyright notices and license terms.
 import unittest
+from unittest.mock import patch
 from decimal import Decimal
 import datetime
 from trytond.tests.test_tryton import activate_module, with_transaction
@@ -360,6 +361,36 @@ class ExportDataTestCase(unittest.TestCase):
             ExportData.export_data([export1], ['reference.translated']),
             [["Target"]])
 
+    @with_transaction()
+    def test_iter(self):
+        "Test export_data_iter"
+        pool = Pool()
+        ExportData = pool.get('test.export_data')
+        ExportDataTarget = pool.get('test.export_data.target')
+
+        target, = ExportDataTarget.create([{'name': "Target"}])
+        exports = ExportData.create([{
+                    'many2one': target.id,
+                    'one2many': [('create', [{'name': "Target %s" % i}])],
+                    } for i in range(3)])
+        exports = ExportData.browse(exports)
+        fields_names = ['many2one/name', 'one2many/name']
+
+        with patch('trytond.model.modelstorage._cache_record', 2):
+            rows = ExportData.export_data_iter(exports, fields_names)
+            self.assertNotIsInstance(rows, list)
+            self.assertEqual(list(rows), [
+                    ["Target", "Target 0"],
+                    ["Target", "Target 1"],
+                    ["Target", "Target 2"],
+                    ])
+
+        for export in exports:
+            self.assertIn('many2one', export._local_cache[export.id])
+
+        with self.assertRaises(KeyError):
+            ExportData.export_data_iter(exports, ['foo'])
+
     @with_transaction()
     def test_domain(self):
         "Test export data with domain"
@@ -2,6 +2,9 @@
 # this repository contains the full copyright notices and license terms.
 import unittest
 import datetime
+from unittest.mock import patch
+
+from sql import Null
 
 from trytond.model.exceptions import AccessError
 from trytond.tests.test_tryton import activate_module, with_transaction
@@ -76,6 +79,42 @@ class HistoryTestCase(unittest.TestCase):
             with self.assertRaises(AccessError):
                 History.read([history_id], ['value'])
 
+    @with_transaction()
+    def test_read_multiple(self):
+        'Test read history of multiple records'
+        pool = Pool()
+        History = pool.get('test.history')
+        transaction = Transaction()
+
+        histories = History.create([{'value': i} for i in range(5)])
+        history_ids = [h.id for h in histories]
+        first = max(h.create_date for h in histories)
+
+        transaction.commit()
+
+        History.write(History.browse(history_ids[:3]), {'value': 10})
+        History.delete(History.browse(history_ids[3:4]))
+
+        transaction.commit()
+
+        with Transaction().set_context(_datetime=first):
+            records = History.read(history_ids, ['value'])
+        self.assertEqual(
+            {r['id']: r['value'] for r in records},
+            dict(zip(history_ids, range(5))))
+
+        with Transaction().set_context(_datetime=datetime.datetime.max):
+            records = History.read(history_ids[:3], ['value'])
+        self.assertEqual([r['value'] for r in records], [10] * 3)
+
+    @unittest.skipIf(backend.name == 'postgresql',
+        'PostgreSQL uses DISTINCT ON')
+    def test_read_multiple_without_window_functions(self):
+        'Test read history of multiple records without window functions'
+        with patch.object(backend.Database, 'has_window_functions',
+                return_value=False):
+            self.test_read_multiple()
+
     @unittest.skipUnless(backend.name == 'postgresql',
         'CURRENT_TIMESTAMP as transaction_timestamp is specific to postgresql')
     @with_transaction()
@@ -507,6 +546,26 @@ class HistoryTestCase(unittest.TestCase):
             self.assertEqual({r.value for r in records}, {1})
             self.assertEqual(len(records), n)
 
+    @with_transaction()
+    def test_delete_insert_history(self):
+        'Test delete inserts the history with _insert_history'
+        pool = Pool()
+        History = pool.get('test.history')
+
+        records = History.create([{'value': 1}] * 2)
+        ids = [r.id for r in records]
+
+        with patch.object(History, '_insert_history',
+                wraps=History._insert_history) as insert_history:
+            History.delete(records)
+
+        insert_history.assert_called_once_with(ids, deleted=True)
+        history_table = History.__table_history__()
+        cursor = Transaction().connection.cursor()
+        cursor.execute(*history_table.select(history_table.id,
+                where=history_table.create_date == Null))
+        self.assertEqual(sorted(i for i, in cursor), ids)
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(HistoryTestCase)
@@ -3,6 +3,7 @@
 # this repository contains the full copyright notices and license terms.
 import datetime
 import unittest
+from unittest.mock import patch
 from decimal import InvalidOperation, Decimal
 
 from trytond.model.exceptions import (
@@ -405,6 +406,60 @@ class ImportDataTestCase(unittest.TestCase):
             Many2one.import_data(['many2one:id'], [['tests.foo']])
         transaction.rollback()
 
+    @with_transaction()
+    def test_many2one_batch(self):
+        'Test many2one resolved at once'
+        pool = Pool()
+        Many2one = pool.get('test.import_data.many2one')
+        Target = pool.get('test.import_data.many2one.target')
+
+        with patch.object(
+                Target, 'search', wraps=Target.search) as search, \
+                patch('trytond.model.modelstorage._import_batch', 2):
+            self.assertEqual(Many2one.import_data(['many2one'],
+                [['Test'], ['Test'], ['Test'], ['']]), 4)
+            search.assert_called_once()
+
+        records = Many2one.search([], order=[('id', 'DESC')], limit=4)
+        self.assertEqual(
+            [r.many2one.name if r.many2one else None for r in records],
+            [None, 'Test', 'Test', 'Test'])
+
+        with self.assertRaises(ImportDataError):
+            Many2one.import_data(['many2one'], [['Test'], ['Duplicate']])
+
+    @with_transaction()
+    def test_many2one_batch_get_rec_name(self):
+        'Test many2one resolved at once with a custom get_rec_name'
+        pool = Pool()
+        Many2one = pool.get('test.import_data.many2one')
+        Target = pool.get('test.import_data.many2one.target')
+        duplicate, _ = Target.search([('name', '=', 'Duplicate')])
+
+        def get_rec_name(self, name):
+            return self.name if self == duplicate else 'Other'
+
+        with patch.object(Target, 'get_rec_name', get_rec_name), \
+                self.assertRaises(ImportDataError):
+            Many2one.import_data(['many2one'], [['Duplicate']])
+
+    @with_transaction()
+    def test_many2one_batch_search_rec_name(self):
+        'Test many2one resolved one by one with a custom search_rec_name'
+        pool = Pool()
+        Many2one = pool.get('test.import_data.many2one')
+        Target = pool.get('test.import_data.many2one.target')
+
+        with patch.object(Target, 'search_rec_name',
+                    classmethod(lambda cls, name, clause: [
+                            ('name',) + tuple(clause[1:])])), \
+                patch.object(
+                    Target, 'search', wraps=Target.search) as search:
+            self.assertEqual(Many2one.import_data(['many2one'],
+                [['Test'], ['Test']]), 2)
+            search.assert_called_once_with([('rec_name', '=', 'Test')],
+                limit=2)
+
     @with_transaction()
     def test_many2many(self):
         'Test many2many'
@@ -3,7 +3,10 @@
 from dateutil.relativedelta import relativedelta
 import datetime
 import unittest
+from unittest.mock import patch
 
+from trytond.cache import BaseCache
+from trytond.ir.translation import _catalogs
 from trytond.pool import Pool
 from trytond.transaction import Transaction
 from .test_tryton import ModuleTestCase, with_transaction
@@ -88,6 +91,133 @@ class IrTestCase(ModuleTestCase):
 
         self.assertEqual(admin_id, admin.id)
 
+    @with_transaction()
+    def test_translation_import(self):
+        "Test Translation.translation_import"
+        pool = Pool()
+        Translation = pool.get('ir.translation')
+        po = (
+            'msgctxt "field:ir.lang,name:"\n'
+            'msgid "Name"\n'
+            'msgstr "%s"\n')
+        domain = [
+            ('lang', '=', 'fr'),
+            ('name', '=', 'ir.lang,name'),
+            ('type', '=', 'field'),
+            ('res_id', '=', -1),
+            ]
+
+        Translation.translation_import('fr', 'ir', po % "Nom")
+        translation, = Translation.search(domain)
+        self.assertEqual(translation.value, "Nom")
+
+        Translation.translation_import('fr', 'ir', po % "Nom de langue")
+        self.assertEqual(Translation.search(domain), [translation])
+        self.assertEqual(translation.value, "Nom de langue")
+
+        Translation.translation_import(
+            'fr', 'res', po.replace(':"', ':ir."') % "Langue")
+        self.assertEqual(translation.value, "Langue")
+        self.assertEqual(translation.overriding_module, 'res')
+
+    @with_transaction()
+    def test_translation_catalog(self):
+        "Test Translation catalog"
+        pool = Pool()
+        Translation = pool.get('ir.translation')
+        translation = Translation.__table__()
+        cursor = Transaction().connection.cursor()
+        args = ('ir.lang,name', 'field', 'fr', 'Name')
+        self.addCleanup(
+            _catalogs.pop, (Transaction().database.name, 'fr'), None)
+
+        cursor.execute(*translation.insert([
+                    translation.name, translation.type, translation.lang,
+                    translation.src, translation.value, translation.res_id,
+                    translation.fuzzy, translation.module],
+                [list(args) + ["Nom", -1, False, 'ir']]))
+        with patch('trytond.ir.translation._catalog', True):
+            catalog = Translation.get_catalog('fr')
+            self.assertEqual(catalog['ir.lang,name', 'field', 'Name'], "Nom")
+            self.assertEqual(catalog['ir.lang,name', 'field', None], "Nom")
+            self.assertIs(Translation.get_catalog('fr'), catalog)
+            self.assertEqual(Translation.get_source(*args), "Nom")
+
+            record, = Translation.search([
+                    ('name', '=', args[0]),
+                    ('type', '=', args[1]),
+                    ('lang', '=', args[2]),
+                    ])
+            record.value = "Nom de langue"
+            record.save()
+
+            self.assertIsNone(Translation.get_catalog('fr'))
+            self.assertEqual(Translation.get_source(*args), "Nom de langue")
+
+    @with_transaction()
+    def test_menu_tree(self):
+        "Test menu tree"
+        pool = Pool()
+        Menu = pool.get('ir.ui.menu')
+
+        parent = Menu(name="Parent")
+        parent.save()
+        child = Menu(name="Child", parent=parent)
+        child.save()
+
+        menus = Menu.get_menu_tree()
+        self.assertEqual(menus[parent.id], (None, "Parent", 'tryton-folder'))
+        self.assertEqual(
+            menus[child.id], (parent.id, "Parent / Child", 'tryton-folder'))
+        self.assertEqual(Menu.search([('name', '=', "Child")]), [child])
+
+        parent.active = False
+        parent.save()
+
+        self.assertNotIn(child.id, Menu.get_menu_tree())
+        self.assertEqual(Menu.search([('name', '=', "Child")]), [])
+        with Transaction().set_context(active_test=False):
+            self.assertEqual(Menu.search([('name', '=', "Child")]), [child])
+
+    @with_transaction()
+    def test_menu_tree_cache_depends(self):
+        "Test menu tree cache is cleared with the caches it depends on"
+        pool = Pool()
+        Menu = pool.get('ir.ui.menu')
+        Rule = pool.get('ir.rule')
+        User = pool.get('res.user')
+        Access = pool.get('ir.model.access')
+        Translation = pool.get('ir.translation')
+        Lang = pool.get('ir.lang')
+        name = Menu._menu_tree_cache._name
+
+        for cache in [
+                Rule._domain_get_cache,
+                User._get_groups_cache,
+                Access._get_access_cache,
+                Translation._translation_cache,
+                ]:
+            self.assertIn(name, BaseCache._with_dependents([cache._name]))
+        self.assertNotIn(
+            name, BaseCache._with_dependents([Lang._lang_cache._name]))
+
+    @with_transaction()
+    def test_menu_search_global(self):
+        "Test menu search global"
+        pool = Pool()
+        Menu = pool.get('ir.ui.menu')
+        ActWindow = pool.get('ir.action.act_window')
+
+        action, = ActWindow.search([], limit=1)
+        parent = Menu(name="Parent")
+        parent.save()
+        child = Menu(name="Child", parent=parent, action=action)
+        child.save()
+
+        self.assertEqual(
+            list(Menu.search_global("parent / ch")),
+            [(child, "Parent / Child", 'tryton-folder')])
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(IrTestCase)
@@ -4,12 +4,12 @@
 
 import unittest
 import time
-from unittest.mock import patch, call
+from unittest.mock import patch, call, Mock
 
 from trytond import backend
 from trytond.exceptions import ConcurrencyException
 from trytond.model.exceptions import (
-    RequiredValidationError, SQLConstraintError)
+    RequiredValidationError, SQLConstraintError, ForeignKeyError)
 from trytond.transaction import Transaction
 from trytond.pool import Pool
 from trytond.tests.test_tryton import activate_module, with_transaction
@@ -35,6 +35,60 @@ class ModelSQLTestCase(unittest.TestCase):
             sorted(values, key=lambda v: v['id']),
             [{'id': foo.id, 'name': "Foo"}, {'id': bar.id, 'name': "Bar"}])
 
+    @with_transaction()
+    def test_read_cache(self):
+        "Test read from transaction cache"
+        pool = Pool()
+        Model = pool.get('test.modelsql.read')
+        transaction = Transaction()
+
+        foo, bar = Model.create([{'name': "Foo"}, {'name': "Bar"}])
+        with patch.object(transaction, 'readonly', True):
+            Model.read([bar.id], ['name'])
+            hits = transaction.read_cache_hits
+            values = Model.read([foo.id, bar.id], ['name'])
+
+        self.assertEqual(transaction.read_cache_hits, hits + 1)
+        self.assertEqual(values, [
+                {'id': foo.id, 'name': "Foo"},
+                {'id': bar.id, 'name': "Bar"}])
+
+    @with_transaction()
+    def test_read_cache_not_readonly(self):
+        "Test read does not use transaction cache when not readonly"
+        pool = Pool()
+        Model = pool.get('test.modelsql.read')
+        transaction = Transaction()
+        table = Model.__table__()
+        cursor = transaction.connection.cursor()
+
+        foo, = Model.create([{'name': "Foo"}])
+        Model.read([foo.id], ['name'])
+        hits = transaction.read_cache_hits
+        cursor.execute(*table.update([table.name], ["Bar"]))
+        values = Model.read([foo.id], ['name'])
+
+        self.assertEqual(transaction.read_cache_hits, hits)
+        self.assertEqual(values, [{'id': foo.id, 'name': "Bar"}])
+
+    @with_transaction()
+    def test_read_cache_counter(self):
+        "Test read from transaction cache is refreshed by counter"
+        pool = Pool()
+        Model = pool.get('test.modelsql.read')
+        transaction = Transaction()
+        table = Model.__table__()
+        cursor = transaction.connection.cursor()
+
+        foo, = Model.create([{'name': "Foo"}])
+        with patch.object(transaction, 'readonly', True):
+            Model.read([foo.id], ['name'])
+            cursor.execute(*table.update([table.name], ["Bar"]))
+            transaction.counter += 1
+            values = Model.read([foo.id], ['name'])
+
+        self.assertEqual(values, [{'id': foo.id, 'name': "Bar"}])
+
     @with_transaction()
     def test_read_context_id(self):
         "Test read with ID in context of field"
@@ -404,6 +458,91 @@ class ModelSQLTestCase(unittest.TestCase):
         delete_ids.assert_called_with(
             'test.modelsql.translation', 'model', [record.id])
 
+    @with_transaction()
+    def test_delete_cascade(self):
+        "Test delete cascades to the related records"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        Target = pool.get('test.modelsql.delete.target')
+
+        records = Model.create([{'name': str(i)} for i in range(5)])
+        Target.create([{'cascade': r.id} for r in records])
+
+        Model.delete(records)
+
+        self.assertEqual(Target.search([], count=True), 0)
+
+    @with_transaction()
+    def test_delete_set_null(self):
+        "Test delete sets null on the related records"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        Target = pool.get('test.modelsql.delete.target')
+
+        records = Model.create([{'name': str(i)} for i in range(5)])
+        targets = Target.create([{'set_null': r.id} for r in records])
+
+        Model.delete(records)
+
+        self.assertEqual(
+            [t.set_null for t in Target.browse(targets)], [None] * 5)
+
+    @with_transaction()
+    def test_delete_restrict(self):
+        "Test delete is prevented by restricting related records"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        Target = pool.get('test.modelsql.delete.target')
+
+        records = Model.create([{'name': str(i)} for i in range(5)])
+        Target.create([{'restrict': records[-1].id}])
+
+        with self.assertRaises(ForeignKeyError):
+            Model.delete(records)
+
+    @with_transaction()
+    def test_delete_foreign_keys(self):
+        "Test foreign keys to process on delete"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        Target = pool.get('test.modelsql.delete.target')
+
+        tocheck, toupdate, todelete = Model._get_delete_foreign_keys()
+
+        self.assertIn((Target, 'restrict'), tocheck)
+        self.assertIn((Target, 'set_null'), toupdate)
+        self.assertIn((Target, 'cascade'), todelete)
+
+    @with_transaction()
+    def test_reverse_relations(self):
+        "Test reverse relations of the pool"
+        pool = Pool()
+
+        relations = pool.get_reverse_relations('test.modelsql.delete')
+
+        self.assertEqual(sorted(relations), [
+                ('test.modelsql.delete.target', 'cascade', 'CASCADE'),
+                ('test.modelsql.delete.target', 'restrict', 'RESTRICT'),
+                ('test.modelsql.delete.target', 'set_null', 'SET NULL'),
+                ])
+        self.assertIs(
+            pool.get_reverse_relations('test.modelsql.delete'), relations)
+
+    @with_transaction()
+    def test_delete_integrity_error_constraint(self):
+        "Test delete integrity error matches the exact constraint name"
+        pool = Pool()
+        Model = pool.get('test.modelsql.delete')
+        Target = pool.get('test.modelsql.delete.target')
+        raise_error = Model._ModelSQL__raise_delete_integrity_error
+        name = backend.TableHandler.convert_name(
+            '%s_restrict_fkey' % Target._table)
+
+        with self.assertRaises(ForeignKeyError):
+            raise_error(Mock(diag=Mock(constraint_name=name)))
+        for constraint_name in [name + '_2', name[:-1], None]:
+            raise_error(Mock(diag=Mock(constraint_name=constraint_name)))
+
     @with_transaction()
     def test_constraint_check(self):
         "Test check constraint"
@@ -2,6 +2,7 @@
 # repository contains the full copyright notices and license terms.
 
 import unittest
+from unittest.mock import patch
 
 from trytond.model import EvalEnvironment
 from trytond.model.exceptions import (
@@ -248,6 +249,65 @@ class ModelStorageTestCase(unittest.TestCase):
         self.assertEqual(len(record.m2m_targets), 0)
         self.assertEqual(Target.search([], count=True), 1)
 
+    @with_transaction()
+    def test_prefetch(self):
+        "Test prefetch"
+        pool = Pool()
+        ModelStorage = pool.get('test.modelstorage.save2many')
+        Target = pool.get('test.modelstorage.save2many.target')
+
+        records = ModelStorage.create([{
+                    'targets': [('create', [{}, {}])],
+                    } for _ in range(3)])
+        records = ModelStorage.browse(records)
+
+        with patch.object(ModelStorage, 'read', wraps=ModelStorage.read
+                ) as read, \
+                patch.object(Target, 'read', wraps=Target.read
+                ) as target_read:
+            ModelStorage.prefetch(records, ['targets.parent', 'm2m_targets'])
+
+            self.assertEqual(read.call_count, 1)
+            self.assertEqual(target_read.call_count, 1)
+
+            for record in records:
+                self.assertEqual(len(record.targets), 2)
+                self.assertEqual(record.m2m_targets, ())
+                for target in record.targets:
+                    self.assertEqual(target.parent, record)
+
+            self.assertEqual(read.call_count, 1)
+            self.assertEqual(target_read.call_count, 1)
+
+    @with_transaction()
+    def test_prefetch_size_limit(self):
+        "Test prefetch keeps the size limit of the caches"
+        pool = Pool()
+        ModelStorage = pool.get('test.modelstorage.save2many')
+
+        records = ModelStorage.create([{} for _ in range(5)])
+        with Transaction().set_context(_record_cache_size=2):
+            records = ModelStorage.browse(records)
+        local_cache = records[0]._local_cache
+
+        ModelStorage.prefetch(records, ['targets'])
+
+        self.assertEqual(local_cache.size_limit, 2)
+        self.assertEqual(len(local_cache), 2)
+
+    @with_transaction()
+    def test_prefetch_unknown_field(self):
+        "Test prefetch with unknown field"
+        pool = Pool()
+        ModelStorage = pool.get('test.modelstorage.save2many')
+
+        record, = ModelStorage.create([{}])
+
+        for fields_names in [['foo'], ['targets.foo'], ['id.foo']]:
+            with self.subTest(fields_names=fields_names):
+                with self.assertRaises(ValueError):
+                    ModelStorage.prefetch([record], fields_names)
+
     @with_transaction(context={'_check_access': True})
     def test_model_translations(self):
         'Test any user can translate fields and duplicate its records'
@@ -366,6 +426,65 @@ class ModelStorageTestCase(unittest.TestCase):
         self.assertEqual(cm.exception.domain[0], [('value', '=', 'valid')])
         self.assertTrue(cm.exception.domain[1]['value'])
 
+    @with_transaction()
+    def test_relation_domain_multiple(self):
+        "Test valid relation domain on multiple records"
+        pool = Pool()
+        Model = pool.get('test.modelstorage.relation_domain')
+        Target = pool.get('test.modelstorage.relation_domain.target')
+
+        targets = Target.create([{'value': 'valid'}] * 10)
+
+        records = Model.create([{'relation': t.id} for t in targets])
+
+        self.assertEqual(len(records), 10)
+
+    @with_transaction()
+    def test_relation_domain_multiple_invalid(self):
+        "Test invalid relation domain on multiple records"
+        pool = Pool()
+        Model = pool.get('test.modelstorage.relation_domain')
+        Target = pool.get('test.modelstorage.relation_domain.target')
+
+        targets = Target.create(
+            [{'value': 'valid'}] * 10 + [{'value': 'invalid'}])
+
+        with self.assertRaises(DomainValidationError):
+            Model.create([{'relation': t.id} for t in targets])
+
+    @with_transaction()
+    def test_validation_plan(self):
+        "Test validation plan"
+        pool = Pool()
+        Model = pool.get('test.modelstorage.pyson_domain')
+
+        validations = {v.name: v for v in Model._get_validation_plan()}
+
+        self.assertTrue(validations['value'].domain_pyson)
+        self.assertIsInstance(validations['value'].domain, str)
+        self.assertIsNone(validations['constraint'].domain)
+
+    @with_transaction()
+    def test_validation_plan_deactivable(self):
+        "Test validation plan includes depends added by DeactivableMixin"
+        pool = Pool()
+        Model = pool.get('test.modelstorage.deactivable_domain')
+
+        validations = {v.name: v for v in Model._get_validation_plan()}
+
+        self.assertIn('active', validations['value'].depends)
+
+    @with_transaction()
+    def test_write_active_domain_invalid(self):
+        "Test writing only active validates the fields depending on it"
+        pool = Pool()
+        Model = pool.get('test.modelstorage.deactivable_domain')
+
+        record, = Model.create([{'active': False, 'value': 'invalid'}])
+
+        with self.assertRaises(DomainValidationError):
+            Model.write([record], {'active': True})
+
     @with_transaction()
     def test_relation2_domain_invalid(self):
         "Test invalid relation domain with 2 level"
@@ -582,6 +582,55 @@ class ModelView(unittest.TestCase):
 
         self.assertIn('bar', fields)
 
+    @with_transaction()
+    def test_compiled_views(self):
+        "Testing compiled views give the same definition"
+        pool = Pool()
+        View = pool.get('ir.ui.view')
+        ViewCompiled = pool.get('ir.ui.view.compiled')
+        Lang = pool.get('ir.lang')
+
+        expected = Lang.fields_view_get(view_type='form')
+        with patch('trytond.ir.ui.view._compiled', True):
+            ViewCompiled.compile()
+            self.assertIsNotNone(ViewCompiled.get('ir.lang', None, 'form'))
+
+            Lang._fields_view_get_cache.clear()
+            with patch.object(Lang, '_fields_view_arch') as fields_view_arch:
+                result = Lang.fields_view_get(view_type='form')
+                fields_view_arch.assert_not_called()
+            self.assertEqual(result, expected)
+
+            views = View.search([('model', '=', 'ir.lang')])
+            View.write(views, {'priority': 20})
+            self.assertIsNone(ViewCompiled.get('ir.lang', None, 'form'))
+            self.assertIsNotNone(
+                ViewCompiled.get('ir.sequence', None, 'form'))
+
+    @with_transaction()
+    def test_compiled_views_inherit(self):
+        "Testing compiled views are removed with the inherited views"
+        pool = Pool()
+        View = pool.get('ir.ui.view')
+        ViewCompiled = pool.get('ir.ui.view.compiled')
+
+        with patch('trytond.ir.ui.view._compiled', True):
+            ViewCompiled.compile()
+            view, = View.search([
+                    ('model', '=', 'ir.lang'),
+                    ('type', '=', 'form'),
+                    ('inherit', '=', None),
+                    ])
+            View.create([{
+                        'model': 'ir.sequence',
+                        'inherit': view.id,
+                        'arch': '<data/>',
+                        }])
+
+            self.assertIsNone(ViewCompiled.get('ir.lang', None, 'form'))
+            self.assertIsNone(ViewCompiled.get('ir.sequence', None, 'form'))
+            self.assertIsNotNone(ViewCompiled.get('ir.model', None, 'form'))
+
 
 def suite():
     func = unittest.TestLoader().loadTestsFromTestCase
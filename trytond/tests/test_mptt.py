@@ -202,6 +202,59 @@ class MPTTTestCase(unittest.TestCase):
                     }])
         self.check_tree()
 
+    @with_transaction()
+    def test_create_multiple(self):
+        "Test create multiple records insert them in the tree"
+        pool = Pool()
+        Mptt = pool.get('test.mptt')
+
+        self.create()
+        parents = Mptt.search([('parent', '=', None)])
+
+        with patch.object(Mptt, '_rebuild_tree') as rebuild:
+            Mptt.create([{
+                        'name': 'Test multiple %s' % i,
+                        'parent': parents[i % len(parents)].id,
+                        } for i in range(10)]
+                + [{'name': 'Test multiple root %s' % i} for i in range(2)])
+            self.assertFalse(rebuild.called)
+        self.check_tree()
+
+    @with_transaction()
+    def test_rebuild_tree(self):
+        "Test rebuild tree"
+        pool = Pool()
+        Mptt = pool.get('test.mptt')
+        table = Mptt.__table__()
+        cursor = Transaction().connection.cursor()
+
+        self.create()
+        cursor.execute(*table.update([table.left, table.right], [0, 0]))
+        Mptt._rebuild_tree('parent', None, 0)
+        self.check_tree()
+
+    @with_transaction()
+    def test_rebuild_tree_deep(self):
+        "Test rebuild tree deeper than the recursion limit"
+        pool = Pool()
+        Mptt = pool.get('test.mptt')
+        table = Mptt.__table__()
+        cursor = Transaction().connection.cursor()
+
+        depth = sys.getrecursionlimit() + 10
+        records = Mptt.create(
+            [{'name': 'Test deep %s' % i} for i in range(depth)])
+        for parent, record in zip(records, records[1:]):
+            cursor.execute(*table.update([table.parent], [parent.id],
+                    where=table.id == record.id))
+        Mptt._rebuild_tree('parent', None, 0)
+
+        cursor.execute(*table.select(table.left, table.right,
+                where=table.id.in_([records[0].id, records[-1].id]),
+                order_by=table.left))
+        self.assertEqual(
+            cursor.fetchall(), [(1, 2 * depth), (depth, depth + 1)])
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(MPTTTestCase)
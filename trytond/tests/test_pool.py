@@ -0,0 +1,166 @@
+# This file is part of Tryton.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+import unittest
+from unittest.mock import Mock, patch
+
+from trytond.model import ModelView
+from trytond.modules import create_graph
+from trytond.pool import Pool
+from trytond.tests.test_tryton import activate_module, DB_NAME
+from trytond.transaction import Transaction
+
+from .mixin import TestMixin, TestSecondMixin
+
+
+class PoolTestCase(unittest.TestCase):
+    "Test Pool"
+
+    @classmethod
+    def setUpClass(cls):
+        activate_module('tests')
+
+    def test_get_profile(self):
+        "Test profile of the pool init"
+        pool = Pool(DB_NAME)
+
+        profile = pool.get_profile()
+
+        self.assertIn('ir', profile['import'])
+        self.assertIn('ir.model', profile['__setup__'])
+        self.assertIn('ir.model', profile['__post_setup__'])
+        for durations in profile.values():
+            for duration in durations.values():
+                self.assertGreaterEqual(duration, 0)
+
+    def test_prefork(self):
+        "Test prefork registers the fork hook once and freezes the objects"
+        with patch.object(Pool, '_preforked', ()), \
+                patch('trytond.pool.os') as os, \
+                patch('trytond.pool.gc') as gc, \
+                patch('trytond.iwc.stop'), \
+                patch('trytond.backend.Database'), \
+                patch('trytond.cache.Cache.drop') as drop:
+            Pool.prefork([DB_NAME])
+
+            os.register_at_fork.assert_called_once_with(
+                after_in_child=Pool._after_fork)
+            gc.freeze.assert_called_once_with()
+            drop.assert_called_once_with(DB_NAME)
+            self.assertEqual(Pool._preforked, (DB_NAME,))
+
+            Pool.prefork([DB_NAME])
+
+            os.register_at_fork.assert_called_once_with(
+                after_in_child=Pool._after_fork)
+
+    def test_prefork_without_fork_hook(self):
+        "Test prefork without register_at_fork nor gc.freeze"
+        with patch.object(Pool, '_preforked', ()), \
+                patch('trytond.pool.os', Mock(spec=[])), \
+                patch('trytond.pool.gc', Mock(spec=[])), \
+                patch('trytond.iwc.stop'), \
+                patch('trytond.backend.Database'), \
+                patch('trytond.cache.Cache.drop'):
+            Pool.prefork([DB_NAME])
+
+            self.assertEqual(Pool._preforked, (DB_NAME,))
+
+    def test_after_fork(self):
+        "Test the locks are recreated and the communication restarted"
+        with patch.object(Pool, '_preforked', (DB_NAME,)), \
+                patch.object(Pool, '_lock'), \
+                patch.object(Pool, '_locks', dict(Pool._locks)), \
+                patch('trytond.iwc.start') as start:
+            lock, locks = Pool._lock, dict(Pool._locks)
+
+            Pool._after_fork()
+
+            self.assertIsNot(Pool._lock, lock)
+            self.assertEqual(Pool._locks.keys(), locks.keys())
+            for name, lock in locks.items():
+                self.assertIsNot(Pool._locks[name], lock)
+            start.assert_called_once_with(DB_NAME)
+
+    def pool(self):
+        "Return the pool which is restored after the test"
+        pool = Pool(DB_NAME)
+        registry = pool._pool[DB_NAME]
+
+        def restore():
+            pool._pool[DB_NAME] = registry
+            pool._reverse_relations.pop(DB_NAME, None)
+        self.addCleanup(restore)
+        return pool
+
+    def test_reload(self):
+        "Test reload of the pool for a module"
+        pool = self.pool()
+        registry = pool._pool[DB_NAME]
+        Model = pool.get('test.modelsql.delete')
+        User = pool.get('res.user')
+
+        pool.reload(['tests'])
+
+        self.assertIsNot(pool._pool[DB_NAME], registry)
+        self.assertIsNot(pool.get('test.modelsql.delete'), Model)
+        self.assertEqual(
+            pool.get('test.modelsql.delete')._fields.keys(),
+            Model._fields.keys())
+        self.assertIs(pool.get('res.user'), User)
+        with Transaction().start(DB_NAME, 0) as transaction:
+            Model = pool.get('test.modelsql.delete')
+            record, = Model.create([{}])
+            self.assertTrue(record.id)
+            transaction.rollback()
+
+    def test_reload_mixin(self):
+        "Test reload applies the mixins of the modules to all the classes"
+        pool = self.pool()
+        registry = pool._pool[DB_NAME]
+        activated = {'ir', 'res', 'tests'}
+        User = registry['model']['res.user']
+        # Remove the mixins of tests like if it was just activated
+        while User.__bases__[0] in {TestMixin, TestSecondMixin}:
+            User = User.__bases__[1]
+        current = {type_: dict(classes) for type_, classes in registry.items()}
+        current['model']['res.user'] = User
+
+        with Transaction().start(DB_NAME, 0, readonly=True):
+            new, rebuilt = pool._build(
+                current, ['tests'], activated, create_graph(activated))
+
+        for mixin in [TestMixin, TestSecondMixin]:
+            self.assertTrue(issubclass(new['model']['res.user'], mixin))
+        self.assertIn(new['model']['res.user'], rebuilt)
+        self.assertIn(new['model']['test.modelsql.delete'], rebuilt)
+        self.assertNotIn(new['model']['ir.model'], rebuilt)
+
+    def test_reload_cache(self):
+        "Test reload clears the caches of the rebuilt classes"
+        pool = self.pool()
+        cache = ModelView._fields_view_get_cache
+
+        with patch.object(cache, '_clear') as clear:
+            pool.reload(['tests'])
+
+        clear.assert_called_once_with(DB_NAME)
+
+    def test_reload_post_init(self):
+        "Test reload registers the post init hooks of the modules"
+        pool = self.pool()
+        hook = Mock()
+        init_hooks = dict(pool._init_hooks)
+        init_hooks['tests'] = init_hooks.get('tests', []) + [hook]
+
+        with patch.object(Pool, '_init_hooks', init_hooks), \
+                patch.dict(pool._post_init_calls):
+            pool.reload(['tests'])
+            pool.reload(['tests'])
+            pool.post_init(None)
+
+            self.assertEqual(pool._post_init_calls[DB_NAME].count(hook), 1)
+        self.assertEqual(hook.call_count, 3)
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(PoolTestCase)
@@ -4,6 +4,7 @@
 import base64
 import json
 import unittest
+from unittest.mock import patch
 
 from werkzeug.test import Client
 from werkzeug.wrappers import BaseResponse
@@ -196,6 +197,27 @@ class RoutesTestCase(unittest.TestCase):
         self.assertEqual(response_locale.status_code, 200)
         self.assertNotEqual(response_std.data, response_locale.data)
 
+    def test_data_deleted_record(self):
+        "Test GET data skips the records deleted after the search"
+        pool = Pool(DB_NAME)
+        with Transaction().start(DB_NAME, 0, readonly=True):
+            User = pool.get('res.user')
+            admin, = User.search([('login', '=', 'admin')])
+            admin_id = admin.id
+        c = Client(app, BaseResponse)
+
+        with patch('trytond.ir.routes.EXPORT_CHUNK', 1):
+            response = c.get(
+                self.data_url('res.user'), headers=self.auth_headers,
+                query_string=[
+                    ('f', 'name'),
+                    ('d', json.dumps([admin_id, -1, admin_id])),
+                    ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data, b'name\r\nAdministrator\r\nAdministrator\r\n')
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(RoutesTestCase)
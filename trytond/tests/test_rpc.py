@@ -3,8 +3,11 @@
 import unittest
 from unittest.mock import Mock, DEFAULT, call
 
-from trytond.tests.test_tryton import with_transaction, activate_module
-from trytond.rpc import RPC
+from trytond.tests.test_tryton import (
+    with_transaction, activate_module, DB_NAME, USER)
+from trytond.model import ModelView
+from trytond.rpc import RPC, RPCCache
+from trytond.pool import Pool
 from trytond.transaction import Transaction
 
 
@@ -142,6 +145,47 @@ class RPCTestCase(unittest.TestCase):
             rpc_with_access.convert(None, {}),
             ([], {}, {'_check_access': True}, None))
 
+    @with_transaction()
+    def test_cache_etag(self):
+        "Test cache ETag"
+        rpc_cache = RPCCache(days=1)
+        key = rpc_cache.etag_key(USER, Mock(__name__='test'), 'foo', [1], {})
+
+        self.assertIsNone(rpc_cache.get_etag(key))
+        etag = rpc_cache.set_etag(key, {'foo': [1, 2]})
+        self.assertEqual(rpc_cache.get_etag(key), etag)
+        self.assertEqual(
+            rpc_cache.set_etag(key, {'foo': [1, 2]}), etag)
+        self.assertNotEqual(
+            rpc_cache.set_etag(key, {'foo': [1, 3]}), etag)
+
+    @with_transaction()
+    def test_cache_etag_expired(self):
+        "Test cache ETag expired"
+        rpc_cache = RPCCache(seconds=0)
+        key = rpc_cache.etag_key(USER, Mock(__name__='test'), 'foo', [], {})
+
+        rpc_cache.set_etag(key, 'bar')
+        self.assertIsNone(rpc_cache.get_etag(key))
+
+    def test_cache_etag_cleared(self):
+        "Test cache ETag cleared with the caches it depends on"
+        rpc_cache = RPCCache(days=1)
+        key = rpc_cache.etag_key(USER, Mock(__name__='test'), 'foo', [], {})
+
+        with Transaction().start(DB_NAME, USER):
+            etag = rpc_cache.set_etag(key, 'bar')
+        with Transaction().start(DB_NAME, USER):
+            pool = Pool()
+            Lang = pool.get('ir.lang')
+            Lang._lang_cache.clear()
+        with Transaction().start(DB_NAME, USER):
+            self.assertEqual(rpc_cache.get_etag(key), etag)
+        with Transaction().start(DB_NAME, USER):
+            ModelView._fields_view_get_cache.clear()
+        with Transaction().start(DB_NAME, USER):
+            self.assertIsNone(rpc_cache.get_etag(key))
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(RPCTestCase)
@@ -3,9 +3,12 @@
 import json
 import unittest
 
+from trytond.ir.rule import groups_only
 from trytond.model.exceptions import AccessError
 from trytond.pool import Pool
+from trytond.pyson import Eval, PYSONEncoder
 from trytond.tests.test_tryton import activate_module, with_transaction
+from trytond.transaction import Transaction
 
 
 class ModelRuleTestCase(unittest.TestCase):
@@ -379,6 +382,138 @@ class ModelRuleTestCase(unittest.TestCase):
 
         self.assertListEqual(TestRule.search([]), [])
 
+    def test_groups_only(self):
+        "Test groups only"
+        encoder = PYSONEncoder()
+        for domain, result in [
+                ([('field', '=', 'foo')], True),
+                ([('field', 'in', Eval('user', {}).get('groups', []))], True),
+                ([('field', 'in', Eval('user.groups', []))], True),
+                ([('field', '=', Eval('user', {}).get('login'))], False),
+                ([('field', '=', Eval('user.id'))], False),
+                ([('field', '=', Eval('companies'))], False),
+                ]:
+            with self.subTest(domain=domain):
+                self.assertEqual(
+                    groups_only(json.loads(encoder.encode(domain))), result)
+
+    def _create_users(self, groups=None):
+        pool = Pool()
+        User = pool.get('res.user')
+        return User.create([{
+                    'login': login,
+                    'groups': [('add', [g.id for g in groups or []])],
+                    } for login in ['user1', 'user2']])
+
+    def _create_rule_group(self, domain, groups=None):
+        pool = Pool()
+        RuleGroup = pool.get('ir.rule.group')
+        Model = pool.get('ir.model')
+
+        model, = Model.search([('model', '=', 'test.rule')])
+        rule_group, = RuleGroup.create([{
+                    'name': "Rule",
+                    'model': model.id,
+                    'global_p': not groups,
+                    'perm_read': True,
+                    'perm_create': False,
+                    'perm_write': False,
+                    'perm_delete': False,
+                    'groups': [('add', [g.id for g in groups or []])],
+                    'rules': [('create', [{
+                                    'domain': PYSONEncoder().encode(domain),
+                                    }])],
+                    }])
+        return rule_group
+
+    @with_transaction()
+    def test_domain_shared(self):
+        "Test domain shared by users with the same groups"
+        pool = Pool()
+        Rule = pool.get('ir.rule')
+        User = pool.get('res.user')
+        self._create_rule_group([('field', '!=', 'foo')])
+        user1, user2 = self._create_users()
+
+        with Transaction().set_user(user1.id):
+            domain = Rule.domain_get('test.rule')
+            groups = User.get_groups_key()
+
+        self.assertTrue(Rule._get_shared('test.rule'))
+        self.assertEqual(
+            Rule._domain_get_cache.get(('test.rule', 'read', groups, None)),
+            domain)
+        with Transaction().set_user(user2.id):
+            self.assertEqual(Rule.domain_get('test.rule'), domain)
+
+    @with_transaction()
+    def test_domain_per_user(self):
+        "Test domain depending on the user"
+        pool = Pool()
+        Rule = pool.get('ir.rule')
+        TestRule = pool.get('test.rule')
+        self._create_rule_group(
+            [('field', '=', Eval('user', {}).get('login'))])
+        user1, user2 = self._create_users()
+        test1, test2 = TestRule.create([
+                {'field': 'user1'}, {'field': 'user2'}])
+
+        self.assertFalse(Rule._get_shared('test.rule'))
+        with Transaction().set_user(user1.id):
+            self.assertListEqual(TestRule.search([]), [test1])
+        with Transaction().set_user(user2.id):
+            self.assertListEqual(TestRule.search([]), [test2])
+
+    @with_transaction()
+    def test_domain_user_groups_changed(self):
+        "Test domain when the groups of the user change"
+        pool = Pool()
+        Group = pool.get('res.group')
+        User = pool.get('res.user')
+        TestRule = pool.get('test.rule')
+        group, = Group.create([{'name': "Group"}])
+        self._create_rule_group([('field', '!=', 'foo')], groups=[group])
+        user1, user2 = self._create_users([group])
+        test1, test2 = TestRule.create([{'field': 'foo'}, {'field': 'bar'}])
+
+        with Transaction().set_user(user1.id):
+            self.assertListEqual(TestRule.search([]), [test2])
+        with Transaction().set_user(user2.id):
+            self.assertListEqual(TestRule.search([]), [test2])
+
+        User.write([user1], {'groups': [('remove', [group.id])]})
+
+        with Transaction().set_user(user1.id):
+            self.assertListEqual(
+                TestRule.search([], order=[('id', 'ASC')]), [test1, test2])
+        with Transaction().set_user(user2.id):
+            self.assertListEqual(TestRule.search([]), [test2])
+
+    @with_transaction()
+    def test_domain_rule_changed(self):
+        "Test domain when the rule changes"
+        pool = Pool()
+        Rule = pool.get('ir.rule')
+        TestRule = pool.get('test.rule')
+        rule_group = self._create_rule_group([('field', '!=', 'foo')])
+        user1, _ = self._create_users()
+        test1, test2, test3 = TestRule.create([
+                {'field': 'foo'}, {'field': 'user1'}, {'field': 'bar'}])
+
+        with Transaction().set_user(user1.id):
+            self.assertListEqual(
+                TestRule.search([], order=[('id', 'ASC')]), [test2, test3])
+
+        rule, = rule_group.rules
+        Rule.write([rule], {
+                'domain': PYSONEncoder().encode(
+                    [('field', '=', Eval('user', {}).get('login'))]),
+                })
+
+        self.assertFalse(Rule._get_shared('test.rule'))
+        with Transaction().set_user(user1.id):
+            self.assertListEqual(TestRule.search([]), [test2])
+
 
 def suite():
     suite_ = unittest.TestSuite()
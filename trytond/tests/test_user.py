@@ -1,11 +1,14 @@
 # This file is part of Tryton.  The COPYRIGHT file at the top level of this
 # repository contains the full copyright notices and license terms.
 import datetime
+import json
 import os
 import unittest
 from unittest.mock import patch, ANY
 
 from trytond.tests.test_tryton import activate_module, with_transaction
+from trytond.cache import BaseCache
+from trytond.model import ModelView
 from trytond.pool import Pool
 from trytond.config import config
 from trytond.res import user as user_module
@@ -205,6 +208,122 @@ class UserTestCase(unittest.TestCase):
                     'password': user.password_reset,
                     }))
 
+    @with_transaction()
+    def test_get_preferences(self):
+        "Test get preferences"
+        pool = Pool()
+        User = pool.get('res.user')
+
+        user = self.create_user('user', '12345')
+        with Transaction().set_user(user.id):
+            preferences = User.get_preferences()
+
+        self.assertEqual(preferences['name'], 'user')
+        self.assertEqual(preferences['menu'], user.menu.id)
+        self.assertEqual(
+            preferences['menu.rec_name'], user.menu.rec_name)
+        self.assertEqual(preferences['language'], 'en')
+        self.assertEqual(
+            preferences['groups'], [g.id for g in user.groups])
+
+    @with_transaction()
+    def test_get_bootstrap(self):
+        "Test get bootstrap"
+        pool = Pool()
+        User = pool.get('res.user')
+        Menu = pool.get('ir.ui.menu')
+
+        def dumps(value):
+            # Compare the values as sent to the client
+            return json.dumps(value, sort_keys=True)
+
+        user = self.create_user('user', '12345')
+        with Transaction().set_user(user.id):
+            bootstrap = User.get_bootstrap([
+                    ('ir.ui.menu', None, 'tree'),
+                    ('ir.ui.menu', None, 'form'),
+                    ])
+
+            self.assertEqual(
+                dumps(bootstrap['preferences']),
+                dumps(User.get_preferences()))
+            self.assertEqual(
+                dumps(bootstrap['preferences_view']),
+                dumps(User.get_preferences_fields_view()))
+            self.assertEqual(dumps(bootstrap['views']), dumps([
+                        Menu.fields_view_get(view_type='tree'),
+                        Menu.fields_view_get(view_type='form'),
+                        ]))
+            self.assertEqual(
+                dumps(bootstrap['toolbars']),
+                dumps({'ir.ui.menu': Menu.view_toolbar_get()}))
+            self.assertEqual(
+                [m['id'] for m in bootstrap['menu']],
+                [m.id for m in Menu.search([('parent', '=', None)])])
+            self.assertEqual(dumps(User.get_bootstrap([
+                            ('ir.ui.menu', None, 'tree'),
+                            ('ir.ui.menu', None, 'form'),
+                            ])), dumps(bootstrap))
+
+    @with_transaction()
+    def test_get_bootstrap_cache_depends(self):
+        "Test bootstrap cache is cleared with the caches it depends on"
+        pool = Pool()
+        User = pool.get('res.user')
+        Access = pool.get('ir.model.access')
+        FieldAccess = pool.get('ir.model.field.access')
+        Translation = pool.get('ir.translation')
+        Lang = pool.get('ir.lang')
+        name = User._get_bootstrap_cache._name
+
+        for cache in [
+                User._get_preferences_cache,
+                User._get_groups_cache,
+                ModelView._fields_view_get_cache,
+                ModelView._view_toolbar_get_cache,
+                Access._get_access_cache,
+                FieldAccess._get_access_cache,
+                Translation._translation_cache,
+                ]:
+            self.assertIn(name, BaseCache._with_dependents([cache._name]))
+        self.assertNotIn(
+            name, BaseCache._with_dependents([Lang._lang_cache._name]))
+
+    @with_transaction()
+    def test_menu_tree_groups(self):
+        "Test menu tree filtered by groups"
+        pool = Pool()
+        Menu = pool.get('ir.ui.menu')
+        Group = pool.get('res.group')
+
+        group = Group(name="Group", users=[Transaction().user])
+        group.save()
+        parent = Menu(name="Parent", groups=[group])
+        parent.save()
+        child = Menu(name="Child", parent=parent)
+        child.save()
+        user = self.create_user('user', '12345')
+
+        with Transaction().set_user(user.id):
+            self.assertNotIn(child.id, Menu.get_menu_tree())
+            self.assertEqual(Menu.search([('name', '=', "Child")]), [])
+
+        user.groups += (group,)
+        user.save()
+
+        with Transaction().set_user(user.id):
+            self.assertIn(child.id, Menu.get_menu_tree())
+            self.assertEqual(Menu.search([('name', '=', "Child")]), [child])
+
+    @with_transaction()
+    def test_get_bootstrap_invalid_model(self):
+        "Test get bootstrap with a model without view"
+        pool = Pool()
+        User = pool.get('res.user')
+
+        with self.assertRaises(ValueError):
+            User.get_bootstrap([('ir.cache', None, 'form')])
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(UserTestCase)
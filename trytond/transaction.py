@@ -59,6 +59,8 @@ class Transaction(object):
     trigger_records = None
     timestamp = None
     started_at = None
+    read_cache_hits = 0
+    read_cache_misses = 0
 
     def __new__(cls, new=False):
         transactions = cls._local.transactions
@@ -108,7 +110,7 @@ class Transaction(object):
             database = backend.Database(database_name).connect()
         Flavor.set(backend.Database.flavor)
         self.connection = database.get_connection(readonly=readonly,
-            autocommit=autocommit)
+            autocommit=autocommit, user=user)
         self.user = user
         self.database = database
         self.readonly = readonly
@@ -120,6 +122,8 @@ class Transaction(object):
         self.trigger_records = defaultdict(set)
         self.timestamp = {}
         self.counter = 0
+        self.read_cache_hits = 0
+        self.read_cache_misses = 0
         self._datamanagers = []
         self._sub_transactions = []
         self._sub_transactions_to_close = []
@@ -167,6 +171,9 @@ class Transaction(object):
                             self.database.put_connection(
                                 conn, self.close)
                 finally:
+                    if self.read_cache_hits or self.read_cache_misses:
+                        logger.debug('read cache: %s hits, %s misses',
+                            self.read_cache_hits, self.read_cache_misses)
                     self.database = None
                     self.readonly = False
                     self.connection = None
@@ -257,6 +264,8 @@ class Transaction(object):
                 sub_transaction.connection.commit()
             self.started_at = self.monotonic_time()
             Cache.commit(self)
+            if self.counter and not self.readonly:
+                self.database.written(self.connection, self.user)
             self.connection.commit()
         except Exception:
             self.rollback()